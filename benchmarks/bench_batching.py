@@ -0,0 +1,81 @@
+"""Throughput and tokens per document with and without micro-batching.
+
+Runs short SOPs through the analyzer against the in-process fake Azure
+OpenAI server (fixed latency plus a per-completion-token cost). At most
+``--llm-concurrency`` analyses are in flight, as in the service.
+
+Usage:
+    python -m benchmarks.bench_batching [--docs 200] [--llm-concurrency 8] [--batch-sizes 1 4 8]
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from openai import AsyncAzureOpenAI
+
+from benchmarks.fake_openai import FakeLLMConfig, create_app
+from src.parser.batching import MicroBatchingAnalyzer
+from src.parser.llm_analyzer import LLMSOPAnalyzer
+
+
+def short_sop(i: int) -> str:
+    return "\n".join(
+        [
+            f"Badge request {i}",
+            "Receive the access badge request from the manager.",
+            "Check if the employee has completed security training.",
+            "Issue the badge and record its number in the register.",
+        ]
+    )
+
+
+async def run(docs: int, concurrency: int, batch_size: int, latency_ms: float, per_token_ms: float) -> dict:
+    app = create_app(FakeLLMConfig(latency_ms=latency_ms, per_token_ms=per_token_ms))
+    llm = LLMSOPAnalyzer(api_key="fake", azure_endpoint="http://fake", output_format="json_object")
+    llm._client = AsyncAzureOpenAI(
+        api_key="fake",
+        azure_endpoint="http://fake",
+        api_version="2024-10-21",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+    )
+    analyzer = MicroBatchingAnalyzer(llm, max_batch_size=batch_size) if batch_size > 1 else llm
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with slots:
+            await analyzer.analyze(short_sop(i), max_tokens=512)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(docs)))
+    elapsed = time.perf_counter() - started
+    fake = app.state.fake
+    return {
+        "rps": docs / elapsed,
+        "calls": fake.requests,
+        "prompt": fake.prompt_tokens / docs,
+        "completion": fake.completion_tokens / docs,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--llm-concurrency", type=int, default=8)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--per-token-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"{'batch':>6} {'docs/s':>8} {'LLM calls':>10} {'prompt tok/doc':>15} {'compl. tok/doc':>15}")
+    for batch_size in args.batch_sizes:
+        result = asyncio.run(run(args.docs, args.llm_concurrency, batch_size, args.latency_ms, args.per_token_ms))
+        print(
+            f"{batch_size:>6} {result['rps']:>8.1f} {result['calls']:>10} "
+            f"{result['prompt']:>15.0f} {result['completion']:>15.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
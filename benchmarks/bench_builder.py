@@ -0,0 +1,85 @@
+"""Throughput benchmark for a single BPMNBuilder shared across threads.
+
+Usage:
+    python -m benchmarks.bench_builder [--builds 2000] [--threads 1 4 16] [--depth 500]
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.generator.bpmn_builder import BPMNBuilder
+from src.models.sop import SOPBranch, SOPDecision, SOPDocument, SOPElement, SOPElementType
+
+
+def typical_sop(steps: int = 20) -> SOPDocument:
+    """A flat SOP with a yes/no decision every fifth step."""
+    elements: list[SOPElement] = []
+    for i in range(steps):
+        if i % 5 == 4:
+            elements.append(
+                SOPElement(
+                    element_type=SOPElementType.DECISION,
+                    text=f"Check condition {i}",
+                    decision=SOPDecision(
+                        question=f"Condition {i}?",
+                        branches=[
+                            SOPBranch("Yes", [SOPElement(SOPElementType.STEP, f"Handle yes {i}")]),
+                            SOPBranch("No", [SOPElement(SOPElementType.STEP, f"Handle no {i}")]),
+                        ],
+                    ),
+                )
+            )
+        else:
+            elements.append(SOPElement(element_type=SOPElementType.STEP, text=f"Step {i}"))
+    return SOPDocument(title="Typical SOP", elements=elements)
+
+
+def nested_sop(depth: int) -> SOPDocument:
+    """An SOP whose decisions nest ``depth`` levels deep."""
+    steps = [SOPElement(element_type=SOPElementType.STEP, text="Innermost step")]
+    for level in range(depth):
+        steps = [
+            SOPElement(
+                element_type=SOPElementType.DECISION,
+                text=f"Check level {level}",
+                decision=SOPDecision(
+                    question=f"Level {level}?",
+                    branches=[SOPBranch("Yes", steps), SOPBranch("No")],
+                ),
+            )
+        ]
+    return SOPDocument(title="Nested SOP", elements=steps)
+
+
+def run(builder: BPMNBuilder, sop: SOPDocument, builds: int, threads: int) -> float:
+    """Return builds per second for ``builds`` builds spread over ``threads`` threads."""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in pool.map(lambda _: builder.build(sop), range(builds)):
+            pass
+    return builds / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--builds", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--depth", type=int, default=500)
+    args = parser.parse_args()
+
+    builder = BPMNBuilder()
+    workloads = {
+        "typical (20 steps)": (typical_sop(), args.builds),
+        f"nested (depth {args.depth})": (nested_sop(args.depth), max(1, args.builds // 20)),
+    }
+
+    print(f"{'workload':<24} {'threads':>7} {'builds':>7} {'builds/s':>10}")
+    for name, (sop, builds) in workloads.items():
+        for threads in args.threads:
+            rate = run(builder, sop, builds, threads)
+            print(f"{name:<24} {threads:>7} {builds:>7} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Per-request CPU of the generator stages and dependency getters on typical SOPs.
+
+Runs the same work as one /convert request after the LLM call (getters,
+build, simplify, layout, XML write) and reports microseconds per request.
+Run it before and after a change to compare.
+
+Usage:
+    python -m benchmarks.bench_hot_path [--steps 20 100] [--requests 2000]
+"""
+
+import argparse
+import time
+
+from benchmarks.bench_builder import typical_sop
+from src.api.dependencies import get_builder, get_layout_engine, get_simplifier, get_xml_writer
+from src.config import get_settings
+
+
+def measure(sop, requests: int) -> dict[str, float]:
+    """Microseconds per request, in total and per stage (CPU time)."""
+    stages = {"getters": 0.0, "build": 0.0, "simplify": 0.0, "layout": 0.0, "write": 0.0}
+    clock = time.process_time
+    for _ in range(requests):
+        t0 = clock()
+        get_settings()
+        builder, simplifier = get_builder(), get_simplifier()
+        layout_engine, writer = get_layout_engine(), get_xml_writer()
+        t1 = clock()
+        process = builder.build(sop)
+        t2 = clock()
+        simplifier.simplify(process)
+        t3 = clock()
+        layout_engine.apply_layout(process)
+        t4 = clock()
+        writer.write(process)
+        t5 = clock()
+        for name, seconds in zip(stages, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4)):
+            stages[name] += seconds
+    result = {name: seconds / requests * 1e6 for name, seconds in stages.items()}
+    result["total"] = sum(result.values())
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    header = ["getters", "build", "simplify", "layout", "write", "total"]
+    print(f"{'steps':>6} " + " ".join(f"{h + ' µs':>12}" for h in header))
+    for steps in args.steps:
+        sop = typical_sop(steps)
+        measure(sop, max(1, args.requests // 10))  # warm up
+        result = measure(sop, args.requests)
+        print(f"{steps:>6} " + " ".join(f"{result[h]:>12.1f}" for h in header))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Near-duplicate lookup time as the index grows.
+
+Fills an LSHIndex with random signatures (standing in for unrelated SOPs),
+then times signature + lookup for a lightly edited copy of an indexed SOP.
+
+Usage:
+    python -m benchmarks.bench_near_duplicate [--sizes 1000 10000 100000] [--repeat 200]
+"""
+
+import argparse
+import random
+import time
+
+from src.parser.near_duplicate import NUM_PERM, LSHIndex, MinHasher
+
+SOP = "\n".join(
+    f"{i}. Check if the {dept} request for item {i} is complete; if not, return it to the requester."
+    for i, dept in enumerate(["Finance", "HR", "IT", "Legal"] * 10, start=1)
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    hasher = MinHasher()
+    edited = SOP.replace("Finance", "Billing")
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        signature = hasher.signature(edited)
+    signature_ms = (time.perf_counter() - started) / args.repeat * 1000
+    print(f"signature of {len(edited)} chars: {signature_ms:.2f} ms")
+
+    rng = random.Random(0)
+    print(f"{'entries':>8} {'lookup ms':>10} {'candidates':>11} {'found':>6}")
+    for size in args.sizes:
+        index = LSHIndex()
+        index.add(0, hasher.signature(SOP))
+        for key in range(1, size):
+            index.add(key, tuple(rng.getrandbits(64) for _ in range(NUM_PERM)))
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            candidates = index.candidates(signature)
+        lookup_ms = (time.perf_counter() - started) / args.repeat * 1000
+        print(f"{size:>8} {lookup_ms:>10.4f} {len(candidates):>11} {str(0 in candidates):>6}")
+
+
+if __name__ == "__main__":
+    main()
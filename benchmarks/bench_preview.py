@@ -0,0 +1,46 @@
+"""Render time of SVG previews for large diagrams, cold and cached.
+
+Usage:
+    python -m benchmarks.bench_preview [--steps 100 1000 5000] [--repeat 20]
+"""
+
+import argparse
+import time
+
+from benchmarks.bench_builder import typical_sop
+from src.api.previews import PreviewCache
+from src.generator.bpmn_builder import BPMNBuilder
+from src.generator.layout import LayoutEngine
+from src.generator.svg_renderer import SVGRenderer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    renderer = SVGRenderer()
+    print(f"{'steps':>6} {'nodes':>6} {'render ms':>10} {'cached ms':>10} {'svg KB':>8}")
+    for steps in args.steps:
+        process = BPMNBuilder().build(typical_sop(steps))
+        LayoutEngine().apply_layout(process)
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            svg = renderer.render(process)
+        render_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+        cache = PreviewCache(renderer, max_entries=1)
+        key = cache.put(process)
+        cache.get(key)
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            cache.get(key)
+        cached_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+        print(f"{steps:>6} {len(process.nodes):>6} {render_ms:>10.2f} {cached_ms:>10.4f} {len(svg) / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
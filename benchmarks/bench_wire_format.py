@@ -0,0 +1,106 @@
+"""Completion tokens, decode time and latency: standard vs compact wire format.
+
+Serializes the same SOPs in both formats, estimates their completion tokens
+(characters / 4, as the fake server counts them, and a word-and-punctuation
+count closer to a BPE tokenizer on JSON), times each decoder, then runs
+analyses end to end against the in-process fake Azure OpenAI server, which
+serves the serialized SOP with a per-completion-token latency.
+
+Usage:
+    python -m benchmarks.bench_wire_format [--steps 10 40] [--calls 3] [--per-token-ms 5]
+"""
+
+import argparse
+import asyncio
+import re
+import time
+
+import httpx
+from openai import AsyncAzureOpenAI
+
+from benchmarks.fake_openai import CHARS_PER_TOKEN, FakeLLMConfig, create_app
+from src.models.sop import SOPBranch, SOPDecision, SOPDocument, SOPElement, SOPElementType
+from src.parser.compact_schema import decode_compact, to_compact_json
+from src.parser.llm_analyzer import LLMSOPAnalyzer
+from src.parser.sop_schema import decode_wire, to_wire_json
+
+FORMATS = {
+    "standard": (to_wire_json, decode_wire),
+    "compact": (to_compact_json, decode_compact),
+}
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def realistic_sop(steps: int) -> SOPDocument:
+    """An SOP with sentence-length steps and a yes/no decision every fifth step."""
+    elements: list[SOPElement] = []
+    for i in range(steps):
+        if i % 5 == 4:
+            decision = SOPDecision(
+                question=f"Does the invoice amount in line {i} exceed the approval limit?",
+                branches=[
+                    SOPBranch("Yes", [SOPElement(SOPElementType.STEP, "Escalate to the finance manager for sign-off")]),
+                    SOPBranch("No", [SOPElement(SOPElementType.STEP, "Approve the invoice and notify the supplier")]),
+                ],
+            )
+            text = f"Check the approval limit for line {i}"
+            elements.append(SOPElement(SOPElementType.DECISION, text, decision=decision))
+        else:
+            elements.append(SOPElement(SOPElementType.STEP, f"Register line {i} of the invoice in the ledger"))
+    return SOPDocument(title="Invoice Approval", elements=elements)
+
+
+def word_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+
+def decode_seconds(decode, text: str, repeat: int = 200) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        decode(text)
+    return (time.perf_counter() - started) / repeat
+
+
+async def end_to_end(wire_format: str, text: str, calls: int, latency_ms: float, per_token_ms: float) -> float:
+    """Mean seconds per analysis with the fake server returning ``text``."""
+    app = create_app(FakeLLMConfig(latency_ms=latency_ms, per_token_ms=per_token_ms, responses=[text]))
+    llm = LLMSOPAnalyzer(api_key="fake", azure_endpoint="http://fake", wire_format=wire_format)
+    llm._client = AsyncAzureOpenAI(
+        api_key="fake",
+        azure_endpoint="http://fake",
+        api_version="2024-10-21",
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=app)),
+    )
+    started = time.perf_counter()
+    for _ in range(calls):
+        await llm.analyze("SOP text", max_tokens=100_000)
+    return (time.perf_counter() - started) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, nargs="+", default=[10, 40])
+    parser.add_argument("--calls", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--per-token-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(
+        f"{'steps':>6} {'format':>9} {'chars/4 tok':>12} {'word tok':>9} "
+        f"{'decode ms':>10} {'latency ms':>11}"
+    )
+    for steps in args.steps:
+        document = realistic_sop(steps)
+        for wire_format, (encode, decode) in FORMATS.items():
+            text = encode(document)
+            assert decode(text) == document
+            latency = asyncio.run(end_to_end(wire_format, text, args.calls, args.latency_ms, args.per_token_ms))
+            print(
+                f"{steps:>6} {wire_format:>9} {len(text) // CHARS_PER_TOKEN:>12} {word_tokens(text):>9} "
+                f"{decode_seconds(decode, text) * 1000:>10.3f} {latency * 1000:>11.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""Local stand-in for the Azure OpenAI chat-completions API.
+
+Serves ``POST /openai/deployments/{deployment}/chat/completions`` with canned
+SOP JSON, configurable latency, injected 429/5xx errors and SSE streaming, so
+the service can be load-tested without spending Azure quota. Point the app at
+it through the usual settings:
+
+    python -m benchmarks.fake_openai --port 9000 --latency lognormal --latency-ms 800
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:9000 AZURE_OPENAI_API_KEY=fake \\
+        uvicorn src.main:app
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# The analyzer prefixes the SOP text with this line in its user message
+USER_PROMPT_PREFIX = "Analyze this SOP and return the structured JSON:\n\n"
+
+# Micro-batched requests list their SOPs under these headings
+BATCH_SECTION_RE = re.compile(r"^### SOP \d+$", re.MULTILINE)
+
+# Rough characters-per-token ratio used for usage accounting and truncation
+CHARS_PER_TOKEN = 4
+
+STREAM_CHUNK_CHARS = 32
+
+
+@dataclass
+class FakeLLMConfig:
+    """Behaviour of the fake server."""
+
+    latency: str = "fixed"  # fixed | uniform | lognormal
+    latency_ms: float = 500.0  # mean (fixed/uniform) or median (lognormal)
+    jitter_ms: float = 200.0  # half-width for uniform
+    sigma: float = 0.5  # shape for lognormal
+    per_token_ms: float = 0.0  # extra latency per completion token
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    retry_after_seconds: float = 1.0
+    # Canned responses, served round-robin. Empty means echo mode: a response
+    # is synthesised from the lines of the submitted SOP text.
+    responses: list[str] = field(default_factory=list)
+    seed: Optional[int] = None
+
+
+class FakeLLM:
+    """Generates completions and failures according to a FakeLLMConfig."""
+
+    def __init__(self, config: FakeLLMConfig) -> None:
+        self.config = config
+        self._random = random.Random(config.seed)
+        self._next_response = 0
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def latency_seconds(self, completion_tokens: int) -> float:
+        cfg = self.config
+        if cfg.latency == "uniform":
+            base = self._random.uniform(cfg.latency_ms - cfg.jitter_ms, cfg.latency_ms + cfg.jitter_ms)
+        elif cfg.latency == "lognormal":
+            base = cfg.latency_ms * self._random.lognormvariate(0.0, cfg.sigma)
+        else:
+            base = cfg.latency_ms
+        return max(0.0, base + cfg.per_token_ms * completion_tokens) / 1000
+
+    def pick_error(self) -> Optional[int]:
+        roll = self._random.random()
+        if roll < self.config.rate_429:
+            return 429
+        if roll < self.config.rate_429 + self.config.rate_5xx:
+            return self._random.choice((500, 502, 503))
+        return None
+
+    def completion_text(self, body: dict) -> str:
+        if self.config.responses:
+            text = self.config.responses[self._next_response % len(self.config.responses)]
+            self._next_response += 1
+            return text
+        return echo_text(body)
+
+    def respond(self, body: dict) -> str:
+        """Completion content for a request, resuming after any partial assistant turn."""
+        partial = _assistant_text(body)
+        if partial is None:
+            return self.completion_text(body)
+        # Continuation request: find the full answer the partial came from
+        # and return the rest of it
+        candidates = self.config.responses or [echo_text(body)]
+        full = next((c for c in candidates if c.startswith(partial)), "")
+        return full[len(partial) :]
+
+
+def echo_text(body: dict) -> str:
+    """Echo-mode completion for a request, in the wire format it asked for."""
+    encode = compact_sop if _wants_compact(body) else (lambda document: document)
+    sections = BATCH_SECTION_RE.split(_user_text(body))
+    if len(sections) > 1:
+        return json.dumps({"documents": [encode(echo_sop(section)) for section in sections[1:]]}, separators=(",", ":"))
+    return json.dumps(encode(echo_sop(sections[0])), separators=(",", ":"))
+
+
+def echo_sop(sop_text: str) -> dict:
+    """Synthesise SOP JSON from raw text: one step per line, 'Check ...' lines become decisions."""
+    elements = []
+    for line in sop_text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.lower().startswith("check"):
+            elements.append(
+                {
+                    "type": "decision",
+                    "text": line,
+                    "decision": {
+                        "question": f"{line}?",
+                        "branches": [
+                            {"condition_label": "Yes", "steps": [{"type": "step", "text": f"Handle yes: {line}"}]},
+                            {"condition_label": "No", "steps": [{"type": "step", "text": f"Handle no: {line}"}]},
+                        ],
+                    },
+                }
+            )
+        else:
+            elements.append({"type": "step", "text": line})
+    return {"title": "Fake SOP", "elements": elements}
+
+
+def compact_sop(document: dict) -> dict:
+    """The compact wire form of standard SOP JSON: short keys, steps as bare strings."""
+
+    def elements(items: list[dict]) -> list:
+        out: list = []
+        for item in items:
+            decision = item.get("decision")
+            if item.get("type") != "decision" or not decision:
+                out.append(item.get("text", ""))
+                continue
+            branches = [{"l": b["condition_label"], "s": elements(b["steps"])} for b in decision["branches"]]
+            out.append({"d": item.get("text", ""), "q": decision["question"], "b": branches})
+        return out
+
+    return {"t": document["title"], "e": elements(document["elements"])}
+
+
+def _wants_compact(body: dict) -> bool:
+    schema_name = ((body.get("response_format") or {}).get("json_schema") or {}).get("name", "")
+    if schema_name:
+        return schema_name.startswith("sop_compact")
+    system = next((m.get("content") or "" for m in body.get("messages", []) if m.get("role") == "system"), "")
+    return "compact JSON" in system
+
+
+def _user_text(body: dict) -> str:
+    """The SOP text from the first user turn."""
+    for message in body.get("messages", []):
+        if message.get("role") == "user":
+            content = message.get("content") or ""
+            return content.removeprefix(USER_PROMPT_PREFIX)
+    return ""
+
+
+def _assistant_text(body: dict) -> Optional[str]:
+    for message in body.get("messages", []):
+        if message.get("role") == "assistant":
+            return message.get("content") or ""
+    return None
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def create_app(config: Optional[FakeLLMConfig] = None) -> FastAPI:
+    fake = FakeLLM(config or FakeLLMConfig())
+    app = FastAPI(title="Fake Azure OpenAI")
+    app.state.fake = fake
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def chat_completions(deployment: str, request: Request):
+        body = await request.json()
+        fake.requests += 1
+
+        status = fake.pick_error()
+        if status is not None:
+            await asyncio.sleep(fake.latency_seconds(0) / 4)
+            headers = {"retry-after": str(fake.config.retry_after_seconds)} if status == 429 else {}
+            return JSONResponse(
+                status_code=status,
+                headers=headers,
+                content={"error": {"code": str(status), "message": "Injected failure"}},
+            )
+
+        content = fake.respond(body)
+        finish_reason = "stop"
+        max_tokens = body.get("max_tokens") or body.get("max_completion_tokens")
+        if max_tokens and count_tokens(content) > max_tokens:
+            content = content[: max_tokens * CHARS_PER_TOKEN]
+            finish_reason = "length"
+
+        prompt_tokens = sum(count_tokens(m.get("content") or "") for m in body.get("messages", []))
+        completion_tokens = count_tokens(content)
+        fake.prompt_tokens += prompt_tokens
+        fake.completion_tokens += completion_tokens
+        await asyncio.sleep(fake.latency_seconds(completion_tokens))
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        if body.get("stream"):
+            return StreamingResponse(
+                _stream(completion_id, created, deployment, content, finish_reason),
+                media_type="text/event-stream",
+            )
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": deployment,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": finish_reason,
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {
+            "requests": fake.requests,
+            "prompt_tokens": fake.prompt_tokens,
+            "completion_tokens": fake.completion_tokens,
+        }
+
+    return app
+
+
+def _stream(completion_id: str, created: int, model: str, content: str, finish_reason: str) -> Iterator[str]:
+    def chunk(delta: dict, reason: Optional[str]) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""}, None)
+    for start in range(0, len(content), STREAM_CHUNK_CHARS):
+        yield chunk({"content": content[start : start + STREAM_CHUNK_CHARS]}, None)
+    yield chunk({}, finish_reason)
+    yield "data: [DONE]\n\n"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake Azure OpenAI chat-completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", choices=("fixed", "uniform", "lognormal"), default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--jitter-ms", type=float, default=200.0)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--per-token-ms", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--responses-dir", type=Path, help="Directory of canned *.json responses")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    responses = []
+    if args.responses_dir:
+        responses = [p.read_text() for p in sorted(args.responses_dir.glob("*.json"))]
+
+    config = FakeLLMConfig(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        sigma=args.sigma,
+        per_token_ms=args.per_token_ms,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        responses=responses,
+        seed=args.seed,
+    )
+
+    import uvicorn
+
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Load driver for POST /convert.
+
+Generates .docx SOPs of several sizes, uploads a weighted mix of them at a fixed
+concurrency and reports throughput, latency percentiles and error rates, both
+end-to-end and per pipeline stage (from the Server-Timing response header).
+
+    python -m benchmarks.fake_openai --port 9000 &
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:9000 AZURE_OPENAI_API_KEY=fake uvicorn src.main:app &
+    python -m benchmarks.load_driver --url http://127.0.0.1:8000 --requests 500 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Optional
+
+import httpx
+from docx import Document as DocxDocument
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Steps per generated document for each size class
+DOCUMENT_SIZES = {"small": 8, "medium": 40, "large": 200}
+DEFAULT_MIX = "small=0.6,medium=0.3,large=0.1"
+
+
+@dataclass
+class Sample:
+    size: str
+    status: int  # 0 for transport errors
+    latency: float
+    stages: dict[str, float] = field(default_factory=dict)
+    failed_stage: Optional[str] = None
+
+
+def make_docx(steps: int, rng: random.Random) -> bytes:
+    """Build an SOP .docx with ``steps`` numbered steps and a decision every sixth step."""
+    doc = DocxDocument()
+    doc.add_heading(f"Generated SOP ({steps} steps)", level=1)
+    for i in range(1, steps + 1):
+        if i % 6 == 0:
+            doc.add_paragraph(f"{i}. Check if the request needs approval from team {rng.randint(1, 9)}.")
+            doc.add_paragraph("   If yes, forward it to the approver.")
+            doc.add_paragraph("   If no, continue processing.")
+        else:
+            doc.add_paragraph(f"{i}. Perform routine action {i} and record the outcome in the tracker.")
+    buf = BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DOCUMENT_SIZES:
+            raise ValueError(f"Unknown document size {name!r}; expected one of {sorted(DOCUMENT_SIZES)}")
+        mix[name] = float(weight)
+    return mix
+
+
+def parse_server_timing(header: str) -> dict[str, float]:
+    """Parse ``name;dur=12.3, ...`` into seconds per stage."""
+    stages = {}
+    for entry in filter(None, (e.strip() for e in header.split(","))):
+        name, *params = entry.split(";")
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "dur":
+                stages[name.strip()] = float(value) / 1000
+    return stages
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_load(
+    url: str,
+    total: int,
+    concurrency: int,
+    mix: dict[str, float],
+    timeout: float,
+    seed: Optional[int] = None,
+) -> tuple[list[Sample], float]:
+    rng = random.Random(seed)
+    documents = {size: make_docx(DOCUMENT_SIZES[size], rng) for size in mix}
+    plan = rng.choices(list(mix), weights=list(mix.values()), k=total)
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for size in plan:
+        queue.put_nowait(size)
+
+    samples: list[Sample] = []
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        while not queue.empty():
+            size = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    f"{url.rstrip('/')}/convert",
+                    files={"file": (f"{size}.docx", documents[size], DOCX_MIME)},
+                )
+            except httpx.HTTPError:
+                samples.append(Sample(size, 0, time.perf_counter() - started, failed_stage="transport"))
+                continue
+            latency = time.perf_counter() - started
+            failed_stage = None
+            if response.status_code >= 400:
+                failed_stage = response.headers.get("x-failed-stage") or f"http_{response.status_code}"
+            samples.append(
+                Sample(
+                    size=size,
+                    status=response.status_code,
+                    latency=latency,
+                    stages=parse_server_timing(response.headers.get("server-timing", "")),
+                    failed_stage=failed_stage,
+                )
+            )
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+def report(samples: list[Sample], elapsed: float) -> str:
+    ok = [s for s in samples if s.failed_stage is None]
+    lines = [
+        f"requests: {len(samples)}  ok: {len(ok)}  elapsed: {elapsed:.2f}s  "
+        f"throughput: {len(ok) / elapsed:.2f} req/s",
+        "",
+        f"{'scope':<16} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}",
+    ]
+
+    def row(name: str, values: list[float]) -> str:
+        p50, p95, p99 = (percentile(values, p) * 1000 for p in (50, 95, 99))
+        return f"{name:<16} {len(values):>6} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f}"
+
+    lines.append(row("end-to-end", [s.latency for s in ok]))
+    for size in DOCUMENT_SIZES:
+        values = [s.latency for s in ok if s.size == size]
+        if values:
+            lines.append(row(f"  {size}", values))
+
+    per_stage: dict[str, list[float]] = defaultdict(list)
+    for s in ok:
+        for stage, seconds in s.stages.items():
+            per_stage[stage].append(seconds)
+    for stage, values in per_stage.items():
+        lines.append(row(f"stage:{stage}", values))
+
+    errors = Counter(s.failed_stage for s in samples if s.failed_stage is not None)
+    lines += ["", "error rate by stage:"]
+    if not errors:
+        lines.append("  none")
+    for stage, count in errors.most_common():
+        lines.append(f"  {stage:<14} {count:>6}  {count / len(samples):.1%}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load driver for POST /convert")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Size weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    samples, elapsed = asyncio.run(
+        run_load(args.url, args.requests, args.concurrency, parse_mix(args.mix), args.timeout, args.seed)
+    )
+    print(report(samples, elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from src.api.dependencies import get_profiler
+from src.api.profiling import PROFILE_FORMATS
+from src.config import get_settings
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """True if ``token`` matches the configured admin token (admin is off when unset)."""
+    expected = get_settings().admin_token
+    # Header values may hold any Latin-1 character; compare_digest only takes ASCII str
+    return bool(expected) and token is not None and secrets.compare_digest(token.encode(), expected.encode())
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    if not get_settings().admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles")
+async def list_profiles():
+    """List stored request profiles, newest first."""
+    profiler = get_profiler()
+    return {"profiles": profiler.store.list()}
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    format: str = Query("pstats", pattern="^(pstats|tracemalloc|text)$"),
+    stage: Optional[str] = Query(None),
+):
+    """Download a profile.
+
+    ``pstats`` is a cProfile dump (``python -m pstats``, snakeviz, gprof2dot);
+    ``tracemalloc`` is the ``tracemalloc.Snapshot`` dump of one ``stage``
+    (listed under ``snapshots`` in ``/admin/profiles``); ``text`` is a summary.
+    """
+    if format == "tracemalloc" and stage is None:
+        raise HTTPException(status_code=400, detail="format=tracemalloc needs a stage")
+    path = get_profiler().store.path_for(profile_id, format, stage if format == "tracemalloc" else None)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    _, media_type = PROFILE_FORMATS[format]
+    return FileResponse(path, media_type=media_type, filename=path.name)
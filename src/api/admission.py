@@ -0,0 +1,149 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from src.api.uploads import send_json
+from src.metrics import metrics
+
+# Smoothing factor for the moving average of conversion time behind Retry-After
+SERVICE_TIME_ALPHA = 0.2
+MIN_RETRY_AFTER_SECONDS = 1
+MAX_RETRY_AFTER_SECONDS = 60
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; carries a Retry-After hint."""
+
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(f"Server busy ({reason.replace('_', ' ')}), retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Caps in-flight conversions, with a bounded FIFO queue in front.
+
+    A released slot is handed directly to the oldest waiter, so queued
+    requests are admitted in arrival order and newcomers cannot overtake
+    them. Waiters are plain futures created on the running loop, so one
+    controller can be built at import time and used from any event loop.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int, queue_timeout: float) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._service_seconds = 1.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def saturation(self) -> float:
+        """Occupied share of all slots and queue places, 0.0 to 1.0."""
+        capacity = self.max_in_flight + self.max_queue
+        return (self.in_flight + self.queue_depth) / capacity if capacity else 0.0
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        backlog = self.queue_depth + 1
+        estimate = self._service_seconds * backlog / max(1, self.max_in_flight)
+        return min(MAX_RETRY_AFTER_SECONDS, max(MIN_RETRY_AFTER_SECONDS, math.ceil(estimate)))
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one conversion slot, waiting in the queue if all are busy.
+
+        Raises ``AdmissionRejected`` when the queue is full or the wait
+        exceeds ``queue_timeout``.
+        """
+        await self._acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._service_seconds += SERVICE_TIME_ALPHA * (elapsed - self._service_seconds)
+            self._release()
+
+    async def _acquire(self) -> None:
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self._publish()
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        queued_at = time.perf_counter()
+        try:
+            # shield: a timeout must not cancel a waiter that was just handed a slot
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as error:
+            if waiter.done() and not waiter.cancelled():
+                # The slot arrived as we gave up; pass it on
+                self._release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+                self._publish()
+            if isinstance(error, asyncio.TimeoutError):
+                self._reject("queue_timeout")
+            raise
+        finally:
+            metrics.observe("admission_queue_wait_seconds", time.perf_counter() - queued_at)
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Hand the slot over; in_flight is unchanged
+                waiter.set_result(None)
+                self._publish()
+                return
+        self.in_flight -= 1
+        self._publish()
+
+    def _reject(self, reason: str) -> None:
+        metrics.incr("admission_rejected_total", reason=reason)
+        raise AdmissionRejected(reason, self.retry_after())
+
+    def _publish(self) -> None:
+        metrics.set_gauge("admission_in_flight", self.in_flight)
+        metrics.set_gauge("admission_queue_depth", self.queue_depth)
+
+
+class AdmissionMiddleware:
+    """Admits requests to ``paths`` through an AdmissionController.
+
+    Runs before the request body is read, so a rejected upload never gets
+    buffered; rejections are ``503`` with ``Retry-After``.
+    """
+
+    def __init__(self, app, controller: AdmissionController, paths: tuple[str, ...] = ("/convert",)) -> None:
+        self.app = app
+        self.controller = controller
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths or self.controller.max_in_flight <= 0:
+            await self.app(scope, receive, send)
+            return
+        try:
+            async with self.controller.slot():
+                await self.app(scope, receive, send)
+        except AdmissionRejected as e:
+            await send_json(
+                send,
+                503,
+                {"detail": str(e)},
+                headers=((b"retry-after", str(e.retry_after).encode()),),
+            )
@@ -0,0 +1,140 @@
+import gzip
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from src.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_SUFFIX = ".bpmn"
+GZIP_SUFFIX = ".gz"
+# Smaller artifacts fit in a packet or two; compressing them buys nothing
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 9
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def artifact_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class ArtifactStore:
+    """Content-addressed on-disk store of generated BPMN.
+
+    Each artifact is stored once under the SHA-256 of its bytes, sharded by
+    the first two hex digits, next to a gzip variant compressed once at
+    write time. Files are never modified after they are written, so they
+    can be served straight from disk, ranges and all. When the total size
+    exceeds ``max_bytes``, the least recently used artifacts are deleted.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # key -> bytes on disk (both variants), least recently used first
+        self._sizes: OrderedDict[str, int] = OrderedDict()
+        self._total = 0
+        self._load()
+
+    def _load(self) -> None:
+        """Rebuild the index from disk, oldest first, after a restart."""
+        found = []
+        for path in self.directory.glob(f"??/*{ARTIFACT_SUFFIX}"):
+            key = path.name.removesuffix(ARTIFACT_SUFFIX)
+            if not _KEY_RE.match(key):
+                continue
+            stat = path.stat()
+            gz = self._gzip_path(key)
+            size = stat.st_size + (gz.stat().st_size if gz.exists() else 0)
+            found.append((stat.st_mtime, key, size))
+        for _, key, size in sorted(found):
+            self._sizes[key] = size
+            self._total += size
+        self._publish()
+
+    def path(self, key: str) -> Optional[Path]:
+        """Path of an artifact, or None if it is not stored. Marks it as recently used."""
+        if not _KEY_RE.match(key):
+            return None
+        with self._lock:
+            if key not in self._sizes:
+                metrics.incr("artifact_requests_total", outcome="miss")
+                return None
+            self._sizes.move_to_end(key)
+        metrics.incr("artifact_requests_total", outcome="hit")
+        return self._path(key)
+
+    def gzip_path(self, key: str) -> Optional[Path]:
+        """Path of the precompressed variant, or None for artifacts too small to have one."""
+        path = self._gzip_path(key)
+        return path if path.exists() else None
+
+    def put(self, content: bytes) -> str:
+        """Store ``content`` (if new) and return its key. Blocking: call from a worker thread."""
+        key = artifact_hash(content)
+        with self._lock:
+            if key in self._sizes:
+                self._sizes.move_to_end(key)
+                return key
+
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = _write_atomic(path, content)
+        if len(content) >= GZIP_MIN_BYTES:
+            size += _write_atomic(self._gzip_path(key), gzip.compress(content, GZIP_LEVEL, mtime=0))
+
+        with self._lock:
+            if key not in self._sizes:
+                self._sizes[key] = size
+                self._total += size
+            evicted = self._evict()
+        for old in evicted:
+            self._path(old).unlink(missing_ok=True)
+            self._gzip_path(old).unlink(missing_ok=True)
+        metrics.incr("artifacts_stored_total")
+        self._publish()
+        return key
+
+    def _evict(self) -> list[str]:
+        evicted = []
+        # The newest artifact is always kept, even if it alone exceeds the limit
+        while self._total > self.max_bytes and len(self._sizes) > 1:
+            key, size = self._sizes.popitem(last=False)
+            self._total -= size
+            evicted.append(key)
+        if evicted:
+            metrics.incr("artifacts_evicted_total", len(evicted))
+            logger.info("Evicted %d artifacts to stay under %d bytes", len(evicted), self.max_bytes)
+        return evicted
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{ARTIFACT_SUFFIX}"
+
+    def _gzip_path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{ARTIFACT_SUFFIX}{GZIP_SUFFIX}"
+
+    def _publish(self) -> None:
+        metrics.set_gauge("artifact_store_bytes", self._total)
+        metrics.set_gauge("artifact_store_entries", len(self._sizes))
+
+
+def _write_atomic(path: Path, content: bytes) -> int:
+    """Write via a temporary file and rename, so readers never see a partial file."""
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return len(content)
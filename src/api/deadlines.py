@@ -0,0 +1,68 @@
+import asyncio
+from concurrent.futures import Executor
+from dataclasses import replace
+from typing import Awaitable, Callable, TypeVar
+
+from src.context import RequestContext, current_request
+from src.metrics import metrics
+
+T = TypeVar("T")
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away before its response is ready."""
+
+
+def reserve(context: RequestContext, seconds: float) -> RequestContext:
+    """Context for an earlier stage: the deadline moved forward by ``seconds``.
+
+    Keeps time back for the stages that follow. At most half of what is left
+    is reserved, so a short deadline still leaves the earlier stage a budget.
+    """
+    time_left = context.time_left()
+    if time_left is None:
+        return context
+    return replace(context, deadline=context.deadline - min(seconds, time_left / 2))
+
+
+async def within_deadline(work: Awaitable[T]) -> T:
+    """Await ``work``, cancelling it with ``TimeoutError`` at the current deadline."""
+    return await asyncio.wait_for(work, current_request().time_left())
+
+
+async def run_in_executor(executor: Executor, stage: str, fn: Callable[[], T]) -> T:
+    """Run ``fn`` on ``executor``; if cancelled while still queued, it never runs."""
+    future = executor.submit(fn)
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        # cancel() only succeeds for a job that has not started yet
+        if future.cancel():
+            metrics.incr("cpu_jobs_cancelled_total", stage=stage)
+        raise
+
+
+async def cancel_on_disconnect(
+    work: Awaitable[T],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    poll_interval: float,
+) -> T:
+    """Await ``work``, cancelling it if ``is_disconnected()`` turns true.
+
+    The client is polled every ``poll_interval`` seconds. Cancellation reaches
+    the in-flight LLM call and any queued executor jobs. Raises
+    ``ClientDisconnected`` once the work has been cancelled.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await is_disconnected():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
@@ -1,33 +1,193 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import replace
 from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Union
 
-from src.config import get_settings
+from src.api.admission import AdmissionController
+from src.api.artifacts import ArtifactStore
+from src.api.previews import PreviewCache
+from src.api.profiling import ProfileStore, RequestProfiler
+from src.config import Settings, get_settings
 from src.generator.bpmn_builder import BPMNBuilder
 from src.generator.bpmn_xml_writer import BPMNXMLWriter
-from src.generator.layout import LayoutEngine
+from src.generator.layout import CachedLayoutEngine, LayoutEngine
+from src.generator.simplifier import GraphSimplifier
+from src.generator.svg_renderer import SVGRenderer
+from src.parser.base import BaseSOPAnalyzer
+from src.parser.batching import MicroBatchingAnalyzer
+from src.parser.circuit_breaker import CircuitBreaker
 from src.parser.docx_parser import DocxSOPParser
+from src.parser.fallback import HeuristicFallbackAnalyzer
 from src.parser.llm_analyzer import LLMSOPAnalyzer
+from src.parser.near_duplicate import NearDuplicateAnalyzer
+from src.parser.routing import ModelTier, RoutingAnalyzer
+from src.parser.scheduling import FairShareAnalyzer, FairShareScheduler
+from src.parser.single_flight import SingleFlightAnalyzer
 
 
 @lru_cache
-def get_parser() -> DocxSOPParser:
-    """Return the SOP parser. Swap implementation here to change parsing strategy."""
+def get_analyzer(llm_concurrency: Optional[int] = None) -> BaseSOPAnalyzer:
+    """Return the SOP text analyzer: the LLM analyzer plus the wrappers in front of it.
+
+    ``llm_concurrency`` overrides ``LLM_MAX_CONCURRENCY`` (the CLI's ``--llm-concurrency``).
+    """
     settings = get_settings()
-    analyzer = LLMSOPAnalyzer(
+    tiers = [
+        ModelTier(
+            name="standard",
+            analyzer=_llm_analyzer(settings, settings.azure_openai_deployment, settings.llm_max_tokens),
+            max_tokens=settings.llm_max_tokens,
+            max_score=settings.routing_large_min_score
+            if settings.azure_openai_large_deployment
+            else float("inf"),
+        )
+    ]
+    if settings.azure_openai_small_deployment:
+        tiers.append(
+            ModelTier(
+                name="small",
+                analyzer=_llm_analyzer(
+                    settings, settings.azure_openai_small_deployment, settings.llm_small_max_tokens
+                ),
+                max_tokens=settings.llm_small_max_tokens,
+                max_score=settings.routing_small_max_score,
+            )
+        )
+    if settings.azure_openai_large_deployment:
+        tiers.append(
+            ModelTier(
+                name="large",
+                analyzer=_llm_analyzer(
+                    settings, settings.azure_openai_large_deployment, settings.llm_large_max_tokens
+                ),
+                max_tokens=settings.llm_large_max_tokens,
+            )
+        )
+    if settings.llm_batch_max_size > 1:
+        # Short SOPs all route to the lowest tier, so that is where batches form
+        smallest = min(tiers, key=lambda tier: tier.max_score)
+        batching = MicroBatchingAnalyzer(
+            smallest.analyzer,
+            max_batch_size=settings.llm_batch_max_size,
+            max_wait=settings.llm_batch_max_wait_ms / 1000,
+            max_chars=settings.llm_batch_max_chars,
+            max_tokens=smallest.max_tokens,
+        )
+        tiers[tiers.index(smallest)] = replace(smallest, analyzer=batching)
+    scheduler = FairShareScheduler(
+        max_concurrency=llm_concurrency or settings.llm_max_concurrency,
+        weights=settings.tenant_weights,
+        tokens_per_minute=settings.tenant_tokens_per_minute,
+        default_weight=settings.default_tenant_weight,
+        default_tokens_per_minute=settings.default_tenant_tokens_per_minute,
+    )
+    analyzer: BaseSOPAnalyzer = FairShareAnalyzer(RoutingAnalyzer(tiers), scheduler)
+    if settings.near_duplicate_cache_entries > 0:
+        analyzer = NearDuplicateAnalyzer(
+            analyzer,
+            threshold=settings.near_duplicate_threshold,
+            max_entries=settings.near_duplicate_cache_entries,
+            executor=get_cpu_executor(),
+        )
+    # Coalescing and near-duplicate reuse sit in front, so repeated uploads
+    # never take a scheduler slot
+    return SingleFlightAnalyzer(analyzer)
+
+
+def _llm_analyzer(settings: Settings, deployment: str, max_tokens: int) -> LLMSOPAnalyzer:
+    return LLMSOPAnalyzer(
         api_key=settings.azure_openai_api_key,
         azure_endpoint=settings.azure_openai_endpoint,
         api_version=settings.azure_openai_api_version,
-        model=settings.azure_openai_deployment,
+        model=deployment,
+        max_retries=settings.azure_openai_max_retries,
+        timeout=settings.azure_openai_timeout_seconds,
+        output_format=settings.azure_openai_output_format,
+        max_continuations=settings.llm_max_continuations,
+        max_tokens=max_tokens,
+        wire_format=settings.llm_wire_format,
+        circuit_breaker=CircuitBreaker(
+            deployment,
+            failure_threshold=settings.llm_breaker_failure_threshold,
+            slow_call_seconds=settings.llm_breaker_slow_call_seconds,
+            open_seconds=settings.llm_breaker_open_seconds,
+        )
+        if settings.llm_breaker_failure_threshold > 0
+        else None,
+    )
+
+
+@lru_cache
+def get_parser() -> DocxSOPParser:
+    """Return the SOP parser. Swap implementation here to change parsing strategy."""
+    settings = get_settings()
+    analyzer = get_analyzer()
+    if settings.llm_heuristic_fallback:
+        # Only for /convert: the CLI would rather fail a document and retry it
+        # on its next run than write a heuristic diagram that is then skipped
+        analyzer = HeuristicFallbackAnalyzer(analyzer)
+    return DocxSOPParser(
+        llm_analyzer=analyzer,
+        executor=get_cpu_executor(),
+        procedure_heading_level=settings.procedure_heading_level,
+    )
+
+
+@lru_cache
+def get_cpu_executor() -> Executor:
+    """Threads for CPU-bound stages, so they neither block the event loop nor outlive a cancelled request."""
+    return ThreadPoolExecutor(max_workers=get_settings().cpu_workers, thread_name_prefix="sop2bpmn-cpu")
+
+
+@lru_cache
+def get_profiler() -> RequestProfiler:
+    settings = get_settings()
+    store = ProfileStore(Path(settings.profile_dir), retention=settings.profile_retention)
+    return RequestProfiler(store, sample_rate=settings.profiling_sample_rate)
+
+
+@lru_cache
+def get_admission_controller() -> AdmissionController:
+    settings = get_settings()
+    return AdmissionController(
+        max_in_flight=settings.max_concurrent_conversions,
+        max_queue=settings.max_queued_conversions,
+        queue_timeout=settings.admission_queue_timeout_seconds,
     )
-    return DocxSOPParser(llm_analyzer=analyzer)
 
 
+@lru_cache
+def get_artifact_store() -> Optional[ArtifactStore]:
+    """The on-disk BPMN store, or None when ARTIFACT_STORE_MAX_BYTES is 0."""
+    settings = get_settings()
+    if settings.artifact_store_max_bytes <= 0:
+        return None
+    return ArtifactStore(Path(settings.artifact_dir), max_bytes=settings.artifact_store_max_bytes)
+
+
+@lru_cache
+def get_preview_cache() -> PreviewCache:
+    return PreviewCache(SVGRenderer(), max_entries=get_settings().preview_cache_entries)
+
+
+# The generator classes are stateless, so one shared instance serves every request
+@lru_cache
 def get_builder() -> BPMNBuilder:
     return BPMNBuilder()
 
 
-def get_layout_engine() -> LayoutEngine:
-    return LayoutEngine()
+@lru_cache
+def get_simplifier() -> GraphSimplifier:
+    return GraphSimplifier()
 
 
+@lru_cache
+def get_layout_engine() -> Union[LayoutEngine, CachedLayoutEngine]:
+    entries = get_settings().layout_cache_entries
+    return CachedLayoutEngine(LayoutEngine(), entries) if entries > 0 else LayoutEngine()
+
+
+@lru_cache
 def get_xml_writer() -> BPMNXMLWriter:
     return BPMNXMLWriter()
@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+from typing import Optional, Union
+
+from src.generator.svg_renderer import SVGRenderer, process_hash
+from src.metrics import metrics
+from src.models.bpmn import BPMNProcess
+
+
+class PreviewCache:
+    """LRU of SVG previews keyed by process hash.
+
+    ``/convert`` registers each laid-out process; the SVG is rendered on the
+    first ``GET /preview/{hash}`` and kept, so repeat views are a dict lookup.
+    The registered process must not be mutated afterwards.
+    """
+
+    def __init__(self, renderer: SVGRenderer, max_entries: int) -> None:
+        self._renderer = renderer
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        # hash -> laid-out process until first rendered, then the SVG bytes
+        self._entries: OrderedDict[str, Union[BPMNProcess, bytes]] = OrderedDict()
+
+    def put(self, process: BPMNProcess) -> str:
+        key = process_hash(process)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                self._entries[key] = process
+                while len(self._entries) > self._max_entries:
+                    self._entries.popitem(last=False)
+        return key
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                metrics.incr("preview_cache_total", outcome="miss")
+                return None
+            self._entries.move_to_end(key)
+        if isinstance(entry, bytes):
+            metrics.incr("preview_cache_total", outcome="hit")
+            return entry
+
+        metrics.incr("preview_cache_total", outcome="render")
+        svg = self._renderer.render(entry).encode("utf-8")
+        with self._lock:
+            if key in self._entries:
+                self._entries[key] = svg
+        return svg
@@ -0,0 +1,156 @@
+import cProfile
+import io
+import json
+import logging
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FORMATS = {
+    # format -> (file suffix, media type)
+    "pstats": (".prof", "application/octet-stream"),
+    "tracemalloc": (".tracemalloc", "application/octet-stream"),
+    "text": (".txt", "text/plain"),
+}
+
+TEXT_SUMMARY_LINES = 40
+TRACEMALLOC_FRAMES = 10
+
+
+class ProfileCapture:
+    """CPU profile and allocation snapshot for one request's pipeline.
+
+    Only the sections wrapped in ``section()`` are profiled and traced, so
+    time spent and memory allocated while awaiting the LLM (and in other
+    requests' coroutines) is not attributed. Each section gets its own
+    snapshot of the allocations it left alive when it ended.
+    """
+
+    def __init__(self, trigger: str, filename: str) -> None:
+        self.profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.trigger = trigger
+        self.filename = filename
+        self.profiler = cProfile.Profile()
+        self.snapshots: dict[str, tracemalloc.Snapshot] = {}
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.profiler.enable()
+        try:
+            yield
+        finally:
+            self.profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            self.snapshots[name] = snapshot
+
+
+class ProfileStore:
+    """Keeps the most recent profiles on local disk."""
+
+    def __init__(self, directory: Path, retention: int) -> None:
+        self.directory = directory
+        self.retention = retention
+
+    def save(self, capture: ProfileCapture, stage_durations: dict[str, float]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        base = self.directory / capture.profile_id
+
+        capture.profiler.dump_stats(f"{base}.prof")
+        for name, snapshot in capture.snapshots.items():
+            snapshot.dump(f"{base}.{name}.tracemalloc")
+        Path(f"{base}.txt").write_text(_text_summary(capture))
+
+        meta = {
+            "id": capture.profile_id,
+            "created": time.time(),
+            "trigger": capture.trigger,
+            "filename": capture.filename,
+            "snapshots": list(capture.snapshots),
+            "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in stage_durations.items()},
+        }
+        # Metadata is written last: a profile is listed only once complete
+        Path(f"{base}.json").write_text(json.dumps(meta))
+        self._prune()
+
+    def list(self) -> list[dict]:
+        if not self.directory.exists():
+            return []
+        metas = [json.loads(p.read_text()) for p in self.directory.glob("*.json")]
+        return sorted(metas, key=lambda m: m["created"], reverse=True)
+
+    def path_for(self, profile_id: str, fmt: str, section: Optional[str] = None) -> Optional[Path]:
+        """Path of a stored profile file; tracemalloc snapshots are per ``section``."""
+        suffix, _ = PROFILE_FORMATS[fmt]
+        # Profile ids are generated by ProfileCapture; refuse anything else
+        if not profile_id.replace("-", "").isalnum():
+            return None
+        if section is not None:
+            if not section.isalnum():
+                return None
+            suffix = f".{section}{suffix}"
+        path = self.directory / f"{profile_id}{suffix}"
+        return path if path.is_file() else None
+
+    def _prune(self) -> None:
+        profiles = self.list()
+        for meta in profiles[self.retention :]:
+            for path in self.directory.glob(f"{meta['id']}.*"):
+                path.unlink(missing_ok=True)
+
+
+class RequestProfiler:
+    """Decides which requests to profile and captures at most one at a time.
+
+    tracemalloc and the active profiler are process-global, so concurrent
+    captures would pollute each other; a request that finds a capture in
+    progress is simply not profiled.
+    """
+
+    def __init__(self, store: ProfileStore, sample_rate: float) -> None:
+        self.store = store
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+
+    def trigger_for(self, requested: bool) -> Optional[str]:
+        if requested:
+            return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    @contextmanager
+    def capture(self, trigger: Optional[str], filename: str) -> Iterator[Optional[ProfileCapture]]:
+        """Yield a ProfileCapture, or None when not profiling this request."""
+        if trigger is None or not self._lock.acquire(blocking=False):
+            yield None
+            return
+        try:
+            yield ProfileCapture(trigger, filename)
+        finally:
+            self._lock.release()
+
+
+
+def _text_summary(capture: ProfileCapture) -> str:
+    out = io.StringIO()
+    out.write(f"Profile {capture.profile_id} ({capture.trigger}) for {capture.filename}\n\n")
+    stats = pstats.Stats(capture.profiler, stream=out)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TEXT_SUMMARY_LINES)
+    for name, snapshot in capture.snapshots.items():
+        out.write(f"\nTop allocations by line in {name}:\n")
+        for stat in snapshot.statistics("lineno")[:TEXT_SUMMARY_LINES]:
+            out.write(f"{stat}\n")
+    return out.getvalue()
@@ -1,10 +1,44 @@
+import asyncio
 import logging
+import math
+from contextlib import AsyncExitStack, nullcontext
+from functools import partial
 from pathlib import Path
+from typing import BinaryIO, Optional
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
-from fastapi.responses import HTMLResponse, Response
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Request, UploadFile
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response
 
-from src.api.dependencies import get_builder, get_layout_engine, get_parser, get_xml_writer
+from src.api.admin import is_admin
+from src.api.deadlines import (
+    ClientDisconnected,
+    cancel_on_disconnect,
+    reserve,
+    run_in_executor,
+    within_deadline,
+)
+from src.api.dependencies import (
+    get_admission_controller,
+    get_artifact_store,
+    get_builder,
+    get_cpu_executor,
+    get_layout_engine,
+    get_parser,
+    get_preview_cache,
+    get_profiler,
+    get_simplifier,
+    get_xml_writer,
+)
+from src.api.profiling import ProfileCapture
+from src.api.tenancy import get_request_context
+from src.api.timing import StageTimer
+from src.api.uploads import UploadTooLarge, spool_upload
+from src.config import get_settings
+from src.context import RequestContext, current_request, use_request_context
+from src.metrics import metrics
+from src.models.bpmn import BPMNProcess
+from src.parser.circuit_breaker import CircuitOpenError
+from src.parser.fallback import track_degraded
 
 logger = logging.getLogger(__name__)
 
@@ -26,15 +60,145 @@ async def health_check():
     return {"status": "healthy", "service": "sop-to-bpmn"}
 
 
+@router.get("/health/live")
+async def liveness():
+    """Liveness probe: the event loop is serving requests."""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness():
+    """Readiness probe: 503 once conversion slots and queue are nearly full.
+
+    Lets the load balancer steer new traffic elsewhere before requests
+    start being shed with 503 at ``/convert``.
+    """
+    controller = get_admission_controller()
+    limited = controller.max_in_flight > 0
+    ready = not limited or controller.saturation < get_settings().readiness_max_saturation
+    body = {
+        "status": "ready" if ready else "saturated",
+        "in_flight": controller.in_flight,
+        "max_in_flight": controller.max_in_flight,
+        "queue_depth": controller.queue_depth,
+        "max_queue": controller.max_queue,
+        "saturation": round(controller.saturation, 3) if limited else 0.0,
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Process-local counters, gauges and summaries."""
+    return metrics.snapshot()
+
+
+@router.get(
+    "/preview/{process_hash}",
+    response_class=Response,
+    responses={200: {"content": {"image/svg+xml": {}}, "description": "SVG preview of a converted diagram"}},
+)
+async def preview(process_hash: str, if_none_match: Optional[str] = Header(default=None)):
+    """SVG preview of a recent conversion, linked from ``/convert``'s ``X-BPMN-Preview`` header."""
+    # Previews are content-addressed, so the hash doubles as a strong ETag
+    headers = {"ETag": f'"{process_hash}"', "Cache-Control": "private, max-age=86400, immutable"}
+    if if_none_match == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    svg = get_preview_cache().get(process_hash)
+    if svg is None:
+        raise HTTPException(status_code=404, detail="Preview not found or expired")
+    return Response(content=svg, media_type="image/svg+xml", headers=headers)
+
+
+@router.get(
+    "/artifacts/{artifact_hash}",
+    response_class=Response,
+    responses={
+        200: {"content": {"application/xml": {}}, "description": "Stored BPMN 2.0 XML"},
+        206: {"content": {"application/xml": {}}, "description": "Requested byte range"},
+    },
+)
+async def artifact(
+    artifact_hash: str,
+    http_range: Optional[str] = Header(default=None, alias="Range"),
+    accept_encoding: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None),
+):
+    """Generated BPMN by content hash, linked from ``/convert``'s ``X-BPMN-Artifact`` header.
+
+    Streamed from disk with ``Range`` support. Clients accepting gzip get the
+    variant compressed at write time (whole-file requests only).
+    """
+    store = get_artifact_store()
+    path = store.path(artifact_hash) if store is not None else None
+    if path is None:
+        raise HTTPException(status_code=404, detail="Artifact not found or evicted")
+
+    gzip_path = store.gzip_path(artifact_hash) if http_range is None and _accepts_gzip(accept_encoding) else None
+    headers = {
+        # Content-addressed: the hash is a strong ETag and the bytes never change
+        "ETag": f'"{artifact_hash}-gzip"' if gzip_path is not None else f'"{artifact_hash}"',
+        "Cache-Control": "private, max-age=86400, immutable",
+        "Vary": "Accept-Encoding",
+    }
+    if if_none_match is not None and headers["ETag"] in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    if gzip_path is not None:
+        headers["Content-Encoding"] = "gzip"
+        path = gzip_path
+    return FileResponse(path, media_type="application/xml", headers=headers, filename=f"{artifact_hash}.bpmn")
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    for coding in (accept_encoding or "").split(","):
+        name, *params = (part.strip() for part in coding.split(";"))
+        if name.lower() not in ("gzip", "*"):
+            continue
+        quality = next((param[2:] for param in params if param.startswith("q=")), "1")
+        try:
+            return float(quality) > 0
+        except ValueError:
+            return False
+    return False
+
+
 @router.post(
     "/convert",
     response_class=Response,
     responses={200: {"content": {"application/xml": {}}, "description": "BPMN 2.0 XML output"}},
 )
-async def convert_sop_to_bpmn(file: UploadFile = File(...)):
+async def convert_sop_to_bpmn(
+    request: Request,
+    file: UploadFile = File(...),
+    x_profile: Optional[str] = Header(default=None),
+    x_admin_token: Optional[str] = Header(default=None),
+    context: RequestContext = Depends(get_request_context),
+):
     """Upload a .docx SOP file and receive BPMN 2.0 XML.
 
-    The pipeline: Parse .docx → LLM Analysis → BPMN Model → Layout → XML
+    The pipeline: Parse .docx → LLM Analysis → BPMN Model → Simplify → Layout → XML
+
+    A document holding several procedures (``PROCEDURE_HEADING_LEVEL``
+    headings) becomes one process per procedure in a single collaboration;
+    ``X-BPMN-Processes`` gives their number.
+
+    Admins can send ``X-Profile: 1`` with ``X-Admin-Token`` to capture a
+    profile of the pipeline; its id is returned in ``X-Profile-Id``. An SVG
+    preview of the diagram is linked from ``X-BPMN-Preview``, and the stored
+    BPMN, for downloading again without reconverting, from ``X-BPMN-Artifact``.
+
+    LLM capacity is shared fairly between tenants (``X-API-Key`` or
+    ``X-Tenant-ID``); ``X-Priority: batch`` yields to interactive uploads.
+
+    The conversion gets ``REQUEST_TIMEOUT_SECONDS`` (or a shorter
+    ``X-Request-Timeout``) and returns 504 once that runs out. If the client
+    disconnects, the in-flight LLM call and any queued stages are cancelled.
+
+    While the LLM's circuit breaker is open, SOPs are served from a cached
+    near-duplicate analysis or a heuristic reading of their paragraphs, or
+    get 503 with ``Retry-After`` if ``LLM_HEURISTIC_FALLBACK`` is off. Such a
+    degraded result says so in ``X-BPMN-Degraded`` and is neither stored as
+    an artifact nor previewed.
     """
     if not file.filename or not file.filename.endswith(".docx"):
         raise HTTPException(
@@ -42,37 +206,155 @@ async def convert_sop_to_bpmn(file: UploadFile = File(...)):
             detail="Only .docx files are supported. Please upload a .docx file.",
         )
 
+    settings = get_settings()
+    timer = StageTimer()
+    profiler = get_profiler()
+    trigger = profiler.trigger_for(requested=bool(x_profile) and is_admin(x_admin_token))
+    async with AsyncExitStack() as stack:
+        try:
+            document = await stack.enter_async_context(spool_upload(file, settings.max_upload_bytes))
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to read file: {e}")
+
+        with (
+            profiler.capture(trigger, file.filename) as capture,
+            use_request_context(context),
+            track_degraded() as degraded,
+        ):
+            try:
+                bpmn_processes, bpmn_xml = await cancel_on_disconnect(
+                    _run_pipeline(document, timer, capture),
+                    request.is_disconnected,
+                    settings.disconnect_poll_seconds,
+                )
+            except ClientDisconnected:
+                metrics.incr("requests_cancelled_total", stage=timer.current or "")
+                logger.info("Client disconnected during stage %s, conversion cancelled", timer.current)
+                # Nobody is listening; 499 is the de facto "client closed request" status
+                return Response(status_code=499)
+
+    output_filename = file.filename.replace(".docx", ".bpmn")
+    headers = {
+        "Content-Disposition": f'attachment; filename="{output_filename}"',
+        "Server-Timing": timer.server_timing(),
+        "X-BPMN-Processes": str(len(bpmn_processes)),
+    }
+    if degraded:
+        # A stand-in for the real diagram: keep it out of the caches, where it
+        # would outlive the outage
+        headers["X-BPMN-Degraded"] = ", ".join(sorted(degraded))
+    else:
+        # A multi-procedure document is previewed by its first process
+        headers["X-BPMN-Preview"] = f"/preview/{get_preview_cache().put(bpmn_processes[0])}"
+        artifact_key = await _store_artifact(bpmn_xml)
+        if artifact_key is not None:
+            headers["X-BPMN-Artifact"] = f"/artifacts/{artifact_key}"
+    if capture is not None:
+        # pstats and the snapshot dumps are CPU and disk work; keep them off the loop
+        await run_in_executor(get_cpu_executor(), "profile", partial(profiler.store.save, capture, timer.durations))
+        headers["X-Profile-Id"] = capture.profile_id
+    return Response(content=bpmn_xml, media_type="application/xml", headers=headers)
+
+
+async def _store_artifact(bpmn_xml: str) -> Optional[str]:
+    """Write the result to the artifact store; a storage failure does not fail the conversion."""
+    store = get_artifact_store()
+    if store is None:
+        return None
     try:
-        file_content = await file.read()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to read file: {e}")
+        return await run_in_executor(get_cpu_executor(), "store", lambda: store.put(bpmn_xml.encode("utf-8")))
+    except OSError:
+        logger.exception("Could not store BPMN artifact")
+        return None
+
+
+async def _run_pipeline(
+    document: BinaryIO,
+    timer: StageTimer,
+    capture: Optional[ProfileCapture] = None,
+) -> tuple[list[BPMNProcess], str]:
+    profiled = capture.section if capture is not None else nullcontext
+    executor = get_cpu_executor()
+    context = current_request()
+
+    async def cpu_stage(name: str, fn, *calls: tuple) -> list:
+        """Run ``fn(*args)`` for each ``args`` in ``calls`` on the executor.
+
+        There is one call per procedure. The stages are pure Python, so the
+        GIL runs the jobs one at a time and a stage still takes as long as
+        all of its procedures together; the jobs only keep that work off
+        the event loop and let other requests' coroutines run meanwhile.
+        """
+
+        # Runs on the executor thread, so the profiler must be enabled there too
+        def job(batch: tuple[tuple, ...]) -> list:
+            with profiled(name):
+                return [fn(*args) for args in batch]
+
+        # The profiler cannot follow several threads at once; profiled runs go one by one
+        batches = [calls] if capture is not None else [(args,) for args in calls]
+        with timer.stage(name):
+            jobs = (run_in_executor(executor, name, partial(job, batch)) for batch in batches)
+            results = await within_deadline(asyncio.gather(*jobs))
+        return [result for batch in results for result in batch]
 
     try:
-        # Step 1: Parse SOP (extract text + LLM analysis)
-        parser = get_parser()
-        sop_document = await parser.parse(file_content)
-        logger.info("Parsed SOP: %s with %d elements", sop_document.title, len(sop_document.elements))
+        # Step 1: Parse SOP (extract text + LLM analysis of each procedure),
+        # leaving part of the deadline for the CPU stages after it
+        parse_context = reserve(context, get_settings().deadline_reserve_seconds)
+        with timer.stage("parse"), use_request_context(parse_context):
+            parser = get_parser()
+            sop_documents = await within_deadline(parser.parse_all(document))
+        for sop_document in sop_documents:
+            logger.info("Parsed SOP: %s with %d elements", sop_document.title, len(sop_document.elements))
 
-        # Step 2: Build BPMN graph
-        builder = get_builder()
-        bpmn_process = builder.build(sop_document)
-        logger.info("Built BPMN: %d nodes, %d flows", len(bpmn_process.nodes), len(bpmn_process.sequence_flows))
+        # Step 2: Build one BPMN graph per procedure
+        bpmn_processes = await cpu_stage(
+            "build", get_builder().build, *((sop, i) for i, sop in enumerate(sop_documents, start=1))
+        )
+        for bpmn_process in bpmn_processes:
+            logger.info("Built BPMN: %d nodes, %d flows", len(bpmn_process.nodes), len(bpmn_process.sequence_flows))
+
+        # Step 3: Drop redundant gateways and flows before they are laid out
+        reports = await cpu_stage("simplify", get_simplifier().simplify, *((p,) for p in bpmn_processes))
+        for report in reports:
+            logger.info("Simplified BPMN: removed %d nodes, %d flows", report.nodes_removed, report.flows_removed)
 
-        # Step 3: Apply layout
-        layout_engine = get_layout_engine()
-        layout_engine.apply_layout(bpmn_process)
+        # Step 4: Lay out each process independently
+        await cpu_stage("layout", get_layout_engine().apply_layout, *((p,) for p in bpmn_processes))
 
-        # Step 4: Serialize to XML
-        xml_writer = get_xml_writer()
-        bpmn_xml = xml_writer.write(bpmn_process)
+        # Step 5: Serialize all processes into one definitions element
+        (bpmn_xml,) = await cpu_stage("write", get_xml_writer().write_all, (bpmn_processes,))
 
+    except TimeoutError as e:
+        # asyncio.wait_for at a stage deadline, or DeadlineExceeded from the LLM client
+        metrics.incr("requests_timed_out_total", stage=timer.current or "")
+        logger.warning("Conversion timed out in stage %s: %s", timer.current, e)
+        raise HTTPException(
+            status_code=504,
+            detail=f"Conversion did not finish within its deadline (stage: {timer.current})",
+            headers={"X-Failed-Stage": timer.current or "", "Server-Timing": timer.server_timing()},
+        )
+    except CircuitOpenError as e:
+        # The LLM is unhealthy and LLM_HEURISTIC_FALLBACK is off: fail fast
+        logger.warning("Conversion rejected in stage %s: %s", timer.current, e)
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={
+                "Retry-After": str(max(1, math.ceil(e.retry_after))),
+                "X-Failed-Stage": timer.current or "",
+                "Server-Timing": timer.server_timing(),
+            },
+        )
     except Exception as e:
-        logger.exception("Conversion failed")
-        raise HTTPException(status_code=422, detail=f"Failed to convert SOP to BPMN: {e}")
+        logger.exception("Conversion failed in stage %s", timer.current)
+        raise HTTPException(
+            status_code=422,
+            detail=f"Failed to convert SOP to BPMN: {e}",
+            headers={"X-Failed-Stage": timer.current or "", "Server-Timing": timer.server_timing()},
+        )
 
-    output_filename = file.filename.replace(".docx", ".bpmn")
-    return Response(
-        content=bpmn_xml,
-        media_type="application/xml",
-        headers={"Content-Disposition": f'attachment; filename="{output_filename}"'},
-    )
+    return bpmn_processes, bpmn_xml
@@ -0,0 +1,65 @@
+import re
+import secrets
+import time
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from src.config import get_settings
+from src.context import DEFAULT_TENANT, Priority, RequestContext
+
+_TENANT_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+def get_request_context(
+    x_api_key: Optional[str] = Header(default=None),
+    x_tenant_id: Optional[str] = Header(default=None),
+    x_priority: Optional[str] = Header(default=None),
+    x_request_timeout: Optional[float] = Header(default=None),
+) -> RequestContext:
+    """Identify the tenant, scheduling lane and deadline of a request.
+
+    An ``X-API-Key`` listed in ``TENANT_API_KEYS`` takes precedence over a
+    self-declared ``X-Tenant-ID``. A declared tenant that is not configured
+    anywhere counts as the default one: it is used as a scheduler key and a
+    metric label, so arbitrary names must not each get their own.
+    ``X-Priority: batch`` moves the request out
+    of the interactive lane. ``X-Request-Timeout`` (seconds) can shorten, but
+    not extend, ``REQUEST_TIMEOUT_SECONDS``, e.g. to match a proxy timeout.
+    """
+    if x_api_key is not None:
+        tenant = _tenant_for_key(x_api_key)
+        if tenant is None:
+            raise HTTPException(status_code=401, detail="Unknown API key")
+    elif x_tenant_id is not None:
+        if not _TENANT_ID_RE.match(x_tenant_id):
+            raise HTTPException(status_code=400, detail="Invalid X-Tenant-ID")
+        tenant = x_tenant_id if x_tenant_id in _known_tenants() else DEFAULT_TENANT
+    else:
+        tenant = DEFAULT_TENANT
+
+    try:
+        priority = Priority((x_priority or Priority.INTERACTIVE.value).lower())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="X-Priority must be 'interactive' or 'batch'")
+
+    timeout = get_settings().request_timeout_seconds or None
+    if x_request_timeout is not None:
+        if x_request_timeout <= 0:
+            raise HTTPException(status_code=400, detail="X-Request-Timeout must be a positive number of seconds")
+        timeout = min(timeout or x_request_timeout, x_request_timeout)
+    deadline = time.monotonic() + timeout if timeout else None
+    return RequestContext(tenant=tenant, priority=priority, deadline=deadline)
+
+
+def _tenant_for_key(api_key: str) -> Optional[str]:
+    # Header values may hold any Latin-1 character; compare_digest only takes ASCII str
+    for key, tenant in get_settings().tenant_api_keys.items():
+        if secrets.compare_digest(api_key.encode(), key.encode()):
+            return tenant
+    return None
+
+
+def _known_tenants() -> set[str]:
+    settings = get_settings()
+    return {*settings.tenant_weights, *settings.tenant_tokens_per_minute, *settings.tenant_api_keys.values()}
@@ -0,0 +1,25 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class StageTimer:
+    """Records wall-clock time per pipeline stage for the Server-Timing header."""
+
+    def __init__(self) -> None:
+        self.durations: dict[str, float] = {}
+        self.current: Optional[str] = None
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        self.current = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - started
+        self.current = None
+
+    def server_timing(self) -> str:
+        """Format durations as a ``Server-Timing`` header value (milliseconds)."""
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.durations.items())
@@ -0,0 +1,158 @@
+import io
+import json
+import mmap
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, BinaryIO, Optional
+
+from fastapi import UploadFile
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured size limit."""
+
+    def __init__(self, max_bytes: int) -> None:
+        super().__init__(f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit")
+        self.max_bytes = max_bytes
+
+
+class MappedFile(io.RawIOBase):
+    """Read-only, seekable file object over an mmap.
+
+    ``mmap`` objects lack ``seekable()`` before Python 3.13, which ``zipfile``
+    requires, so this wraps one in the ``io`` interface.
+    """
+
+    def __init__(self, mapping: mmap.mmap) -> None:
+        self._mapping = mapping
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        return self._mapping.read(None if size is None or size < 0 else size)
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self._mapping.seek(offset, whence)
+        return self._mapping.tell()
+
+    def tell(self) -> int:
+        return self._mapping.tell()
+
+
+@asynccontextmanager
+async def spool_upload(upload: UploadFile, max_bytes: int) -> AsyncIterator[BinaryIO]:
+    """Yield the uploaded file for reading, memory-mapped when possible.
+
+    The multipart parser has already spooled the file (a SpooledTemporaryFile
+    that rolls over to disk past 1 MB); it is mapped in place rather than
+    copied, so readers page it in on demand. ``fileno()`` rolls a small
+    in-memory upload over to disk first. Raises ``UploadTooLarge`` if the
+    file exceeds ``max_bytes``.
+    """
+    spool = upload.file
+    size = spool.seek(0, io.SEEK_END)
+    if size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+    spool.seek(0)
+    if size == 0:
+        # Zero-length files cannot be mapped
+        yield spool
+        return
+
+    with mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+        yield MappedFile(mapping)
+
+
+class UploadLimitMiddleware:
+    """Rejects request bodies larger than the upload limit with 413.
+
+    A declared ``Content-Length`` over the limit is refused before the body is
+    read. Otherwise (including chunked uploads, which declare no length) the
+    body is counted as it is received, and the request is cut off with 413 as
+    soon as it passes the limit; nothing beyond it is read or spooled.
+    """
+
+    def __init__(self, app, max_bytes: int, paths: tuple[str, ...] = ("/convert",)) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.max_bytes + MULTIPART_OVERHEAD_BYTES
+        content_length = _content_length(scope)
+        if content_length is not None and content_length > limit:
+            await send_json(send, 413, {"detail": str(UploadTooLarge(self.max_bytes))})
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def counting_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise UploadTooLarge(self.max_bytes)
+            return message
+
+        async def guarded_send(message) -> None:
+            nonlocal response_started
+            # The app's error response to the aborted read is replaced by the 413
+            if exceeded and not response_started:
+                return
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded and not response_started:
+            await send_json(send, 413, {"detail": str(UploadTooLarge(self.max_bytes))})
+
+
+def _content_length(scope) -> Optional[int]:
+    for name, value in scope["headers"]:
+        if name == b"content-length":
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+async def send_json(send, status: int, payload: dict, headers: tuple[tuple[bytes, bytes], ...] = ()) -> None:
+    """Send a complete JSON response from ASGI middleware, closing the connection."""
+    body = json.dumps(payload).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+                *headers,
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,175 @@
+"""Offline bulk conversion: ``sop2bpmn <input-dir> -o <output-dir>``.
+
+Walks a directory tree of .docx SOPs and writes one .bpmn per document,
+mirroring the input tree. A document holding several procedures becomes one
+process per procedure in its .bpmn. Text extraction, layout and serialisation run in a
+process pool; LLM calls run concurrently on one event loop under a global cap.
+Existing outputs newer than their input are skipped, so an interrupted run
+resumes where it stopped.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+from src.api.dependencies import get_analyzer
+from src.config import get_settings
+from src.context import Priority, RequestContext, use_request_context
+from src.generator.bpmn_builder import BPMNBuilder
+from src.generator.bpmn_xml_writer import BPMNXMLWriter
+from src.generator.layout import LayoutEngine
+from src.generator.simplifier import GraphSimplifier
+from src.models.sop import SOPDocument
+from src.parser.base import BaseSOPAnalyzer
+from src.parser.docx_parser import extract_procedures
+
+logger = logging.getLogger("sop2bpmn")
+
+
+@dataclass
+class RunSummary:
+    found: int = 0
+    converted: int = 0
+    skipped: int = 0
+    failed: list[tuple[Path, str]] = field(default_factory=list)
+    stage_seconds: dict[str, float] = field(default_factory=lambda: {"extract": 0.0, "llm": 0.0, "render": 0.0})
+    elapsed: float = 0.0
+
+    def format(self) -> str:
+        rate = self.converted / self.elapsed if self.elapsed else 0.0
+        lines = [
+            f"found {self.found}, converted {self.converted}, skipped {self.skipped}, failed {len(self.failed)}",
+            f"elapsed {self.elapsed:.1f}s, throughput {rate:.2f} docs/s",
+            "stage time (summed over documents): "
+            + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.stage_seconds.items()),
+        ]
+        lines += [f"  FAILED {path}: {error}" for path, error in self.failed]
+        return "\n".join(lines)
+
+
+def render_bpmn(sops: list[SOPDocument]) -> str:
+    """Build, simplify, lay out and serialise one process per SOPDocument. Runs in a worker process."""
+    processes = [BPMNBuilder().build(sop, index) for index, sop in enumerate(sops, start=1)]
+    for process in processes:
+        GraphSimplifier().simplify(process)
+        LayoutEngine().apply_layout(process)
+    return BPMNXMLWriter().write_all(processes)
+
+
+def output_path_for(source: Path, input_dir: Path, output_dir: Path) -> Path:
+    return (output_dir / source.relative_to(input_dir)).with_suffix(".bpmn")
+
+
+def is_up_to_date(source: Path, target: Path) -> bool:
+    return target.exists() and target.stat().st_mtime >= source.stat().st_mtime
+
+
+def _write_atomic(target: Path, content: str) -> None:
+    """Write via a temporary file so an interrupted run never leaves a partial output."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.tmp")
+    tmp.write_text(content, encoding="utf-8")
+    os.replace(tmp, target)
+
+
+async def convert_tree(
+    input_dir: Path,
+    output_dir: Path,
+    analyzer: BaseSOPAnalyzer,
+    pool: Executor,
+    llm_concurrency: int,
+    force: bool = False,
+    procedure_heading_level: int = 1,
+) -> RunSummary:
+    summary = RunSummary()
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    llm_slots = asyncio.Semaphore(llm_concurrency)
+    # Bound documents in flight so a huge tree does not queue every extraction
+    # at once; twice the LLM cap keeps the pool busy while calls are outstanding.
+    in_flight = asyncio.Semaphore(llm_concurrency * 2)
+
+    sources = sorted(p for p in input_dir.rglob("*.docx") if not p.name.startswith("~$"))
+    summary.found = len(sources)
+
+    async def analyze(text: str) -> SOPDocument:
+        async with llm_slots:
+            return await analyzer.analyze(text)
+
+    async def convert(source: Path) -> None:
+        target = output_path_for(source, input_dir, output_dir)
+        if not force and is_up_to_date(source, target):
+            summary.skipped += 1
+            return
+        async with in_flight:
+            try:
+                t0 = time.perf_counter()
+                extract = partial(extract_procedures, str(source), procedure_heading_level)
+                procedures = await loop.run_in_executor(pool, extract)
+                t1 = time.perf_counter()
+                sops = await asyncio.gather(*(analyze(text) for text in procedures))
+                t2 = time.perf_counter()
+                xml = await loop.run_in_executor(pool, render_bpmn, sops)
+                t3 = time.perf_counter()
+                _write_atomic(target, xml)
+            except Exception as e:
+                logger.warning("Failed to convert %s: %s", source, e)
+                summary.failed.append((source, str(e)))
+                return
+        summary.converted += 1
+        summary.stage_seconds["extract"] += t1 - t0
+        summary.stage_seconds["llm"] += t2 - t1
+        summary.stage_seconds["render"] += t3 - t2
+        logger.info("Converted %s -> %s", source, target)
+
+    await asyncio.gather(*(convert(source) for source in sources))
+    summary.elapsed = time.perf_counter() - started
+    return summary
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="sop2bpmn", description="Convert a directory tree of .docx SOPs to BPMN.")
+    parser.add_argument("input_dir", type=Path, help="Directory searched recursively for .docx files")
+    parser.add_argument("-o", "--output-dir", type=Path, help="Output directory (default: alongside the inputs)")
+    parser.add_argument("-c", "--llm-concurrency", type=int, default=8, help="Max concurrent LLM calls (default: 8)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Reconvert documents that already have an output")
+    parser.add_argument("--tenant", default="cli", help="Tenant charged for LLM usage (default: cli)")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(name)s %(levelname)s %(message)s",
+    )
+    if not args.input_dir.is_dir():
+        parser.error(f"{args.input_dir} is not a directory")
+
+    # Bulk runs are batch work; the tenant labels their LLM scheduling metrics
+    context = RequestContext(tenant=args.tenant, priority=Priority.BATCH)
+    with ProcessPoolExecutor(max_workers=args.workers) as pool, use_request_context(context):
+        summary = asyncio.run(
+            convert_tree(
+                args.input_dir,
+                args.output_dir or args.input_dir,
+                get_analyzer(llm_concurrency=args.llm_concurrency),
+                pool,
+                llm_concurrency=args.llm_concurrency,
+                force=args.force,
+                procedure_heading_level=get_settings().procedure_heading_level,
+            )
+        )
+    print(summary.format())
+    return 1 if summary.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
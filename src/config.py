@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 
 from pydantic_settings import BaseSettings
 
@@ -8,11 +9,110 @@ class Settings(BaseSettings):
 
     azure_openai_api_key: str = ""
     azure_openai_endpoint: str = ""
-    azure_openai_api_version: str = "2024-02-01"
+    azure_openai_api_version: str = "2024-10-21"
     azure_openai_deployment: str = "gpt-4o"
+    azure_openai_max_retries: int = 2
+    # json_schema (structured outputs) | json_object | text
+    azure_openai_output_format: str = "json_schema"
+    # standard | compact (short keys, bare-string steps: fewer completion tokens)
+    llm_wire_format: str = "standard"
+    # Follow-up calls allowed when output stops at max_tokens
+    llm_max_continuations: int = 3
+    azure_openai_timeout_seconds: float = 60.0
+
+    # Size-aware routing: SOPs scoring up to routing_small_max_score go to the
+    # small deployment, above routing_large_min_score to the large one, the
+    # rest to azure_openai_deployment. An empty deployment disables its tier.
+    azure_openai_small_deployment: str = ""
+    azure_openai_large_deployment: str = ""
+    routing_small_max_score: float = 1500.0
+    routing_large_min_score: float = 6000.0
+    llm_small_max_tokens: int = 2048
+    llm_max_tokens: int = 4096
+    llm_large_max_tokens: int = 16384
+
+    # Fair sharing of LLM capacity. Tenants are identified by X-API-Key (via
+    # tenant_api_keys, key -> tenant) or X-Tenant-ID. Dict settings are JSON in
+    # the environment, e.g. TENANT_WEIGHTS='{"web": 3, "migration": 1}'.
+    llm_max_concurrency: int = 8
+    tenant_api_keys: dict[str, str] = {}
+    tenant_weights: dict[str, float] = {}
+    tenant_tokens_per_minute: dict[str, int] = {}
+    default_tenant_weight: float = 1.0
+    # 0 = unlimited
+    default_tenant_tokens_per_minute: int = 0
+
+    # Micro-batching: SOPs of up to llm_batch_max_chars routed to the smallest
+    # tier are held for llm_batch_max_wait_ms and sent up to llm_batch_max_size
+    # per LLM request (a size of 0 or 1 disables batching)
+    llm_batch_max_size: int = 0
+    llm_batch_max_wait_ms: float = 5.0
+    llm_batch_max_chars: int = 2000
+
+    # Near-duplicate reuse: an SOP whose text is at least near_duplicate_threshold
+    # similar (estimated Jaccard over character shingles) to one of the last
+    # near_duplicate_cache_entries analyses is derived from it (0 disables)
+    near_duplicate_cache_entries: int = 10_000
+    near_duplicate_threshold: float = 0.9
+
+    # Circuit breaker per LLM deployment: after llm_breaker_failure_threshold
+    # consecutive failed (connection error, timeout, 429, 5xx) or slower than
+    # llm_breaker_slow_call_seconds calls, calls fail fast for
+    # llm_breaker_open_seconds, then one probe call tests recovery (0 disables).
+    # While it is open, SOPs without a cached analysis get a structure guessed
+    # from their paragraphs, or 503 + Retry-After if llm_heuristic_fallback is off.
+    llm_breaker_failure_threshold: int = 5
+    llm_breaker_slow_call_seconds: float = 45.0
+    llm_breaker_open_seconds: float = 30.0
+    llm_heuristic_fallback: bool = True
+
+    # Admin endpoints and profiling (admin is disabled while the token is empty)
+    admin_token: str = ""
+    profiling_sample_rate: float = 0.0
+    profile_dir: str = "profiles"
+    profile_retention: int = 50
+
+    # Uploads
+    max_upload_bytes: int = 50 * 1024 * 1024
+    # Documents with two or more headings of this level are split into one
+    # process per heading, analyzed concurrently (0 disables splitting)
+    procedure_heading_level: int = 1
+
+    # Admission control for /convert (0 disables the cap). Requests beyond
+    # max_concurrent_conversions wait in a queue of max_queued_conversions for
+    # up to admission_queue_timeout_seconds, then get 503 + Retry-After.
+    max_concurrent_conversions: int = 16
+    max_queued_conversions: int = 32
+    admission_queue_timeout_seconds: float = 30.0
+    # /health/ready reports not-ready above this share of slots + queue in use
+    readiness_max_saturation: float = 0.8
+
+    # Deadlines: each /convert gets request_timeout_seconds (0 = none; clients
+    # may ask for less with X-Request-Timeout) and returns 504 when it runs
+    # out. The LLM stage must finish deadline_reserve_seconds early so build,
+    # simplify, layout and write still fit. A disconnected client is noticed
+    # within disconnect_poll_seconds and its work cancelled.
+    request_timeout_seconds: float = 120.0
+    deadline_reserve_seconds: float = 5.0
+    disconnect_poll_seconds: float = 0.5
+    # Threads for text extraction and the graph stages, off the event loop
+    cpu_workers: int = 4
+
+    # Generated BPMN kept on disk for GET /artifacts/{hash} (0 disables)
+    artifact_dir: str = "artifacts"
+    artifact_store_max_bytes: int = 1024 * 1024 * 1024
+
+    # SVG previews kept in memory for GET /preview/{hash}
+    preview_cache_entries: int = 256
+
+    # Layouts kept per graph shape (node types and edges), reused for SOPs of
+    # the same shape; 0 disables the cache
+    layout_cache_entries: int = 1024
 
     model_config = {"env_file": ".env", "extra": "ignore"}
 
 
+@lru_cache
 def get_settings() -> Settings:
+    """Application settings, read from the environment once per process."""
     return Settings()
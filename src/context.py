@@ -0,0 +1,59 @@
+"""Per-request context carried through the pipeline in a ContextVar.
+
+Set once at the edge (the ``/convert`` route, the CLI) and read by layers that
+need to know who a call is for or how long it may take, such as the LLM
+scheduler and the LLM client timeout, without threading extra arguments
+through ``BaseSOPParser`` / ``BaseSOPAnalyzer``. Tasks created inside the
+context inherit it.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from enum import Enum
+from typing import Iterator, Optional
+
+
+class Priority(Enum):
+    """Scheduling lane. Interactive work is always served before batch work."""
+
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+
+
+DEFAULT_TENANT = "default"
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when work is started or still running after its deadline."""
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    tenant: str = DEFAULT_TENANT
+    priority: Priority = Priority.INTERACTIVE
+    # time.monotonic() by which the current stage must finish; None = no limit
+    deadline: Optional[float] = None
+
+    def time_left(self) -> Optional[float]:
+        """Seconds until the deadline (never negative), or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+
+_current: ContextVar[RequestContext] = ContextVar("request_context", default=RequestContext())
+
+
+def current_request() -> RequestContext:
+    return _current.get()
+
+
+@contextmanager
+def use_request_context(context: RequestContext) -> Iterator[RequestContext]:
+    token = _current.set(context)
+    try:
+        yield context
+    finally:
+        _current.reset(token)
@@ -1,134 +1,191 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Iterator, Optional, Union
+
 from src.models.bpmn import BPMNNode, BPMNNodeType, BPMNProcess, BPMNSequenceFlow
-from src.models.sop import SOPDocument, SOPElement, SOPElementType
+from src.models.sop import SOPBranch, SOPDocument, SOPElement, SOPElementType
+
+_ID_PREFIXES = {
+    BPMNNodeType.START_EVENT: "StartEvent",
+    BPMNNodeType.END_EVENT: "EndEvent",
+    BPMNNodeType.TASK: "Task",
+    BPMNNodeType.EXCLUSIVE_GATEWAY: "Gateway",
+    BPMNNodeType.CONVERGING_GATEWAY: "Gateway",
+}
+
+
+@dataclass
+class _BuildState:
+    """Per-build mutable state. Lives on the stack, never on the builder."""
+
+    process: BPMNProcess
+    # Keeps ids unique when several processes share one definitions file
+    id_prefix: str = ""
+    node_ids: Iterator[int] = field(default_factory=lambda: count(1))
+    flow_ids: Iterator[int] = field(default_factory=lambda: count(1))
+
+
+@dataclass
+class _SequenceFrame:
+    """Walks a list of elements, chaining each one after the previous node."""
+
+    elements: Iterator[SOPElement]
+    last_node_id: str
+    # Label for the flow into the first element (a branch's condition label)
+    pending_label: str = ""
+    # Converging gateway to connect to once the sequence is exhausted
+    join_node_id: Optional[str] = None
+
+
+@dataclass
+class _DecisionFrame:
+    """Walks the branches of a decision between its gateway pair."""
+
+    branches: Iterator[SOPBranch]
+    div_gateway_id: str
+    conv_gateway_id: str
 
 
 class BPMNBuilder:
-    """Converts a parsed SOPDocument into a BPMNProcess graph."""
+    """Converts a parsed SOPDocument into a BPMNProcess graph.
+
+    The builder keeps no per-build state on the instance, so a single instance
+    can be shared across threads. Nested decisions are walked with an explicit
+    stack rather than recursion, so nesting depth is bounded only by memory.
+    """
 
-    def __init__(self) -> None:
-        self._node_counter: int = 0
-        self._flow_counter: int = 0
+    def build(self, sop: SOPDocument, index: int = 1) -> BPMNProcess:
+        """Build the process for ``sop``.
 
-    def build(self, sop: SOPDocument) -> BPMNProcess:
-        process = BPMNProcess(name=sop.title)
+        ``index`` numbers the processes of a multi-procedure document: process
+        ``index`` gets id ``Process_<index>``, and from the second one on its
+        node and flow ids are prefixed with ``P<index>_``.
+        """
+        process = BPMNProcess(id=f"Process_{index}", name=sop.title)
+        state = _BuildState(process=process, id_prefix="" if index == 1 else f"P{index}_")
 
-        start_node = self._make_node(BPMNNodeType.START_EVENT, f"{sop.title} Started")
-        process.nodes.append(start_node)
+        start_node = self._make_node(state, BPMNNodeType.START_EVENT, f"{sop.title} Started")
 
-        last_node_id = self._process_elements(sop.elements, process, start_node.id)
+        last_node_id = self._process_elements(state, sop.elements, start_node.id)
 
-        end_node = self._make_node(BPMNNodeType.END_EVENT, f"{sop.title} Completed")
-        process.nodes.append(end_node)
-        self._add_flow(process, last_node_id, end_node.id)
+        end_node = self._make_node(state, BPMNNodeType.END_EVENT, f"{sop.title} Completed")
+        self._add_flow(state, last_node_id, end_node.id)
 
-        return process
+        return state.process
 
     def _process_elements(
         self,
+        state: _BuildState,
         elements: list[SOPElement],
-        process: BPMNProcess,
         last_node_id: str,
     ) -> str:
         """Process a list of SOP elements, returning the ID of the last node."""
-        for element in elements:
+        root = _SequenceFrame(elements=iter(elements), last_node_id=last_node_id)
+        stack: list[Union[_SequenceFrame, _DecisionFrame]] = [root]
+
+        while stack:
+            frame = stack[-1]
+
+            if isinstance(frame, _DecisionFrame):
+                branch = next(frame.branches, None)
+                if branch is None:
+                    stack.pop()
+                elif branch.steps:
+                    stack.append(
+                        _SequenceFrame(
+                            elements=iter(branch.steps),
+                            last_node_id=frame.div_gateway_id,
+                            pending_label=branch.condition_label,
+                            join_node_id=frame.conv_gateway_id,
+                        )
+                    )
+                else:
+                    # Empty branch — direct flow
+                    self._add_flow(
+                        state,
+                        frame.div_gateway_id,
+                        frame.conv_gateway_id,
+                        name=branch.condition_label,
+                    )
+                continue
+
+            element = next(frame.elements, None)
+            if element is None:
+                stack.pop()
+                if frame.join_node_id is not None:
+                    self._add_flow(state, frame.last_node_id, frame.join_node_id)
+                continue
+
+            flow_name, frame.pending_label = frame.pending_label, ""
+
             if element.element_type == SOPElementType.STEP:
-                task = self._make_node(BPMNNodeType.TASK, element.text)
-                process.nodes.append(task)
-                self._add_flow(process, last_node_id, task.id)
-                last_node_id = task.id
+                task = self._make_node(state, BPMNNodeType.TASK, element.text)
+                self._add_flow(state, frame.last_node_id, task.id, name=flow_name)
+                frame.last_node_id = task.id
 
             elif element.element_type == SOPElementType.DECISION:
-                last_node_id = self._process_decision(element, process, last_node_id)
+                decision_frame = self._open_decision(state, element, frame.last_node_id, flow_name)
+                # The sequence resumes from the converging gateway once all
+                # branches of the decision have been walked.
+                frame.last_node_id = decision_frame.conv_gateway_id
+                stack.append(decision_frame)
 
-        return last_node_id
+        return root.last_node_id
 
-    def _process_decision(
+    def _open_decision(
         self,
+        state: _BuildState,
         element: SOPElement,
-        process: BPMNProcess,
         last_node_id: str,
-    ) -> str:
-        """Build diverging gateway -> branch tasks -> converging gateway."""
+        flow_name: str,
+    ) -> _DecisionFrame:
+        """Create the diverging/converging gateway pair for a decision."""
         decision = element.decision
 
         # Diverging gateway
         div_gateway = self._make_node(
+            state,
             BPMNNodeType.EXCLUSIVE_GATEWAY,
             decision.question if decision else element.text,
         )
-        process.nodes.append(div_gateway)
-        self._add_flow(process, last_node_id, div_gateway.id)
+        self._add_flow(state, last_node_id, div_gateway.id, name=flow_name)
 
         # Converging gateway
-        conv_gateway = self._make_node(BPMNNodeType.CONVERGING_GATEWAY, "")
-        process.nodes.append(conv_gateway)
+        conv_gateway = self._make_node(state, BPMNNodeType.CONVERGING_GATEWAY, "")
 
         if not decision or not decision.branches:
             # No branches — direct flow through
-            self._add_flow(process, div_gateway.id, conv_gateway.id)
-            return conv_gateway.id
-
-        for branch in decision.branches:
-            if branch.steps:
-                branch_last_id = div_gateway.id
-                is_first = True
-                for step in branch.steps:
-                    if step.element_type == SOPElementType.STEP:
-                        task = self._make_node(BPMNNodeType.TASK, step.text)
-                        process.nodes.append(task)
-                        flow_name = branch.condition_label if is_first else ""
-                        self._add_flow(process, branch_last_id, task.id, name=flow_name)
-                        branch_last_id = task.id
-                        is_first = False
-                    elif step.element_type == SOPElementType.DECISION:
-                        if is_first:
-                            # Label the flow from gateway to nested decision
-                            self._add_flow(
-                                process,
-                                branch_last_id,
-                                "",  # placeholder, will be set by recursive call
-                                name=branch.condition_label,
-                            )
-                        branch_last_id = self._process_decision(step, process, branch_last_id)
-                        is_first = False
-
-                self._add_flow(process, branch_last_id, conv_gateway.id)
-            else:
-                # Empty branch — direct flow
-                self._add_flow(
-                    process,
-                    div_gateway.id,
-                    conv_gateway.id,
-                    name=branch.condition_label,
-                )
-
-        return conv_gateway.id
-
-    def _make_node(self, node_type: BPMNNodeType, name: str) -> BPMNNode:
-        self._node_counter += 1
-        prefix_map = {
-            BPMNNodeType.START_EVENT: "StartEvent",
-            BPMNNodeType.END_EVENT: "EndEvent",
-            BPMNNodeType.TASK: "Task",
-            BPMNNodeType.EXCLUSIVE_GATEWAY: "Gateway",
-            BPMNNodeType.CONVERGING_GATEWAY: "Gateway",
-        }
-        prefix = prefix_map[node_type]
-        return BPMNNode(id=f"{prefix}_{self._node_counter}", node_type=node_type, name=name)
+            self._add_flow(state, div_gateway.id, conv_gateway.id)
+            branches: Iterator[SOPBranch] = iter(())
+        else:
+            branches = iter(decision.branches)
+
+        return _DecisionFrame(
+            branches=branches,
+            div_gateway_id=div_gateway.id,
+            conv_gateway_id=conv_gateway.id,
+        )
+
+    def _make_node(self, state: _BuildState, node_type: BPMNNodeType, name: str) -> BPMNNode:
+        node_id = f"{state.id_prefix}{_ID_PREFIXES[node_type]}_{next(state.node_ids)}"
+        node = BPMNNode(id=node_id, node_type=node_type, name=name)
+        state.process.nodes.append(node)
+        return node
 
     def _add_flow(
         self,
-        process: BPMNProcess,
+        state: _BuildState,
         source_ref: str,
         target_ref: str,
         name: str = "",
     ) -> BPMNSequenceFlow:
-        self._flow_counter += 1
         flow = BPMNSequenceFlow(
-            id=f"Flow_{self._flow_counter}",
+            id=f"{state.id_prefix}Flow_{next(state.flow_ids)}",
             source_ref=source_ref,
             target_ref=target_ref,
             name=name,
         )
-        process.sequence_flows.append(flow)
+        state.process.sequence_flows.append(flow)
         return flow
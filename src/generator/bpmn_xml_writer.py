@@ -1,6 +1,8 @@
 import xml.etree.ElementTree as ET
+from collections import defaultdict
+from typing import Sequence
 
-from src.models.bpmn import BPMNNodeType, BPMNProcess
+from src.models.bpmn import BPMNNode, BPMNNodeType, BPMNProcess, BPMNSequenceFlow
 
 # BPMN 2.0 Namespaces (compatible with bpmn.io)
 NS_BPMN = "http://www.omg.org/spec/BPMN/20100524/MODEL"
@@ -9,33 +11,71 @@ NS_DC = "http://www.omg.org/spec/DD/20100524/DC"
 NS_DI = "http://www.omg.org/spec/DD/20100524/DI"
 TARGET_NAMESPACE = "http://bpmn.io/schema/bpmn"
 
+# Prefixes are process-global in ElementTree; register them once at import
+ET.register_namespace("bpmn", NS_BPMN)
+ET.register_namespace("bpmndi", NS_BPMNDI)
+ET.register_namespace("dc", NS_DC)
+ET.register_namespace("di", NS_DI)
+
+_NODE_TAGS = {
+    BPMNNodeType.START_EVENT: f"{{{NS_BPMN}}}startEvent",
+    BPMNNodeType.END_EVENT: f"{{{NS_BPMN}}}endEvent",
+    BPMNNodeType.TASK: f"{{{NS_BPMN}}}task",
+    BPMNNodeType.EXCLUSIVE_GATEWAY: f"{{{NS_BPMN}}}exclusiveGateway",
+    BPMNNodeType.CONVERGING_GATEWAY: f"{{{NS_BPMN}}}exclusiveGateway",
+}
+_INCOMING = f"{{{NS_BPMN}}}incoming"
+_OUTGOING = f"{{{NS_BPMN}}}outgoing"
+_SEQUENCE_FLOW = f"{{{NS_BPMN}}}sequenceFlow"
+_SHAPE = f"{{{NS_BPMNDI}}}BPMNShape"
+_EDGE = f"{{{NS_BPMNDI}}}BPMNEdge"
+_BOUNDS = f"{{{NS_DC}}}Bounds"
+_WAYPOINT = f"{{{NS_DI}}}waypoint"
+_COLLABORATION = f"{{{NS_BPMN}}}collaboration"
+_PARTICIPANT = f"{{{NS_BPMN}}}participant"
+
+# Pools of a multi-process collaboration: space around each laid-out process,
+# the band on the left holding the pool's name, and the gap between pools
+POOL_PADDING = 40
+POOL_LABEL_WIDTH = 30
+POOL_GAP = 40
+
 
 class BPMNXMLWriter:
-    """Serializes a BPMNProcess to BPMN 2.0 XML."""
+    """Serializes a BPMNProcess to BPMN 2.0 XML.
+
+    Stateless; one instance can be shared across requests and threads.
+    """
 
     def write(self, process: BPMNProcess) -> str:
-        ET.register_namespace("bpmn", NS_BPMN)
-        ET.register_namespace("bpmndi", NS_BPMNDI)
-        ET.register_namespace("dc", NS_DC)
-        ET.register_namespace("di", NS_DI)
+        return self.write_all([process])
 
+    def write_all(self, processes: Sequence[BPMNProcess]) -> str:
+        """Serialize one or more laid-out processes into a single definitions element.
+
+        Several processes are wrapped in a collaboration with one pool each,
+        stacked top to bottom in one diagram. Each process keeps its own
+        layout; the offset that stacks it is applied while writing, so the
+        processes themselves are not modified.
+        """
         definitions = ET.Element(f"{{{NS_BPMN}}}definitions")
         definitions.set("id", "Definitions_1")
         definitions.set("targetNamespace", TARGET_NAMESPACE)
         definitions.set("exporter", "SOP to BPMN Converter")
         definitions.set("exporterVersion", "1.0.0")
 
-        # <bpmn:process>
-        proc_elem = ET.SubElement(definitions, f"{{{NS_BPMN}}}process")
-        proc_elem.set("id", process.id)
-        proc_elem.set("name", process.name)
-        proc_elem.set("isExecutable", "true")
-
-        for node in process.nodes:
-            self._write_node(proc_elem, node, process)
+        pools = _stack_pools(processes) if len(processes) > 1 else []
+        if pools:
+            collaboration = ET.SubElement(definitions, _COLLABORATION)
+            collaboration.set("id", "Collaboration_1")
+            for i, process in enumerate(processes, start=1):
+                participant = ET.SubElement(collaboration, _PARTICIPANT)
+                participant.set("id", f"Participant_{i}")
+                participant.set("name", process.name)
+                participant.set("processRef", process.id)
 
-        for flow in process.sequence_flows:
-            self._write_sequence_flow(proc_elem, flow)
+        for process in processes:
+            self._write_process(definitions, process)
 
         # <bpmndi:BPMNDiagram>
         diagram = ET.SubElement(definitions, f"{{{NS_BPMNDI}}}BPMNDiagram")
@@ -43,67 +83,123 @@ class BPMNXMLWriter:
 
         plane = ET.SubElement(diagram, f"{{{NS_BPMNDI}}}BPMNPlane")
         plane.set("id", "BPMNPlane_1")
-        plane.set("bpmnElement", process.id)
-
-        for node in process.nodes:
-            self._write_shape(plane, node)
-
-        for flow in process.sequence_flows:
-            self._write_edge(plane, flow)
+        plane.set("bpmnElement", "Collaboration_1" if pools else processes[0].id)
+
+        for i, (x, y, width, height, _) in enumerate(pools, start=1):
+            shape = ET.SubElement(plane, _SHAPE)
+            shape.set("id", f"Participant_{i}_di")
+            shape.set("bpmnElement", f"Participant_{i}")
+            shape.set("isHorizontal", "true")
+            _set_bounds(shape, x, y, width, height)
+
+        for i, process in enumerate(processes):
+            dy = pools[i][4] if pools else 0.0
+            for node in process.nodes:
+                self._write_shape(plane, node, dy)
+            for flow in process.sequence_flows:
+                self._write_edge(plane, flow, dy)
 
         ET.indent(definitions, space="  ")
         xml_str = ET.tostring(definitions, encoding="unicode", xml_declaration=False)
         return '<?xml version="1.0" encoding="UTF-8"?>\n' + xml_str
 
-    def _write_node(self, parent: ET.Element, node, process: BPMNProcess) -> None:
-        xml_tag_map = {
-            BPMNNodeType.START_EVENT: "startEvent",
-            BPMNNodeType.END_EVENT: "endEvent",
-            BPMNNodeType.TASK: "task",
-            BPMNNodeType.EXCLUSIVE_GATEWAY: "exclusiveGateway",
-            BPMNNodeType.CONVERGING_GATEWAY: "exclusiveGateway",
-        }
-        tag = xml_tag_map[node.node_type]
-        elem = ET.SubElement(parent, f"{{{NS_BPMN}}}{tag}")
+    def _write_process(self, definitions: ET.Element, process: BPMNProcess) -> None:
+        # Flow ids per node, in flow order, so each node's references are a lookup
+        incoming: defaultdict[str, list[str]] = defaultdict(list)
+        outgoing: defaultdict[str, list[str]] = defaultdict(list)
+        for flow in process.sequence_flows:
+            incoming[flow.target_ref].append(flow.id)
+            outgoing[flow.source_ref].append(flow.id)
+
+        # <bpmn:process>
+        proc_elem = ET.SubElement(definitions, f"{{{NS_BPMN}}}process")
+        proc_elem.set("id", process.id)
+        proc_elem.set("name", process.name)
+        proc_elem.set("isExecutable", "true")
+
+        for node in process.nodes:
+            self._write_node(proc_elem, node, incoming[node.id], outgoing[node.id])
+
+        for flow in process.sequence_flows:
+            self._write_sequence_flow(proc_elem, flow)
+
+    def _write_node(
+        self,
+        parent: ET.Element,
+        node: BPMNNode,
+        incoming: list[str],
+        outgoing: list[str],
+    ) -> None:
+        elem = ET.SubElement(parent, _NODE_TAGS[node.node_type])
         elem.set("id", node.id)
         if node.name:
             elem.set("name", node.name)
 
         # Add incoming/outgoing references
-        for flow in process.sequence_flows:
-            if flow.target_ref == node.id:
-                inc = ET.SubElement(elem, f"{{{NS_BPMN}}}incoming")
-                inc.text = flow.id
-        for flow in process.sequence_flows:
-            if flow.source_ref == node.id:
-                out = ET.SubElement(elem, f"{{{NS_BPMN}}}outgoing")
-                out.text = flow.id
+        for flow_id in incoming:
+            ET.SubElement(elem, _INCOMING).text = flow_id
+        for flow_id in outgoing:
+            ET.SubElement(elem, _OUTGOING).text = flow_id
 
-    def _write_sequence_flow(self, parent: ET.Element, flow) -> None:
-        elem = ET.SubElement(parent, f"{{{NS_BPMN}}}sequenceFlow")
+    def _write_sequence_flow(self, parent: ET.Element, flow: BPMNSequenceFlow) -> None:
+        elem = ET.SubElement(parent, _SEQUENCE_FLOW)
         elem.set("id", flow.id)
         elem.set("sourceRef", flow.source_ref)
         elem.set("targetRef", flow.target_ref)
         if flow.name:
             elem.set("name", flow.name)
 
-    def _write_shape(self, plane: ET.Element, node) -> None:
-        shape = ET.SubElement(plane, f"{{{NS_BPMNDI}}}BPMNShape")
+    def _write_shape(self, plane: ET.Element, node: BPMNNode, dy: float = 0.0) -> None:
+        shape = ET.SubElement(plane, _SHAPE)
         shape.set("id", f"{node.id}_di")
         shape.set("bpmnElement", node.id)
+        _set_bounds(shape, node.x, node.y + dy, node.width, node.height)
 
-        bounds = ET.SubElement(shape, f"{{{NS_DC}}}Bounds")
-        bounds.set("x", str(int(node.x)))
-        bounds.set("y", str(int(node.y)))
-        bounds.set("width", str(int(node.width)))
-        bounds.set("height", str(int(node.height)))
-
-    def _write_edge(self, plane: ET.Element, flow) -> None:
-        edge = ET.SubElement(plane, f"{{{NS_BPMNDI}}}BPMNEdge")
+    def _write_edge(self, plane: ET.Element, flow: BPMNSequenceFlow, dy: float = 0.0) -> None:
+        edge = ET.SubElement(plane, _EDGE)
         edge.set("id", f"{flow.id}_di")
         edge.set("bpmnElement", flow.id)
 
         for wp in flow.waypoints:
-            waypoint = ET.SubElement(edge, f"{{{NS_DI}}}waypoint")
+            waypoint = ET.SubElement(edge, _WAYPOINT)
             waypoint.set("x", str(int(wp.x)))
-            waypoint.set("y", str(int(wp.y)))
+            waypoint.set("y", str(int(wp.y + dy)))
+
+
+def _set_bounds(shape: ET.Element, x: float, y: float, width: float, height: float) -> None:
+    bounds = ET.SubElement(shape, _BOUNDS)
+    bounds.set("x", str(int(x)))
+    bounds.set("y", str(int(y)))
+    bounds.set("width", str(int(width)))
+    bounds.set("height", str(int(height)))
+
+
+def _stack_pools(processes: Sequence[BPMNProcess]) -> list[tuple[float, float, float, float, float]]:
+    """Pool bounds ``(x, y, width, height, dy)`` per process, stacked top to bottom.
+
+    ``dy`` is the vertical offset that moves the process into its pool. Pools
+    share one left edge and width, so they line up like lanes.
+    """
+    boxes = [_content_bounds(process) for process in processes]
+    left = min(box[0] for box in boxes) - POOL_PADDING - POOL_LABEL_WIDTH
+    right = max(box[2] for box in boxes) + POOL_PADDING
+
+    pools = []
+    top = boxes[0][1] - POOL_PADDING
+    for min_x, min_y, max_x, max_y in boxes:
+        height = max_y - min_y + 2 * POOL_PADDING
+        pools.append((left, top, right - left, height, top + POOL_PADDING - min_y))
+        top += height + POOL_GAP
+    return pools
+
+
+def _content_bounds(process: BPMNProcess) -> tuple[float, float, float, float]:
+    """Bounding box ``(min_x, min_y, max_x, max_y)`` of a process's shapes and waypoints."""
+    xs = [n.x for n in process.nodes] + [n.x + n.width for n in process.nodes]
+    ys = [n.y for n in process.nodes] + [n.y + n.height for n in process.nodes]
+    for flow in process.sequence_flows:
+        xs.extend(wp.x for wp in flow.waypoints)
+        ys.extend(wp.y for wp in flow.waypoints)
+    if not xs:
+        return 0.0, 0.0, 0.0, 0.0
+    return min(xs), min(ys), max(xs), max(ys)
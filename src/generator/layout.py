@@ -1,4 +1,9 @@
-from src.models.bpmn import BPMNNodeType, BPMNProcess, Waypoint
+import hashlib
+import threading
+from collections import OrderedDict, deque
+
+from src.metrics import metrics
+from src.models.bpmn import BPMNNode, BPMNNodeType, BPMNProcess, Waypoint
 
 # Layout constants
 HORIZONTAL_SPACING = 180
@@ -12,41 +17,42 @@ GATEWAY_SIZE = 50
 TASK_WIDTH = 100
 TASK_HEIGHT = 80
 
+_NODE_SIZES = {
+    BPMNNodeType.START_EVENT: (EVENT_SIZE, EVENT_SIZE),
+    BPMNNodeType.END_EVENT: (EVENT_SIZE, EVENT_SIZE),
+    BPMNNodeType.EXCLUSIVE_GATEWAY: (GATEWAY_SIZE, GATEWAY_SIZE),
+    BPMNNodeType.CONVERGING_GATEWAY: (GATEWAY_SIZE, GATEWAY_SIZE),
+    BPMNNodeType.TASK: (TASK_WIDTH, TASK_HEIGHT),
+}
+
 
 class LayoutEngine:
-    """Assigns x,y coordinates to BPMN nodes and computes sequence flow waypoints."""
+    """Assigns x,y coordinates to BPMN nodes and computes sequence flow waypoints.
+
+    Stateless; one instance can be shared across requests and threads.
+    """
 
     def apply_layout(self, process: BPMNProcess) -> None:
+        node_map = {n.id: n for n in process.nodes}
         self._set_dimensions(process)
-        self._assign_coordinates(process)
-        self._compute_waypoints(process)
+        self._assign_coordinates(process, node_map)
+        self._compute_waypoints(process, node_map)
 
     def _set_dimensions(self, process: BPMNProcess) -> None:
         for node in process.nodes:
-            if node.node_type in (BPMNNodeType.START_EVENT, BPMNNodeType.END_EVENT):
-                node.width = EVENT_SIZE
-                node.height = EVENT_SIZE
-            elif node.node_type in (BPMNNodeType.EXCLUSIVE_GATEWAY, BPMNNodeType.CONVERGING_GATEWAY):
-                node.width = GATEWAY_SIZE
-                node.height = GATEWAY_SIZE
-            else:
-                node.width = TASK_WIDTH
-                node.height = TASK_HEIGHT
+            node.width, node.height = _NODE_SIZES[node.node_type]
 
-    def _assign_coordinates(self, process: BPMNProcess) -> None:
+    def _assign_coordinates(self, process: BPMNProcess, node_map: dict[str, BPMNNode]) -> None:
         """Traverse the graph left-to-right, handling gateway fan-out/fan-in."""
         if not process.nodes:
             return
 
-        node_map = {n.id: n for n in process.nodes}
         outgoing: dict[str, list[str]] = {n.id: [] for n in process.nodes}
-        incoming: dict[str, list[str]] = {n.id: [] for n in process.nodes}
-        flow_map: dict[str, str] = {}  # flow_id -> name
+        incoming_count: dict[str, int] = dict.fromkeys(node_map, 0)
 
         for flow in process.sequence_flows:
             outgoing[flow.source_ref].append(flow.target_ref)
-            incoming[flow.target_ref].append(flow.source_ref)
-            flow_map[f"{flow.source_ref}->{flow.target_ref}"] = flow.name
+            incoming_count[flow.target_ref] += 1
 
         placed: set[str] = set()
         converging_arrivals: dict[str, list[tuple[float, float]]] = {}
@@ -59,10 +65,10 @@ class LayoutEngine:
             return
 
         # BFS with (node_id, x, y)
-        queue: list[tuple[str, float, float]] = [(start_node.id, START_X, START_Y)]
+        queue: deque[tuple[str, float, float]] = deque([(start_node.id, START_X, START_Y)])
 
         while queue:
-            node_id, x, y = queue.pop(0)
+            node_id, x, y = queue.popleft()
             node = node_map[node_id]
 
             # Converging gateways need all incoming branches before placement
@@ -71,8 +77,7 @@ class LayoutEngine:
                     converging_arrivals[node_id] = []
                 converging_arrivals[node_id].append((x, y))
 
-                incoming_count = len(incoming[node_id])
-                if len(converging_arrivals[node_id]) < incoming_count:
+                if len(converging_arrivals[node_id]) < incoming_count[node_id]:
                     continue  # Wait for all branches
 
                 # Place at max_x + spacing, average y
@@ -104,9 +109,7 @@ class LayoutEngine:
                 for target_id in targets:
                     queue.append((target_id, x + HORIZONTAL_SPACING, y))
 
-    def _compute_waypoints(self, process: BPMNProcess) -> None:
-        node_map = {n.id: n for n in process.nodes}
-
+    def _compute_waypoints(self, process: BPMNProcess, node_map: dict[str, BPMNNode]) -> None:
         for flow in process.sequence_flows:
             source = node_map.get(flow.source_ref)
             target = node_map.get(flow.target_ref)
@@ -133,3 +136,83 @@ class LayoutEngine:
                     Waypoint(mid_x, tgt_y),
                     Waypoint(tgt_x, tgt_y),
                 ]
+
+
+def topology_hash(process: BPMNProcess) -> str:
+    """Structural hash of a process: node types and edges, ignoring ids and names.
+
+    Nodes are numbered by their position in ``process.nodes`` and each flow is
+    recorded as a pair of those numbers, in flow order. The layout depends on
+    nothing else, so two processes with the same hash get the same geometry.
+    """
+    index = {node.id: i for i, node in enumerate(process.nodes)}
+    digest = hashlib.sha256()
+    digest.update("\x1f".join(node.node_type.value for node in process.nodes).encode())
+    digest.update(b"\x1e")
+    digest.update(
+        "\x1f".join(
+            f"{index.get(flow.source_ref, -1)},{index.get(flow.target_ref, -1)}"
+            for flow in process.sequence_flows
+        ).encode()
+    )
+    return digest.hexdigest()[:32]
+
+
+# Geometry of one laid-out process: (x, y, width, height) per node and the
+# waypoints per flow, both by position; tuples so cached entries can be shared
+_Geometry = tuple[
+    tuple[tuple[float, float, float, float], ...],
+    tuple[tuple[tuple[float, float], ...], ...],
+]
+
+
+class CachedLayoutEngine:
+    """LRU of layouts keyed by ``topology_hash``, in front of a layout engine.
+
+    SOPs of the same shape (a linear run of N steps, one decision with two
+    branches, ...) lay out identically whatever their wording, so a hit copies
+    the cached coordinates and waypoints onto the process instead of running
+    the layout again. Safe to share across threads.
+    """
+
+    def __init__(self, engine: LayoutEngine, max_entries: int) -> None:
+        self._engine = engine
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, _Geometry] = OrderedDict()
+
+    def apply_layout(self, process: BPMNProcess) -> None:
+        key = topology_hash(process)
+        with self._lock:
+            geometry = self._entries.get(key)
+            if geometry is not None:
+                self._entries.move_to_end(key)
+        if geometry is not None:
+            metrics.incr("layout_cache_total", outcome="hit")
+            _apply_geometry(process, geometry)
+            return
+
+        metrics.incr("layout_cache_total", outcome="miss")
+        self._engine.apply_layout(process)
+        geometry = _capture_geometry(process)
+        with self._lock:
+            self._entries[key] = geometry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            metrics.set_gauge("layout_cache_entries", len(self._entries))
+
+
+def _capture_geometry(process: BPMNProcess) -> _Geometry:
+    return (
+        tuple((n.x, n.y, n.width, n.height) for n in process.nodes),
+        tuple(tuple((wp.x, wp.y) for wp in flow.waypoints) for flow in process.sequence_flows),
+    )
+
+
+def _apply_geometry(process: BPMNProcess, geometry: _Geometry) -> None:
+    boxes, paths = geometry
+    for node, (x, y, width, height) in zip(process.nodes, boxes):
+        node.x, node.y, node.width, node.height = x, y, width, height
+    for flow, points in zip(process.sequence_flows, paths):
+        flow.waypoints = [Waypoint(x, y) for x, y in points]
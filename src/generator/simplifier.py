@@ -0,0 +1,132 @@
+import logging
+from dataclasses import dataclass
+
+from src.metrics import metrics
+from src.models.bpmn import BPMNNode, BPMNNodeType, BPMNProcess, BPMNSequenceFlow
+
+logger = logging.getLogger(__name__)
+
+_GATEWAYS = (BPMNNodeType.EXCLUSIVE_GATEWAY, BPMNNodeType.CONVERGING_GATEWAY)
+
+
+@dataclass
+class SimplificationReport:
+    nodes_removed: int = 0
+    flows_removed: int = 0
+
+
+class GraphSimplifier:
+    """Removes redundant gateways and flows from a built BPMNProcess.
+
+    Runs between build and layout. All gateways are exclusive, so the
+    rewrites below keep the set of possible paths through the process:
+
+    * a diverging gateway whose branches all lead to the same node (a
+      decision with only empty branches) keeps a single unlabelled flow;
+    * a gateway with one incoming and one outgoing flow (a decision with no
+      branches or a single branch, or the join after it) is removed and its
+      two flows fused, keeping whichever label they carry; the label of a
+      single branch is replaced by its decision's question, as "Yes" means
+      nothing once the question is gone;
+    * a converging gateway that only feeds another converging gateway (nested
+      decisions ending together) is merged into it.
+
+    Like the builder, the pass keeps no state on the instance and uses a
+    worklist rather than recursion.
+    """
+
+    def simplify(self, process: BPMNProcess) -> SimplificationReport:
+        node_map = {n.id: n for n in process.nodes}
+        # Flows keyed by id per node, so removal is O(1) on high fan-in joins
+        incoming: dict[str, dict[str, BPMNSequenceFlow]] = {n.id: {} for n in process.nodes}
+        outgoing: dict[str, dict[str, BPMNSequenceFlow]] = {n.id: {} for n in process.nodes}
+        for flow in process.sequence_flows:
+            outgoing[flow.source_ref][flow.id] = flow
+            incoming[flow.target_ref][flow.id] = flow
+
+        removed_nodes: set[str] = set()
+        removed_flows: set[str] = set()
+
+        def drop_flow(flow: BPMNSequenceFlow) -> None:
+            del outgoing[flow.source_ref][flow.id]
+            del incoming[flow.target_ref][flow.id]
+            removed_flows.add(flow.id)
+
+        def is_gateway(node_id: str) -> bool:
+            return node_map[node_id].node_type in _GATEWAYS
+
+        worklist = [n.id for n in reversed(process.nodes) if n.node_type in _GATEWAYS]
+        while worklist:
+            node_id = worklist.pop()
+            if node_id in removed_nodes:
+                continue
+            node = node_map[node_id]
+            ins = incoming[node_id]
+            outs = list(outgoing[node_id].values())
+            touched: list[str] = []
+
+            if (
+                node.node_type == BPMNNodeType.EXCLUSIVE_GATEWAY
+                and len(outs) > 1
+                and len({f.target_ref for f in outs}) == 1
+            ):
+                # Every branch goes to the same place: the choice is irrelevant
+                for flow in outs[1:]:
+                    drop_flow(flow)
+                outs[0].name = ""
+                touched = [node_id, outs[0].target_ref]
+
+            elif len(ins) == 1 and len(outs) == 1 and self._can_fuse(node, next(iter(ins.values())), outs[0]):
+                flow_in, flow_out = next(iter(ins.values())), outs[0]
+                target = flow_out.target_ref
+                flow_in.name = flow_in.name or self._carried_name(node, flow_out)
+                drop_flow(flow_out)
+                ins.clear()
+                flow_in.target_ref = target
+                incoming[target][flow_in.id] = flow_in
+                removed_nodes.add(node_id)
+                touched = [flow_in.source_ref, target]
+
+            elif (
+                node.node_type == BPMNNodeType.CONVERGING_GATEWAY
+                and len(outs) == 1
+                and not outs[0].name
+                and outs[0].target_ref != node_id
+                and node_map[outs[0].target_ref].node_type == BPMNNodeType.CONVERGING_GATEWAY
+            ):
+                # Join feeding a join: redirect its inputs to the outer one
+                target = outs[0].target_ref
+                drop_flow(outs[0])
+                for flow in ins.values():
+                    flow.target_ref = target
+                    incoming[target][flow.id] = flow
+                ins.clear()
+                removed_nodes.add(node_id)
+
+            worklist.extend(n for n in touched if n not in removed_nodes and is_gateway(n))
+
+        if removed_nodes:
+            process.nodes = [n for n in process.nodes if n.id not in removed_nodes]
+        if removed_flows:
+            process.sequence_flows = [f for f in process.sequence_flows if f.id not in removed_flows]
+
+        report = SimplificationReport(nodes_removed=len(removed_nodes), flows_removed=len(removed_flows))
+        metrics.incr("graph_simplified_nodes_removed_total", report.nodes_removed)
+        metrics.incr("graph_simplified_flows_removed_total", report.flows_removed)
+        logger.debug("Simplified process: removed %d nodes, %d flows", report.nodes_removed, report.flows_removed)
+        return report
+
+    @classmethod
+    def _can_fuse(cls, node: BPMNNode, flow_in: BPMNSequenceFlow, flow_out: BPMNSequenceFlow) -> bool:
+        if flow_in.source_ref == node.id or flow_out.target_ref == node.id:
+            return False
+        # Two different labels cannot be carried by one flow
+        name_out = cls._carried_name(node, flow_out)
+        return not (flow_in.name and name_out and flow_in.name != name_out)
+
+    @staticmethod
+    def _carried_name(node: BPMNNode, flow_out: BPMNSequenceFlow) -> str:
+        """The label ``flow_out`` passes on when ``node`` is removed."""
+        if node.node_type == BPMNNodeType.EXCLUSIVE_GATEWAY and flow_out.name:
+            return node.name
+        return flow_out.name
@@ -0,0 +1,175 @@
+import hashlib
+from html import escape
+
+from src.models.bpmn import BPMNNode, BPMNNodeType, BPMNProcess
+
+# Drawing constants
+PADDING = 40
+FONT_SIZE = 11
+LINE_HEIGHT = 13
+# Average glyph width at FONT_SIZE, used to wrap task labels without measuring text
+CHAR_WIDTH = 6.2
+MAX_LABEL_LINES = 4
+EXTERNAL_LABEL_WIDTH = 120
+
+STYLE = (
+    "text{font:11px sans-serif;fill:#1a1a2e;text-anchor:middle}"
+    ".task{fill:#fff;stroke:#1a1a2e;stroke-width:1.5}"
+    ".event{fill:#fff;stroke:#1a1a2e;stroke-width:1.5}"
+    ".end{stroke-width:4}"
+    ".gateway{fill:#fff;stroke:#1a1a2e;stroke-width:1.5}"
+    ".marker{stroke:#1a1a2e;stroke-width:2.5}"
+    ".flow{fill:none;stroke:#1a1a2e;stroke-width:1.2}"
+    ".flow-label{text-anchor:start;fill:#4a5568}"
+)
+
+
+class SVGRenderer:
+    """Renders a laid-out BPMNProcess as a standalone SVG image.
+
+    Draws the node bounds and flow waypoints computed by ``LayoutEngine``
+    as-is, so it needs no layout or text measurement of its own and is cheap
+    enough to run on large diagrams.
+    """
+
+    def render(self, process: BPMNProcess) -> str:
+        min_x, min_y, max_x, max_y = _bounds(process)
+        width = max_x - min_x + 2 * PADDING
+        height = max_y - min_y + 2 * PADDING
+
+        parts = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" '
+            f'viewBox="{min_x - PADDING:g} {min_y - PADDING:g} {width:g} {height:g}" '
+            f'width="{width:g}" height="{height:g}">',
+            f"<title>{escape(process.name)}</title>",
+            f"<style>{STYLE}</style>",
+            '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" '
+            'markerWidth="8" markerHeight="8" orient="auto-start-reverse">'
+            '<path d="M0,0L10,5L0,10z" fill="#1a1a2e"/></marker></defs>',
+        ]
+        for flow in process.sequence_flows:
+            self._render_flow(parts, flow)
+        for node in process.nodes:
+            self._render_node(parts, node)
+        parts.append("</svg>")
+        return "".join(parts)
+
+    def _render_flow(self, parts: list[str], flow) -> None:
+        if len(flow.waypoints) < 2:
+            return
+        points = " ".join(f"{wp.x:g},{wp.y:g}" for wp in flow.waypoints)
+        parts.append(f'<polyline class="flow" points="{points}" marker-end="url(#arrow)"/>')
+        if flow.name:
+            # Label the last segment, which sits at the target's height when
+            # the flow is Z-routed out of a gateway
+            start = flow.waypoints[-2]
+            parts.append(
+                f'<text class="flow-label" x="{start.x + 4:g}" y="{start.y - 5:g}">{escape(flow.name)}</text>'
+            )
+
+    def _render_node(self, parts: list[str], node: BPMNNode) -> None:
+        cx = node.x + node.width / 2
+        cy = node.y + node.height / 2
+
+        if node.node_type == BPMNNodeType.TASK:
+            parts.append(
+                f'<rect class="task" x="{node.x:g}" y="{node.y:g}" '
+                f'width="{node.width:g}" height="{node.height:g}" rx="10"/>'
+            )
+            lines = _wrap(node.name, node.width - 10)
+            top = cy - (len(lines) - 1) * LINE_HEIGHT / 2 + FONT_SIZE / 3
+            parts.append(_text(cx, top, lines))
+            return
+
+        if node.node_type in (BPMNNodeType.START_EVENT, BPMNNodeType.END_EVENT):
+            css = "event end" if node.node_type == BPMNNodeType.END_EVENT else "event"
+            parts.append(f'<circle class="{css}" cx="{cx:g}" cy="{cy:g}" r="{node.width / 2:g}"/>')
+        else:
+            half_w, half_h = node.width / 2, node.height / 2
+            parts.append(
+                f'<polygon class="gateway" points="{cx:g},{node.y:g} {node.x + node.width:g},{cy:g} '
+                f'{cx:g},{node.y + node.height:g} {node.x:g},{cy:g}"/>'
+            )
+            if node.node_type == BPMNNodeType.EXCLUSIVE_GATEWAY:
+                d = half_w * 0.35
+                parts.append(
+                    f'<path class="marker" d="M{cx - d:g},{cy - d * half_h / half_w:g}'
+                    f"L{cx + d:g},{cy + d * half_h / half_w:g}M{cx + d:g},{cy - d * half_h / half_w:g}"
+                    f'L{cx - d:g},{cy + d * half_h / half_w:g}"/>'
+                )
+
+        if node.name:
+            # Events and gateways carry their label underneath, as in bpmn.io
+            lines = _wrap(node.name, EXTERNAL_LABEL_WIDTH)
+            parts.append(_text(cx, node.y + node.height + LINE_HEIGHT + 2, lines))
+
+
+def _text(x: float, y: float, lines: list[str]) -> str:
+    if len(lines) == 1:
+        return f'<text x="{x:g}" y="{y:g}">{escape(lines[0])}</text>'
+    spans = "".join(
+        f'<tspan x="{x:g}" dy="{0 if i == 0 else LINE_HEIGHT}">{escape(line)}</tspan>'
+        for i, line in enumerate(lines)
+    )
+    return f'<text x="{x:g}" y="{y:g}">{spans}</text>'
+
+
+def _wrap(text: str, width: float) -> list[str]:
+    """Greedy word wrap to an estimated character budget, with an ellipsis past MAX_LABEL_LINES."""
+    budget = max(1, int(width / CHAR_WIDTH))
+    lines: list[str] = []
+    current = ""
+    for word in text.split():
+        while len(word) > budget:
+            if current:
+                lines.append(current)
+                current = ""
+            lines.append(word[:budget])
+            word = word[budget:]
+        if not current:
+            current = word
+        elif len(current) + 1 + len(word) <= budget:
+            current = f"{current} {word}"
+        else:
+            lines.append(current)
+            current = word
+    if current:
+        lines.append(current)
+    if len(lines) > MAX_LABEL_LINES:
+        lines = lines[:MAX_LABEL_LINES]
+        lines[-1] = lines[-1][: budget - 1].rstrip() + "…"
+    return lines or [""]
+
+
+def _bounds(process: BPMNProcess) -> tuple[float, float, float, float]:
+    if not process.nodes:
+        return 0.0, 0.0, 0.0, 0.0
+    min_x = min(n.x for n in process.nodes)
+    min_y = min(n.y for n in process.nodes)
+    # Leave room for labels under events and gateways
+    max_x = max(n.x + n.width for n in process.nodes)
+    max_y = max(n.y + n.height for n in process.nodes) + MAX_LABEL_LINES * LINE_HEIGHT
+    for flow in process.sequence_flows:
+        for wp in flow.waypoints:
+            min_x, max_x = min(min_x, wp.x), max(max_x, wp.x)
+            min_y, max_y = min(min_y, wp.y), max(max_y, wp.y)
+    min_x = min(min_x, min(n.x + n.width / 2 - EXTERNAL_LABEL_WIDTH / 2 for n in process.nodes))
+    max_x = max(max_x, max(n.x + n.width / 2 + EXTERNAL_LABEL_WIDTH / 2 for n in process.nodes))
+    return min_x, min_y, max_x, max_y
+
+
+def process_hash(process: BPMNProcess) -> str:
+    """Content hash of a laid-out process: names, structure and geometry."""
+    digest = hashlib.sha256()
+    digest.update(f"{process.id}\x1f{process.name}\x1e".encode())
+    for node in process.nodes:
+        digest.update(
+            f"{node.id}\x1f{node.node_type.value}\x1f{node.name}\x1f"
+            f"{node.x:g}\x1f{node.y:g}\x1f{node.width:g}\x1f{node.height:g}\x1e".encode()
+        )
+    for flow in process.sequence_flows:
+        points = "\x1f".join(f"{wp.x:g},{wp.y:g}" for wp in flow.waypoints)
+        digest.update(
+            f"{flow.id}\x1f{flow.source_ref}\x1f{flow.target_ref}\x1f{flow.name}\x1f{points}\x1e".encode()
+        )
+    return digest.hexdigest()[:32]
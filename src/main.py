@@ -2,7 +2,12 @@ import logging
 
 from fastapi import FastAPI
 
+from src.api import admin
+from src.api.admission import AdmissionMiddleware
+from src.api.dependencies import get_admission_controller
 from src.api.routes import router
+from src.api.uploads import UploadLimitMiddleware
+from src.config import get_settings
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
 
@@ -12,4 +17,8 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# Added last = outermost: oversized uploads are refused without taking a slot
+app.add_middleware(AdmissionMiddleware, controller=get_admission_controller())
+app.add_middleware(UploadLimitMiddleware, max_bytes=get_settings().max_upload_bytes)
 app.include_router(router)
+app.include_router(admin.router)
@@ -0,0 +1,103 @@
+import threading
+from collections import deque
+from typing import Union
+
+Number = Union[int, float]
+
+# Samples kept per summary for percentile estimates
+SUMMARY_WINDOW = 1024
+
+
+def _key(name: str, labels: dict[str, str]) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+    return f"{name}{{{rendered}}}"
+
+
+class _Summary:
+    """Count/sum/max over all observations, percentiles over a recent window."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.window: deque[float] = deque(maxlen=SUMMARY_WINDOW)
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.window.append(value)
+
+    def to_dict(self) -> dict:
+        ordered = sorted(self.window)
+
+        def pct(p: float) -> float:
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "max": self.max,
+            "p50": pct(0.50),
+            "p95": pct(0.95),
+            "p99": pct(0.99),
+        }
+
+
+class MetricsRegistry:
+    """Process-local counters, gauges and summaries, exposed as JSON at ``GET /metrics``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: dict[str, Number] = {}
+        self._gauges: dict[str, Number] = {}
+        self._summaries: dict[str, _Summary] = {}
+
+    def incr(self, name: str, value: Number = 1, **labels: str) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: Number, **labels: str) -> None:
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                summary = self._summaries[key] = _Summary()
+            summary.observe(value)
+
+    def counter(self, name: str, **labels: str) -> Number:
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    def gauge(self, name: str, **labels: str) -> Number:
+        with self._lock:
+            return self._gauges.get(_key(name, labels), 0)
+
+    def summary(self, name: str, **labels: str) -> dict:
+        with self._lock:
+            summary = self._summaries.get(_key(name, labels))
+            return summary.to_dict() if summary else _Summary().to_dict()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": {key: s.to_dict() for key, s in self._summaries.items()},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._summaries.clear()
+
+
+metrics = MetricsRegistry()
@@ -1,12 +1,36 @@
 from abc import ABC, abstractmethod
+from typing import BinaryIO, Union
 
 from src.models.sop import SOPDocument
 
+# Raw file bytes, or a seekable binary file object positioned at the start
+DocumentSource = Union[bytes, BinaryIO]
+
 
 class BaseSOPParser(ABC):
     """Interface contract for all SOP parsers."""
 
     @abstractmethod
-    async def parse(self, file_content: bytes) -> SOPDocument:
-        """Parse raw file bytes into a structured SOPDocument."""
+    async def parse(self, file_content: DocumentSource) -> SOPDocument:
+        """Parse raw file bytes (or a binary file object) into a structured SOPDocument."""
+        ...
+
+    async def parse_all(self, file_content: DocumentSource) -> list[SOPDocument]:
+        """Parse a document that may hold several procedures into one SOPDocument each.
+
+        Parsers that cannot tell procedures apart return the whole document as one.
+        """
+        return [await self.parse(file_content)]
+
+
+class BaseSOPAnalyzer(ABC):
+    """Interface contract for turning extracted SOP text into an SOPDocument.
+
+    Implemented by the LLM analyzer and by wrappers that add behaviour in
+    front of it (coalescing, routing, ...), so they can be chained.
+    """
+
+    @abstractmethod
+    async def analyze(self, sop_text: str) -> SOPDocument:
+        """Analyze raw SOP text and return its structure."""
         ...
@@ -0,0 +1,135 @@
+"""Micro-batching of short SOP analyses into one LLM request.
+
+For a short SOP most of a call's cost is fixed: the system prompt, the
+connection and the queueing. ``MicroBatchingAnalyzer`` holds short analyses
+for a few milliseconds and sends the ones that arrived together as one
+prompt that returns an array of documents (``LLMSOPAnalyzer.analyze_batch``),
+then hands each caller its own document. If the batched call fails or
+returns the wrong number of documents, every SOP in it is analyzed on its
+own instead, so batching never turns a good SOP into an error.
+"""
+
+import asyncio
+import contextvars
+import logging
+from dataclasses import dataclass, field
+from typing import Optional
+
+from src.metrics import metrics
+from src.models.sop import SOPDocument
+from src.parser.base import BaseSOPAnalyzer
+from src.parser.llm_analyzer import LLMSOPAnalyzer, current_prior_analysis
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class _Pending:
+    sop_text: str
+    max_tokens: Optional[int]
+    future: asyncio.Future
+    # The caller's context (tenant, deadline), used for its fallback call
+    context: contextvars.Context
+    batch: list["_Pending"] = field(default_factory=list)
+    task: Optional[asyncio.Task] = None
+
+
+class MicroBatchingAnalyzer(BaseSOPAnalyzer):
+    """Packs SOPs of up to ``max_chars`` arriving within ``max_wait`` seconds into one call.
+
+    A batch is sent once it has ``max_batch_size`` members or ``max_wait``
+    after its first one arrived. Longer SOPs, and revisions of an earlier
+    analysis, go straight to the analyzer. The batched call runs in the first
+    member's context, so it is scheduled and timed out like that request.
+    """
+
+    def __init__(
+        self,
+        analyzer: LLMSOPAnalyzer,
+        max_batch_size: int = 8,
+        max_wait: float = 0.005,
+        max_chars: int = 2000,
+        max_tokens: int = 4096,
+    ) -> None:
+        self._analyzer = analyzer
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._max_chars = max_chars
+        self._max_tokens = max_tokens
+        self._pending: list[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Strong references, so running batches are not garbage-collected
+        self._tasks: set[asyncio.Task] = set()
+
+    async def analyze(self, sop_text: str, max_tokens: Optional[int] = None) -> SOPDocument:
+        if len(sop_text) > self._max_chars or current_prior_analysis() is not None:
+            return await self._analyzer.analyze(sop_text, max_tokens=max_tokens)
+
+        loop = asyncio.get_running_loop()
+        pending = _Pending(sop_text, max_tokens, loop.create_future(), contextvars.copy_context())
+        self._pending.append(pending)
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_wait, self._flush)
+
+        try:
+            return await pending.future
+        except asyncio.CancelledError:
+            # Stop paying for a batch nobody is waiting for any more
+            if pending.task is not None and all(p.future.done() for p in pending.batch):
+                pending.task.cancel()
+            raise
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = [p for p in self._pending if not p.future.done()]
+        self._pending = []
+        if not batch:
+            return
+
+        if len(batch) == 1:
+            coro = self._analyze_one(batch[0])
+        else:
+            coro = self._analyze_batch(batch)
+        task = asyncio.get_running_loop().create_task(coro, context=batch[0].context)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        for pending in batch:
+            pending.batch = batch
+            pending.task = task
+
+    async def _analyze_batch(self, batch: list[_Pending]) -> None:
+        metrics.observe("llm_batch_size", len(batch))
+        budget = min(self._max_tokens, sum(p.max_tokens or self._max_tokens for p in batch))
+        try:
+            documents = await self._analyzer.analyze_batch([p.sop_text for p in batch], max_tokens=budget)
+        except Exception as error:
+            logger.warning("Batched analysis of %d SOPs failed, analyzing them one by one: %s", len(batch), error)
+            metrics.incr("llm_batches_total", outcome="fallback")
+            await asyncio.gather(*(self._fallback(p) for p in batch))
+            return
+
+        metrics.incr("llm_batches_total", outcome="ok")
+        metrics.incr("llm_calls_saved_total", len(batch) - 1, reason="batched")
+        for pending, document in zip(batch, documents):
+            if not pending.future.done():
+                pending.future.set_result(document)
+
+    def _fallback(self, pending: _Pending) -> asyncio.Task:
+        # Each fallback call runs with its own caller's tenant and deadline
+        return asyncio.get_running_loop().create_task(self._analyze_one(pending), context=pending.context)
+
+    async def _analyze_one(self, pending: _Pending) -> None:
+        if pending.future.done():
+            return
+        try:
+            document = await self._analyzer.analyze(pending.sop_text, max_tokens=pending.max_tokens)
+        except Exception as error:
+            if not pending.future.done():
+                pending.future.set_exception(error)
+            return
+        if not pending.future.done():
+            pending.future.set_result(document)
@@ -0,0 +1,147 @@
+"""Circuit breaker for calls to an unhealthy LLM deployment.
+
+While Azure OpenAI is degraded, every call would otherwise wait out the full
+client timeout (and its retries) before failing, holding a scheduler slot
+and a conversion slot all the while. The breaker counts consecutive bad
+calls; after ``failure_threshold`` of them it opens and calls fail at once
+with ``CircuitOpenError``. After ``open_seconds`` it lets a single probe
+call through (half-open): success closes the circuit, failure opens it for
+another ``open_seconds``.
+
+A call is bad if it raises a backend error (connection error, timeout, 429,
+5xx) or takes longer than ``slow_call_seconds``, whatever its outcome. Bad
+requests, cancellation and the request's own deadline do not count; a
+half-open probe that ends that way leaves the next call to probe instead.
+"""
+
+import logging
+import math
+import time
+from enum import Enum
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+from src.metrics import metrics
+from src.models.sop import SOPDocument
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Errors that say the backend is unhealthy (APITimeoutError is an APIConnectionError)
+BACKEND_ERRORS = (APIConnectionError, InternalServerError, RateLimitError)
+
+
+class CircuitState(Enum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a deployment whose circuit is open.
+
+    ``cached`` is set on the way out by a wrapper that holds a close enough
+    earlier analysis of the SOP, for a degraded-mode fallback to serve.
+    """
+
+    def __init__(self, name: str, retry_after: float) -> None:
+        super().__init__(f"LLM deployment {name} is unavailable, retry in {math.ceil(retry_after)}s")
+        self.name = name
+        self.retry_after = retry_after
+        self.cached: Optional[SOPDocument] = None
+
+
+class CircuitBreaker:
+    """Closed / open / half-open state of one LLM deployment.
+
+    Used from the event loop only, so it needs no lock. The state is
+    published as the ``llm_circuit_state{deployment}`` gauge (0 closed,
+    1 half-open, 2 open).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        slow_call_seconds: float = 45.0,
+        open_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._slow_call_seconds = slow_call_seconds
+        self._open_seconds = open_seconds
+        self._clock = clock
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        metrics.set_gauge("llm_circuit_state", self._state.value, deployment=name)
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and self.retry_after() == 0:
+            return CircuitState.HALF_OPEN
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe is allowed; 0 unless the circuit is open."""
+        if self._state is not CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self._opened_at + self._open_seconds - self._clock())
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await ``fn()`` unless the circuit is open, and record how it went."""
+        probe = self._admit()
+        started = self._clock()
+        # "neutral" covers bad requests, the request's own deadline and
+        # cancellation: they say nothing about the backend's health
+        outcome = "neutral"
+        try:
+            result = await fn()
+            outcome = "ok"
+            return result
+        except BACKEND_ERRORS:
+            outcome = "error"
+            raise
+        finally:
+            if probe:
+                self._probing = False
+            if outcome == "error" or self._clock() - started > self._slow_call_seconds:
+                reason = "error" if outcome == "error" else "slow"
+                metrics.incr("llm_circuit_failures_total", deployment=self.name, reason=reason)
+                self._record_failure()
+            elif outcome == "ok" and (probe or self._state is CircuitState.CLOSED):
+                self._record_success(probe)
+
+    def _admit(self) -> bool:
+        """Whether the call is the half-open probe; raises if it may not run at all."""
+        if self._state is CircuitState.CLOSED:
+            return False
+        if self.state is CircuitState.HALF_OPEN and not self._probing:
+            if self._state is CircuitState.OPEN:
+                self._transition(CircuitState.HALF_OPEN)
+            self._probing = True
+            return True
+        metrics.incr("llm_circuit_rejected_total", deployment=self.name)
+        raise CircuitOpenError(self.name, self.retry_after())
+
+    def _record_failure(self) -> None:
+        self._failures += 1
+        if self._state is CircuitState.HALF_OPEN or self._failures >= self._failure_threshold:
+            self._opened_at = self._clock()
+            if self._state is not CircuitState.OPEN:
+                self._transition(CircuitState.OPEN)
+
+    def _record_success(self, probe: bool) -> None:
+        self._failures = 0
+        if probe:
+            self._transition(CircuitState.CLOSED)
+
+    def _transition(self, state: CircuitState) -> None:
+        logger.warning("LLM circuit for %s: %s -> %s", self.name, self._state.name, state.name)
+        self._state = state
+        metrics.incr("llm_circuit_transitions_total", deployment=self.name, state=state.name.lower())
+        metrics.set_gauge("llm_circuit_state", state.value, deployment=self.name)
@@ -0,0 +1,143 @@
+"""Compact wire format for LLM output.
+
+The standard format (``sop_schema``) spells out ``"type": "step"``,
+``"decision": null``, ``"condition_label"`` and friends for every element,
+and the model pays for each of those tokens. The compact format drops them:
+
+* a step is a bare string;
+* a decision is ``{"d": text, "q": question, "b": [branches]}``;
+* a branch is ``{"l": label, "s": [elements]}``;
+* the document is ``{"t": title, "e": [elements]}``.
+
+Structured outputs cannot express positional tuples, so branches keep two
+one-letter keys. ``decode_compact`` turns the JSON straight into SOPDocument
+dataclasses in one pass, without intermediate pydantic models.
+"""
+
+import json
+
+from src.models.sop import SOPBranch, SOPDecision, SOPDocument, SOPElement, SOPElementType
+
+
+def compact_json_schema() -> dict:
+    """Strict JSON schema of a compact document, for structured outputs."""
+    return {
+        "type": "object",
+        "properties": {"t": {"type": "string"}, "e": {"$ref": "#/$defs/elements"}},
+        "required": ["t", "e"],
+        "additionalProperties": False,
+        "$defs": {
+            "elements": {
+                "type": "array",
+                "items": {"anyOf": [{"type": "string"}, {"$ref": "#/$defs/decision"}]},
+            },
+            "decision": {
+                "type": "object",
+                "properties": {
+                    "d": {"type": "string"},
+                    "q": {"type": "string"},
+                    "b": {"type": "array", "items": {"$ref": "#/$defs/branch"}},
+                },
+                "required": ["d", "q", "b"],
+                "additionalProperties": False,
+            },
+            "branch": {
+                "type": "object",
+                "properties": {"l": {"type": "string"}, "s": {"$ref": "#/$defs/elements"}},
+                "required": ["l", "s"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+def compact_batch_json_schema() -> dict:
+    """Strict JSON schema of ``{"documents": [compact documents]}``."""
+    document = compact_json_schema()
+    defs = document.pop("$defs")
+    return {
+        "type": "object",
+        "properties": {"documents": {"type": "array", "items": document}},
+        "required": ["documents"],
+        "additionalProperties": False,
+        "$defs": defs,
+    }
+
+
+def decode_compact(text: str) -> SOPDocument:
+    """Parse compact JSON into an SOPDocument. Raises ValueError on malformed input."""
+    return from_compact(_loads(text))
+
+
+def decode_compact_batch(text: str) -> list[SOPDocument]:
+    data = _loads(text)
+    if not isinstance(data, dict) or not isinstance(data.get("documents"), list):
+        raise ValueError('Expected {"documents": [...]}')
+    return [from_compact(document) for document in data["documents"]]
+
+
+def _loads(text: str) -> object:
+    # json's C scanner recurses per nesting level; report its limit as a decode
+    # error so the caller's repair/failure path handles it
+    try:
+        return json.loads(text)
+    except RecursionError:
+        raise ValueError("Compact JSON is nested too deeply to decode") from None
+
+
+def from_compact(data: object) -> SOPDocument:
+    """Build an SOPDocument from decoded compact JSON, walking it with an explicit stack."""
+    if not isinstance(data, dict):
+        raise ValueError("Compact SOP must be a JSON object")
+    document = SOPDocument(title=_string(data.get("t", "Untitled SOP"), "t"))
+    stack: list[tuple[object, list[SOPElement]]] = [(data.get("e", []), document.elements)]
+
+    while stack:
+        items, elements = stack.pop()
+        if not isinstance(items, list):
+            raise ValueError("Compact SOP elements must be a list")
+        for item in items:
+            if isinstance(item, str):
+                elements.append(SOPElement(element_type=SOPElementType.STEP, text=item))
+                continue
+            if not isinstance(item, dict):
+                raise ValueError(f"Compact SOP element must be a string or object, got {type(item).__name__}")
+
+            text = _string(item.get("d", ""), "d")
+            decision = SOPDecision(question=_string(item.get("q", ""), "q") or text)
+            for branch_data in item.get("b", []):
+                if not isinstance(branch_data, dict):
+                    raise ValueError("Compact SOP branch must be an object")
+                branch = SOPBranch(condition_label=_string(branch_data.get("l", ""), "l"))
+                decision.branches.append(branch)
+                stack.append((branch_data.get("s", []), branch.steps))
+            elements.append(SOPElement(element_type=SOPElementType.DECISION, text=text, decision=decision))
+
+    return document
+
+
+def to_compact_json(document: SOPDocument) -> str:
+    """Serialize an SOPDocument as compact JSON."""
+    root: dict = {"t": document.title, "e": []}
+    stack: list[tuple[list[SOPElement], list]] = [(document.elements, root["e"])]
+
+    while stack:
+        elements, out = stack.pop()
+        for elem in elements:
+            if elem.element_type != SOPElementType.DECISION or elem.decision is None:
+                out.append(elem.text)
+                continue
+            branches = []
+            for branch in elem.decision.branches:
+                steps: list = []
+                branches.append({"l": branch.condition_label, "s": steps})
+                stack.append((branch.steps, steps))
+            out.append({"d": elem.text, "q": elem.decision.question, "b": branches})
+
+    return json.dumps(root, ensure_ascii=False, separators=(",", ":"))
+
+
+def _string(value: object, key: str) -> str:
+    if not isinstance(value, str):
+        raise ValueError(f'Compact SOP field "{key}" must be a string')
+    return value
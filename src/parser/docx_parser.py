@@ -1,28 +1,226 @@
+import asyncio
+import logging
+import posixpath
+import re
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import Executor
 from io import BytesIO
-
-from docx import Document as DocxDocument
+from os import PathLike
+from typing import BinaryIO, Iterator, Optional, Union
 
 from src.models.sop import SOPDocument
-from src.parser.base import BaseSOPParser
-from src.parser.llm_analyzer import LLMSOPAnalyzer
+from src.parser.base import BaseSOPAnalyzer, BaseSOPParser, DocumentSource
+
+logger = logging.getLogger(__name__)
+
+# OOXML namespaces and relationship types
+NS_W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+REL_OFFICE_DOCUMENT = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+)
+DEFAULT_DOCUMENT_PART = "word/document.xml"
+
+_P = f"{{{NS_W}}}p"
+_R = f"{{{NS_W}}}r"
+_HYPERLINK = f"{{{NS_W}}}hyperlink"
+_T = f"{{{NS_W}}}t"
+_BR = f"{{{NS_W}}}br"
+_W_TYPE = f"{{{NS_W}}}type"
+_PPR = f"{{{NS_W}}}pPr"
+_PSTYLE = f"{{{NS_W}}}pStyle"
+_W_VAL = f"{{{NS_W}}}val"
+
+# Built-in heading style ids: "Heading1" in Word, "heading 1" in some converters
+_HEADING_STYLE_RE = re.compile(r"^heading\s*([1-9])$", re.IGNORECASE)
+
+# Run content that maps to fixed text (same mapping python-docx uses)
+_RUN_CONTENT_TEXT = {
+    f"{{{NS_W}}}tab": "\t",
+    f"{{{NS_W}}}ptab": "\t",
+    f"{{{NS_W}}}cr": "\n",
+    f"{{{NS_W}}}noBreakHyphen": "-",
+}
 
 
 class DocxSOPParser(BaseSOPParser):
-    """Parses .docx SOP files by extracting text and delegating to LLM analysis."""
+    """Parses .docx SOP files by extracting text and delegating to LLM analysis.
+
+    With an ``executor``, text extraction runs there instead of on the event
+    loop, and is dropped without running if the parse is cancelled while the
+    job is still queued.
 
-    def __init__(self, llm_analyzer: LLMSOPAnalyzer) -> None:
+    ``parse_all`` splits documents holding several procedures at headings of
+    ``procedure_heading_level`` (0 disables splitting) and analyzes the
+    procedures concurrently.
+    """
+
+    def __init__(
+        self,
+        llm_analyzer: BaseSOPAnalyzer,
+        executor: Optional[Executor] = None,
+        procedure_heading_level: int = 1,
+    ) -> None:
         self._llm_analyzer = llm_analyzer
+        self._executor = executor
+        self._procedure_heading_level = procedure_heading_level
 
-    async def parse(self, file_content: bytes) -> SOPDocument:
-        raw_text = self._extract_text(file_content)
+    async def parse(self, file_content: DocumentSource) -> SOPDocument:
+        raw_text = await self._run(self._extract_text, file_content)
         return await self._llm_analyzer.analyze(raw_text)
 
-    def _extract_text(self, file_content: bytes) -> str:
-        """Extract all paragraph text from a .docx file."""
-        doc = DocxDocument(BytesIO(file_content))
-        lines: list[str] = []
-        for para in doc.paragraphs:
-            text = para.text.strip()
-            if text:
-                lines.append(text)
-        return "\n".join(lines)
+    async def parse_all(self, file_content: DocumentSource) -> list[SOPDocument]:
+        procedures = await self._run(self._extract_procedures, file_content)
+        if len(procedures) == 1:
+            return [await self._llm_analyzer.analyze(procedures[0])]
+
+        logger.info("Split document into %d procedures", len(procedures))
+        tasks = [asyncio.ensure_future(self._llm_analyzer.analyze(text)) for text in procedures]
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            # One failed procedure fails the document; stop paying for the rest
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def _run(self, fn, file_content: DocumentSource):
+        if self._executor is None:
+            return fn(file_content)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, file_content)
+
+    def _extract_text(self, file_content: DocumentSource) -> str:
+        return extract_text(file_content)
+
+    def _extract_procedures(self, file_content: DocumentSource) -> list[str]:
+        return extract_procedures(file_content, self._procedure_heading_level)
+
+
+def extract_text(file_content: Union[DocumentSource, str, PathLike]) -> str:
+    """Extract all paragraph text from a .docx file (bytes, file object or path).
+
+    Only the main document part is read, streamed out of the zip archive,
+    so embedded images and other parts are never loaded into memory.
+    """
+    if isinstance(file_content, (bytes, bytearray, memoryview)):
+        file_content = BytesIO(file_content)
+    lines: list[str] = []
+    for para_text in iter_paragraph_text(file_content):
+        text = para_text.strip()
+        if text:
+            lines.append(text)
+    return "\n".join(lines)
+
+
+def extract_procedures(file_content: Union[DocumentSource, str, PathLike], heading_level: int = 1) -> list[str]:
+    """Extract the text of each procedure in a .docx file, split at headings of ``heading_level``.
+
+    Each procedure starts with its heading paragraph. Text before the first
+    such heading (a manual's title page or introduction) is not a procedure
+    and is dropped, unless the document has fewer than two such headings, in
+    which case the whole text is one procedure, exactly as ``extract_text``.
+    """
+    if isinstance(file_content, (bytes, bytearray, memoryview)):
+        file_content = BytesIO(file_content)
+    preamble: list[str] = []
+    procedures: list[list[str]] = []
+    for style, para_text in iter_paragraphs(file_content):
+        text = para_text.strip()
+        if not text:
+            continue
+        if heading_level and heading_level_of(style) == heading_level:
+            procedures.append([text])
+        elif procedures:
+            procedures[-1].append(text)
+        else:
+            preamble.append(text)
+
+    if len(procedures) < 2:
+        return ["\n".join(preamble + [line for lines in procedures for line in lines])]
+    if preamble:
+        logger.debug("Dropped %d paragraphs before the first procedure heading", len(preamble))
+    return ["\n".join(lines) for lines in procedures]
+
+
+def heading_level_of(style: Optional[str]) -> Optional[int]:
+    """Outline level of a built-in heading paragraph style id, or None."""
+    match = _HEADING_STYLE_RE.match(style or "")
+    return int(match.group(1)) if match else None
+
+
+def iter_paragraph_text(source: Union[BinaryIO, str, PathLike]) -> Iterator[str]:
+    """Yield the text of each top-level body paragraph of a .docx archive.
+
+    Matches python-docx's ``Document.paragraphs`` / ``Paragraph.text``: table
+    cells and text boxes are skipped, hyperlink text is included, and tabs and
+    line breaks map to ``\\t`` and ``\\n``.
+    """
+    for _, text in iter_paragraphs(source):
+        yield text
+
+
+def iter_paragraphs(source: Union[BinaryIO, str, PathLike]) -> Iterator[tuple[Optional[str], str]]:
+    """Like ``iter_paragraph_text``, but yields ``(style_id, text)`` pairs."""
+    with zipfile.ZipFile(source) as archive:
+        with archive.open(_main_document_part(archive)) as stream:
+            yield from _iter_body_paragraphs(stream)
+
+
+def _main_document_part(archive: zipfile.ZipFile) -> str:
+    """Resolve the main document part from the package relationships."""
+    try:
+        with archive.open("_rels/.rels") as rels:
+            for rel in ET.parse(rels).getroot().iter(f"{{{NS_PKG_REL}}}Relationship"):
+                if rel.get("Type") == REL_OFFICE_DOCUMENT:
+                    return posixpath.normpath(rel.get("Target", "").lstrip("/"))
+    except KeyError:
+        pass
+    return DEFAULT_DOCUMENT_PART
+
+
+def _iter_body_paragraphs(stream: BinaryIO) -> Iterator[tuple[Optional[str], str]]:
+    # Element path from the root: [w:document, w:body, w:p, (w:hyperlink,) w:r, content]
+    path: list[str] = []
+    parts: list[str] = []
+    style: Optional[str] = None
+    body = None
+
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            path.append(elem.tag)
+            if len(path) == 2:
+                body = elem
+            continue
+
+        depth = len(path)
+        path.pop()
+
+        if depth == 3:
+            if elem.tag == _P:
+                yield style, "".join(parts)
+                parts.clear()
+                style = None
+            # Drop finished body children so memory stays bounded by one paragraph
+            body.remove(elem)
+            continue
+
+        if depth < 5 or path[2] != _P:
+            continue
+        if depth == 5 and elem.tag == _PSTYLE and path[3] == _PPR:
+            style = elem.get(_W_VAL)
+            continue
+        in_run = (depth == 5 and path[3] == _R) or (
+            depth == 6 and path[3] == _HYPERLINK and path[4] == _R
+        )
+        if not in_run:
+            continue
+
+        if elem.tag == _T:
+            parts.append(elem.text or "")
+        elif elem.tag == _BR:
+            if elem.get(_W_TYPE, "textWrapping") == "textWrapping":
+                parts.append("\n")
+        else:
+            parts.append(_RUN_CONTENT_TEXT.get(elem.tag, ""))
@@ -0,0 +1,108 @@
+"""Degraded-mode analysis for when the LLM is unavailable.
+
+While an LLM deployment's circuit is open (``CircuitOpenError``), an SOP
+with a near-duplicate analysis in the cache gets that analysis, unrevised.
+Any other SOP gets a structure read straight off its paragraphs: the first
+line is the title, each paragraph is a step, and a run of "If <label>,
+<action>" paragraphs turns the paragraph before it into a decision with one
+branch per label. That is much cruder than the model's reading, but it is a
+usable diagram instead of an error. Inside ``track_degraded`` the sources
+that served an analysis are collected, so the caller can mark the result.
+"""
+
+import logging
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from src.metrics import metrics
+from src.models.sop import SOPBranch, SOPDecision, SOPDocument, SOPElement, SOPElementType
+from src.parser.base import BaseSOPAnalyzer
+from src.parser.circuit_breaker import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# "1.", "2)", "a.", "-", "*", "•" list markers
+_LIST_MARKER_RE = re.compile(r"^(?:\d+[.)]|[a-z][.)]|[-*•])\s+", re.IGNORECASE)
+# "If yes, assign to Billing Queue" -> ("yes", "assign to Billing Queue")
+_BRANCH_RE = re.compile(r"^(?:if|when|otherwise if)\s+([^,]{1,40}),\s*(?:then\s+)?(.+)$", re.IGNORECASE)
+
+UNTITLED = "Untitled SOP"
+
+_degraded: ContextVar[Optional[set[str]]] = ContextVar("degraded_sources", default=None)
+
+
+@contextmanager
+def track_degraded() -> Iterator[set[str]]:
+    """Collect the fallback sources ("near_duplicate", "heuristic") used in this context.
+
+    Tasks created inside share the same set, so procedures analyzed
+    concurrently are all recorded.
+    """
+    sources: set[str] = set()
+    token = _degraded.set(sources)
+    try:
+        yield sources
+    finally:
+        _degraded.reset(token)
+
+
+def heuristic_analysis(sop_text: str) -> SOPDocument:
+    """Guess the structure of ``sop_text`` from its paragraphs, without an LLM."""
+    lines = [line.strip() for line in sop_text.splitlines() if line.strip()]
+    title = UNTITLED
+    if lines and not _LIST_MARKER_RE.match(lines[0]) and not _BRANCH_RE.match(lines[0]):
+        title = _clean(lines.pop(0))
+
+    elements: list[SOPElement] = []
+    for line in lines:
+        text = _clean(_LIST_MARKER_RE.sub("", line))
+        branch = _BRANCH_RE.match(text)
+        if branch is None or not elements:
+            elements.append(SOPElement(SOPElementType.STEP, text))
+            continue
+        label, action = branch.groups()
+        step = SOPElement(SOPElementType.STEP, _capitalize(_clean(action)))
+        previous = elements[-1]
+        if previous.decision is None:
+            previous.element_type = SOPElementType.DECISION
+            previous.decision = SOPDecision(question=previous.text)
+        previous.decision.branches.append(SOPBranch(_capitalize(label.strip()), [step]))
+    return SOPDocument(title=title, elements=elements)
+
+
+def _clean(text: str) -> str:
+    return text.strip().rstrip(".;:").strip()
+
+
+def _capitalize(text: str) -> str:
+    return text[:1].upper() + text[1:]
+
+
+class HeuristicFallbackAnalyzer(BaseSOPAnalyzer):
+    """Answers with the cached or heuristic analysis when the analyzer behind it
+    fails fast on an open circuit. Every other error propagates unchanged."""
+
+    def __init__(self, analyzer: BaseSOPAnalyzer) -> None:
+        self._analyzer = analyzer
+
+    async def analyze(self, sop_text: str) -> SOPDocument:
+        try:
+            return await self._analyzer.analyze(sop_text)
+        except CircuitOpenError as error:
+            if error.cached is not None:
+                logger.warning("%s; serving a near-duplicate analysis unrevised", error)
+                _record("near_duplicate")
+                return error.cached
+            logger.warning("%s; serving a heuristic analysis", error)
+            _record("heuristic")
+            return heuristic_analysis(sop_text)
+
+
+def _record(source: str) -> None:
+    metrics.incr("llm_fallback_total", source=source)
+    sources = _degraded.get()
+    if sources is not None:
+        sources.add(source)
+
@@ -1,14 +1,24 @@
-import json
 import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
 
-from openai import AsyncAzureOpenAI
+from openai import APITimeoutError, AsyncAzureOpenAI
 
-from src.models.sop import (
-    SOPBranch,
-    SOPDecision,
-    SOPDocument,
-    SOPElement,
-    SOPElementType,
+from src.context import DeadlineExceeded, current_request
+from src.metrics import metrics
+from src.models.sop import SOPDocument
+from src.parser.base import BaseSOPAnalyzer
+from src.parser.circuit_breaker import CircuitBreaker
+from src.parser.compact_schema import decode_compact, decode_compact_batch, to_compact_json
+from src.parser.sop_schema import (
+    decode_wire,
+    decode_wire_batch,
+    repair_json,
+    response_format,
+    strip_code_fences,
+    to_wire_json,
 )
 
 logger = logging.getLogger(__name__)
@@ -62,85 +72,270 @@ Important:
 - Do NOT wrap the JSON in markdown code fences. Return raw JSON only.
 """
 
+COMPACT_SYSTEM_PROMPT = """\
+You are an expert at analyzing Standard Operating Procedure (SOP) documents and extracting their structure.
+
+Given the raw text of an SOP, you must return the structured flow as compact JSON.
+
+Rules:
+1. Identify sequential steps in the SOP.
+2. Detect decision points — steps that check a condition and branch into different paths (if/then, check if, etc.).
+3. For each decision, extract the condition question and all branches with their condition labels and action steps.
+4. Steps that follow after all branches of a decision have concluded are regular steps (they come after the decision converges).
+5. Keep step text concise but faithful to the original.
+
+Return ONLY valid JSON in this compact form (no markdown, no explanation, no whitespace between tokens):
+
+{"t":"short title for the SOP process","e":[ELEMENT,...]}
+
+where each ELEMENT is either
+- a plain string: a step, e.g. "Log the ticket"
+- a decision: {"d":"decision/check description","q":"question being evaluated","b":[BRANCH,...]}
+
+and each BRANCH is {"l":"condition label, e.g. Yes, No, Billing-related","s":[ELEMENT,...]}.
+
+Branch elements can themselves be decisions (for nested if/then).
+"""
+
+CONTINUE_PROMPT = """\
+Your previous response was cut off. Continue the JSON exactly where it stopped.
+Output only the remaining characters: do not repeat anything already written, \
+do not restart the object and do not add markdown code fences.
+"""
+
+REVISION_PROMPT = """\
+This SOP is a revised copy of one you have already analyzed.
+
+Structure you returned for the previous version:
+{previous}
+
+Paragraphs that changed (unified diff, "-" previous, "+" revised):
+{diff}
+
+Return the structured JSON for the revised SOP. Keep every element the changes \
+do not affect exactly as it was.
+
+Revised SOP:
+
+{sop_text}"""
+
+BATCH_PROMPT = """\
+Analyze each of the following {count} SOPs separately. Return a JSON object \
+{{"documents": [...]}} holding one structured SOP per input, in input order, \
+each matching the schema above."""
+
+# Longest prefix of a continuation checked against the end of the partial
+# output, for models that repeat a few characters before resuming.
+MAX_CONTINUATION_OVERLAP = 256
+MIN_CONTINUATION_OVERLAP = 8
 
-class LLMSOPAnalyzer:
+
+@dataclass(frozen=True)
+class PriorAnalysis:
+    """An earlier analysis of a near-identical SOP, and how the text changed since."""
+
+    document: SOPDocument
+    diff: str
+
+
+_prior_analysis: ContextVar[Optional[PriorAnalysis]] = ContextVar("prior_analysis", default=None)
+
+
+def current_prior_analysis() -> Optional[PriorAnalysis]:
+    return _prior_analysis.get()
+
+
+@contextmanager
+def use_prior_analysis(prior: PriorAnalysis) -> Iterator[PriorAnalysis]:
+    """Have analyses in this context revise ``prior`` instead of starting from scratch."""
+    token = _prior_analysis.set(prior)
+    try:
+        yield prior
+    finally:
+        _prior_analysis.reset(token)
+
+
+class LLMSOPAnalyzer(BaseSOPAnalyzer):
     """Uses Azure OpenAI API to analyze SOP text and return a structured SOPDocument."""
 
     def __init__(
         self,
         api_key: str,
         azure_endpoint: str,
-        api_version: str = "2024-02-01",
+        api_version: str = "2024-10-21",
         model: str = "gpt-4o",
+        max_retries: int = 2,
+        timeout: float = 60.0,
+        output_format: str = "json_schema",
+        max_continuations: int = 3,
+        max_tokens: int = 4096,
+        wire_format: str = "standard",
+        circuit_breaker: Optional[CircuitBreaker] = None,
     ) -> None:
         self._client = AsyncAzureOpenAI(
             api_key=api_key,
             azure_endpoint=azure_endpoint,
             api_version=api_version,
+            max_retries=max_retries,
+            timeout=timeout,
         )
         self._model = model
+        self._timeout = timeout
+        # Structured outputs constrain decoding to the schema; "json_object"
+        # is the fallback for deployments that do not support them.
+        self._response_format = response_format(output_format, wire_format=wire_format)
+        self._batch_response_format = response_format(output_format, batch=True, wire_format=wire_format)
+        # The compact format has short keys and bare-string steps, so the
+        # model spends far fewer completion tokens on JSON structure.
+        if wire_format == "compact":
+            self._system_prompt = COMPACT_SYSTEM_PROMPT
+            self._encode, self._decode, self._decode_batch = to_compact_json, decode_compact, decode_compact_batch
+        else:
+            self._system_prompt = SYSTEM_PROMPT
+            self._encode, self._decode, self._decode_batch = to_wire_json, decode_wire, decode_wire_batch
+        self._max_continuations = max_continuations
+        self._max_tokens = max_tokens
+        # Fails calls fast (CircuitOpenError) while the deployment is unhealthy
+        self._circuit_breaker = circuit_breaker
 
-    async def analyze(self, sop_text: str) -> SOPDocument:
-        """Send SOP text to Azure OpenAI and parse the structured JSON response."""
-        response = await self._client.chat.completions.create(
-            model=self._model,
-            max_tokens=4096,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {
-                    "role": "user",
-                    "content": f"Analyze this SOP and return the structured JSON:\n\n{sop_text}",
-                },
-            ],
-        )
+    async def analyze(self, sop_text: str, max_tokens: Optional[int] = None) -> SOPDocument:
+        """Send SOP text to Azure OpenAI and parse the structured JSON response.
 
-        raw_text = response.choices[0].message.content.strip()
+        ``max_tokens`` overrides the configured completion budget for this call.
+        Inside ``use_prior_analysis`` the model is shown the earlier structure
+        and the changed paragraphs and asked to revise it.
+        """
+        prior = _prior_analysis.get()
+        if prior is not None:
+            previous = self._encode(prior.document)
+            user_content = REVISION_PROMPT.format(previous=previous, diff=prior.diff, sop_text=sop_text)
+        else:
+            user_content = f"Analyze this SOP and return the structured JSON:\n\n{sop_text}"
+        request = {
+            "model": self._model,
+            "max_tokens": max_tokens or self._max_tokens,
+            "messages": [
+                {"role": "system", "content": self._system_prompt},
+                {"role": "user", "content": user_content},
+            ],
+        }
+        if self._response_format is not None:
+            request["response_format"] = self._response_format
+        response = await self._create(request)
 
-        # Strip markdown code fences if present
-        if raw_text.startswith("```"):
-            lines = raw_text.split("\n")
-            lines = lines[1:]  # remove opening fence
-            if lines and lines[-1].strip() == "```":
-                lines = lines[:-1]  # remove closing fence
-            raw_text = "\n".join(lines)
+        choice = response.choices[0]
+        raw_text = choice.message.content or ""
+        rounds = 0
+        while choice.finish_reason == "length" and rounds < self._max_continuations:
+            rounds += 1
+            metrics.incr("llm_continuations_total")
+            logger.info("LLM output truncated at max_tokens, continuation round %d", rounds)
+            choice = await self._continue(request, raw_text)
+            raw_text = join_continuation(raw_text, choice.message.content or "")
 
         logger.debug("LLM response: %s", raw_text)
+        if choice.finish_reason == "length":
+            metrics.incr("llm_continuations_exhausted_total")
+            # Repairing would silently drop the rest of the SOP, so only accept
+            # output that happens to be complete already.
+            return self._parse_content(raw_text, allow_repair=False)
+        return self._parse_content(raw_text)
 
-        data = json.loads(raw_text)
-        return self._parse_response(data)
-
-    def _parse_response(self, data: dict) -> SOPDocument:
-        """Convert the JSON dict into SOPDocument dataclasses."""
-        title = data.get("title", "Untitled SOP")
-        elements = [self._parse_element(e) for e in data.get("elements", [])]
-        return SOPDocument(title=title, elements=elements)
-
-    def _parse_element(self, elem: dict) -> SOPElement:
-        """Recursively parse a single element from the JSON response."""
-        elem_type = elem.get("type", "step")
-
-        if elem_type == "decision":
-            decision_data = elem.get("decision", {})
-            branches = []
-            for b in decision_data.get("branches", []):
-                branch_steps = [self._parse_element(s) for s in b.get("steps", [])]
-                branches.append(
-                    SOPBranch(
-                        condition_label=b.get("condition_label", ""),
-                        steps=branch_steps,
-                    )
-                )
-            decision = SOPDecision(
-                question=decision_data.get("question", elem.get("text", "")),
-                branches=branches,
-            )
-            return SOPElement(
-                element_type=SOPElementType.DECISION,
-                text=elem.get("text", ""),
-                decision=decision,
-            )
-
-        return SOPElement(
-            element_type=SOPElementType.STEP,
-            text=elem.get("text", ""),
-        )
+    async def analyze_batch(self, sop_texts: list[str], max_tokens: Optional[int] = None) -> list[SOPDocument]:
+        """Analyze several SOPs in one completion; returns one SOPDocument per text, in order.
+
+        There are no continuation rounds or local repairs: a truncated or
+        malformed batch raises ``ValueError`` and the caller analyzes the SOPs
+        one by one instead.
+        """
+        sections = "".join(f"\n\n### SOP {i}\n{text}" for i, text in enumerate(sop_texts, start=1))
+        request = {
+            "model": self._model,
+            "max_tokens": max_tokens or self._max_tokens,
+            "messages": [
+                {"role": "system", "content": self._system_prompt},
+                {"role": "user", "content": BATCH_PROMPT.format(count=len(sop_texts)) + sections},
+            ],
+        }
+        if self._batch_response_format is not None:
+            request["response_format"] = self._batch_response_format
+        response = await self._create(request)
+
+        choice = response.choices[0]
+        if choice.finish_reason == "length":
+            raise ValueError(f"Batched LLM output for {len(sop_texts)} SOPs truncated at max_tokens")
+        try:
+            documents = self._decode_batch(strip_code_fences(choice.message.content or ""))
+        except ValueError as error:
+            raise ValueError(f"LLM returned invalid batch JSON: {error}") from error
+        if len(documents) != len(sop_texts):
+            raise ValueError(f"LLM returned {len(documents)} documents for a batch of {len(sop_texts)}")
+        return documents
+
+    async def _continue(self, request: dict, partial: str):
+        """Ask the model to resume a truncated response from where it stopped."""
+        # Structured outputs would force a fresh object, so continuation rounds
+        # are unconstrained; the joined text is validated as a whole.
+        continuation = {key: value for key, value in request.items() if key != "response_format"}
+        continuation["messages"] = [
+            *request["messages"],
+            {"role": "assistant", "content": partial},
+            {"role": "user", "content": CONTINUE_PROMPT},
+        ]
+        response = await self._create(continuation)
+        return response.choices[0]
+
+    async def _create(self, request: dict):
+        """One chat completion, with the client timeout cut to the request's deadline."""
+        time_left = current_request().time_left()
+        if time_left is not None and time_left <= 0:
+            raise DeadlineExceeded("Request deadline passed before the LLM call")
+        timeout = self._timeout if time_left is None else min(self._timeout, time_left)
+
+        async def create():
+            try:
+                return await self._client.chat.completions.create(**request, timeout=timeout)
+            except APITimeoutError as error:
+                # Only the request's own deadline if it cut the timeout short and
+                # has now passed; otherwise the backend is slow and it counts
+                if timeout < self._timeout and current_request().time_left() <= 0:
+                    raise DeadlineExceeded(f"LLM call exceeded the request deadline ({time_left:.1f}s)") from error
+                raise
+
+        if self._circuit_breaker is None:
+            return await create()
+        return await self._circuit_breaker.call(create)
+
+    def _parse_content(self, raw_text: str, allow_repair: bool = True) -> SOPDocument:
+        """Validate and decode the response JSON, repairing it locally if it is malformed."""
+        try:
+            document = self._decode(strip_code_fences(raw_text))
+        except ValueError as error:
+            if not allow_repair:
+                metrics.incr("llm_output_parse_total", outcome="failed")
+                raise ValueError(
+                    f"LLM output still truncated after {self._max_continuations} continuation rounds"
+                ) from error
+            try:
+                document = self._decode(repair_json(raw_text))
+            except ValueError:
+                metrics.incr("llm_output_parse_total", outcome="failed")
+                raise ValueError(f"LLM returned invalid SOP JSON: {error}") from error
+            logger.warning("Repaired malformed LLM JSON locally")
+            metrics.incr("llm_output_parse_total", outcome="repaired")
+            metrics.incr("llm_calls_saved_total", reason="json_repair")
+        else:
+            metrics.incr("llm_output_parse_total", outcome="valid")
+        return document
+
+
+def join_continuation(partial: str, piece: str) -> str:
+    """Append a continuation to truncated output, dropping any repeated overlap."""
+    piece = piece.lstrip("\n")
+    if piece.startswith("```"):
+        piece = piece.split("\n", 1)[1] if "\n" in piece else ""
+    longest = min(len(partial), len(piece), MAX_CONTINUATION_OVERLAP)
+    for size in range(longest, MIN_CONTINUATION_OVERLAP - 1, -1):
+        if partial.endswith(piece[:size]):
+            return partial + piece[size:]
+    return partial + piece
@@ -0,0 +1,313 @@
+"""Reuse of earlier analyses for near-identical SOPs.
+
+Many SOPs are copies of one another with a renamed department or one
+reworded step. Each analyzed text is indexed by a MinHash signature over
+character shingles, with locality-sensitive hashing (LSH) on top: the
+signature is cut into bands and every band is a dict lookup, so finding
+similar documents costs the same with a hundred or a hundred thousand of
+them in the index. A new SOP that is similar enough to a cached one is
+served without a fresh analysis:
+
+* identical text returns the cached SOPDocument;
+* a consistent rename (every occurrence of a phrase replaced by another)
+  is applied to the cached SOPDocument locally, with no LLM call;
+* any other edit sends the cached structure and the changed paragraphs to
+  the model as a revision prompt (``use_prior_analysis``). If the LLM's
+  circuit is open, the cached structure travels on the ``CircuitOpenError``
+  for a degraded-mode fallback to serve unrevised.
+"""
+
+import asyncio
+import difflib
+import hashlib
+import logging
+import random
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional, TypeVar
+
+from src.metrics import metrics
+from src.models.sop import SOPBranch, SOPDecision, SOPDocument, SOPElement
+from src.parser.base import BaseSOPAnalyzer
+from src.parser.circuit_breaker import CircuitOpenError
+from src.parser.llm_analyzer import PriorAnalysis, use_prior_analysis
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+# 16 bands of 8 rows: documents at 0.9 similarity collide in some band with
+# probability > 0.9999, at 0.5 only about 6% of the time
+LSH_BANDS = 16
+# More distinct renamed phrases than this is a rewrite, not a rename
+MAX_RENAMES = 8
+
+_MASK64 = (1 << 64) - 1
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+Signature = tuple[int, ...]
+
+
+def shingle_hashes(text: str) -> list[int]:
+    """64-bit hashes of the distinct character shingles of normalized ``text``.
+
+    BLAKE2b rather than the builtin ``hash()``: that one is salted per
+    process, so similarity estimates (and whether an SOP is reused) would
+    differ between replicas and restarts.
+    """
+    normalized = " ".join(text.lower().split())
+    if len(normalized) <= SHINGLE_SIZE:
+        return [_stable_hash(normalized)]
+    starts = range(len(normalized) - SHINGLE_SIZE + 1)
+    return [_stable_hash(shingle) for shingle in {normalized[i : i + SHINGLE_SIZE] for i in starts}]
+
+
+def _stable_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class MinHasher:
+    """MinHash signatures; each permutation is an XOR with a random 64-bit mask."""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1) -> None:
+        rng = random.Random(seed)
+        self._masks = [rng.getrandbits(64) for _ in range(num_perm)]
+
+    def signature(self, text: str) -> Signature:
+        hashes = shingle_hashes(text)
+        return tuple(min(map(mask.__xor__, hashes)) for mask in self._masks)
+
+
+def estimate_similarity(a: Signature, b: Signature) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures. Lookup cost depends on the number of
+    bands and candidates, not on the number of indexed documents."""
+
+    def __init__(self, bands: int = LSH_BANDS, num_perm: int = NUM_PERM) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self._rows = num_perm // bands
+        self._buckets: list[dict[int, set[int]]] = [{} for _ in range(bands)]
+
+    def _band_keys(self, signature: Signature) -> Iterator[tuple[dict[int, set[int]], int]]:
+        for band, buckets in enumerate(self._buckets):
+            yield buckets, hash(signature[band * self._rows : (band + 1) * self._rows])
+
+    def add(self, key: int, signature: Signature) -> None:
+        for buckets, band_key in self._band_keys(signature):
+            buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key: int, signature: Signature) -> None:
+        for buckets, band_key in self._band_keys(signature):
+            bucket = buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del buckets[band_key]
+
+    def candidates(self, signature: Signature) -> set[int]:
+        found: set[int] = set()
+        for buckets, band_key in self._band_keys(signature):
+            found.update(buckets.get(band_key, ()))
+        return found
+
+
+@dataclass
+class _Entry:
+    text: str
+    signature: Signature
+    document: SOPDocument
+
+
+class NearDuplicateAnalyzer(BaseSOPAnalyzer):
+    """Serves SOPs similar to a recently analyzed one from that analysis.
+
+    Holds up to ``max_entries`` analyses (least recently used evicted first).
+    Returned SOPDocuments may be shared and must not be mutated. With an
+    ``executor``, the signature and the rename patch (both linear in the
+    text or worse) run there instead of on the event loop.
+    """
+
+    def __init__(
+        self,
+        analyzer: BaseSOPAnalyzer,
+        threshold: float = 0.9,
+        max_entries: int = 10_000,
+        hasher: Optional[MinHasher] = None,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        self._analyzer = analyzer
+        self._executor = executor
+        self._threshold = threshold
+        self._max_entries = max_entries
+        self._hasher = hasher or MinHasher()
+        self._index = LSHIndex()
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._by_text: dict[str, int] = {}
+        self._next_key = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def analyze(self, sop_text: str) -> SOPDocument:
+        key = self._by_text.get(sop_text)
+        if key is not None:
+            self._entries.move_to_end(key)
+            self._record("exact")
+            return self._entries[key].document
+
+        started = time.perf_counter()
+        signature = await self._run(self._hasher.signature, sop_text)
+        match = self._best_match(signature)
+        metrics.observe("near_duplicate_lookup_seconds", time.perf_counter() - started)
+
+        if match is None:
+            document = await self._analyzer.analyze(sop_text)
+            self._record("miss")
+        else:
+            document = await self._run(rename_patch, match.text, sop_text, match.document)
+            if document is not None:
+                self._record("patched")
+            else:
+                prior = PriorAnalysis(match.document, paragraph_diff(match.text, sop_text))
+                try:
+                    with use_prior_analysis(prior):
+                        document = await self._analyzer.analyze(sop_text)
+                except CircuitOpenError as error:
+                    # Degraded mode may serve the unrevised analysis instead
+                    error.cached = match.document
+                    raise
+                self._record("revised")
+        self._store(sop_text, signature, document)
+        return document
+
+    async def _run(self, fn: Callable[..., T], *args) -> T:
+        if self._executor is None:
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _best_match(self, signature: Signature) -> Optional[_Entry]:
+        best, best_similarity = None, self._threshold
+        for key in self._index.candidates(signature):
+            entry = self._entries[key]
+            similarity = estimate_similarity(signature, entry.signature)
+            if similarity >= best_similarity:
+                best, best_similarity = entry, similarity
+        if best is not None:
+            metrics.observe("near_duplicate_similarity", best_similarity)
+        return best
+
+    def _store(self, text: str, signature: Signature, document: SOPDocument) -> None:
+        key = self._next_key
+        self._next_key += 1
+        self._entries[key] = _Entry(text, signature, document)
+        self._by_text[text] = key
+        self._index.add(key, signature)
+        while len(self._entries) > self._max_entries:
+            old_key, old = self._entries.popitem(last=False)
+            self._index.remove(old_key, old.signature)
+            if self._by_text.get(old.text) == old_key:
+                del self._by_text[old.text]
+        metrics.set_gauge("near_duplicate_entries", len(self._entries))
+
+    @staticmethod
+    def _record(outcome: str) -> None:
+        metrics.incr("near_duplicate_total", outcome=outcome)
+        if outcome in ("exact", "patched"):
+            metrics.incr("llm_calls_saved_total", reason="near_duplicate")
+        logger.debug("Near-duplicate lookup: %s", outcome)
+
+
+def rename_patch(old_text: str, new_text: str, document: SOPDocument) -> Optional[SOPDocument]:
+    """Apply a consistent word-level rename from ``old_text`` to ``new_text`` to ``document``.
+
+    Returns a patched copy, or None when the edit is not a pure rename: words
+    were inserted or deleted, one phrase was renamed in some places but not
+    others, or the old phrase would survive in the patched document.
+    """
+    old_tokens, new_tokens = _TOKEN_RE.findall(old_text), _TOKEN_RE.findall(new_text)
+    renames: dict[str, str] = {}
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        old_words, new_words = old_tokens[i1:i2], new_tokens[j1:j2]
+        if tag != "replace" or not all(w.isalnum() for w in old_words + new_words):
+            return None
+        old_phrase, new_phrase = " ".join(old_words), " ".join(new_words)
+        if renames.setdefault(old_phrase, new_phrase) != new_phrase:
+            return None
+    if not renames or len(renames) > MAX_RENAMES:
+        return None
+
+    patterns = {
+        re.compile(r"\b" + r"\s+".join(map(re.escape, old.split())) + r"\b"): new for old, new in renames.items()
+    }
+    # The old phrase left anywhere in the new text means it was not renamed everywhere
+    if any(pattern.search(new_text) for pattern in patterns):
+        return None
+
+    def patch(text: str) -> str:
+        for pattern, new in patterns.items():
+            text = pattern.sub(new, text)
+        return text
+
+    patched = _patched_copy(document, patch)
+    # A case variant the patterns missed (e.g. the model lower-cased a name)
+    stale = [re.compile(pattern.pattern, re.IGNORECASE) for pattern in patterns]
+    if any(pattern.search(text) for pattern in stale for text in _strings(patched)):
+        return None
+    return patched
+
+
+def paragraph_diff(old_text: str, new_text: str) -> str:
+    """Changed paragraphs between two extracted texts, as a unified diff without context."""
+    lines = difflib.unified_diff(old_text.splitlines(), new_text.splitlines(), n=0, lineterm="")
+    return "\n".join(line for line in lines if not line.startswith(("---", "+++", "@@")))
+
+
+def _patched_copy(document: SOPDocument, patch: Callable[[str], str]) -> SOPDocument:
+    """Copy of ``document`` with ``patch`` applied to its text, built without recursion."""
+    copied = SOPDocument(title=patch(document.title))
+    stack = [(document.elements, copied.elements)]
+    while stack:
+        source, target = stack.pop()
+        for element in source:
+            decision = None
+            if element.decision is not None:
+                decision = SOPDecision(patch(element.decision.question))
+                for branch in element.decision.branches:
+                    steps: list[SOPElement] = []
+                    decision.branches.append(SOPBranch(patch(branch.condition_label), steps))
+                    stack.append((branch.steps, steps))
+            target.append(SOPElement(element.element_type, patch(element.text), element.step_number, decision))
+    return copied
+
+
+def _strings(document: SOPDocument) -> Iterator[str]:
+    yield document.title
+    for element in _walk(document.elements):
+        yield element.text
+        if element.decision is not None:
+            yield element.decision.question
+            yield from (branch.condition_label for branch in element.decision.branches)
+
+
+def _walk(elements: list[SOPElement]) -> Iterator[SOPElement]:
+    stack = list(reversed(elements))
+    while stack:
+        element = stack.pop()
+        yield element
+        if element.decision is not None:
+            for branch in reversed(element.decision.branches):
+                stack.extend(reversed(branch.steps))
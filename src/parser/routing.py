@@ -0,0 +1,161 @@
+"""Size-aware routing of SOP analyses across LLM deployments.
+
+A cheap estimate of document complexity, taken from the extracted text,
+picks the deployment (tier) and the completion budget for each call: short,
+linear SOPs go to a small fast model, long or heavily branched ones to a
+larger one. Each decision and each tier's latency is recorded in ``metrics``
+so the thresholds can be tuned against real traffic.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Union
+
+from src.context import DeadlineExceeded
+from src.metrics import metrics
+from src.models.sop import SOPDocument
+from src.parser.base import BaseSOPAnalyzer
+from src.parser.batching import MicroBatchingAnalyzer
+from src.parser.llm_analyzer import LLMSOPAnalyzer
+
+logger = logging.getLogger(__name__)
+
+_CONDITIONAL_RE = re.compile(
+    r"\b(if|else|otherwise|unless|whether|depending on|in case|when|check)\b",
+    re.IGNORECASE,
+)
+# "1.", "1.2.3", "2)" (depth = number of dotted parts), "a)"/"iv." (depth 2)
+_NUMBERED_RE = re.compile(r"^(\d+(?:\.\d+)*)[.)]?\s")
+_LETTERED_RE = re.compile(r"^(?:[a-z]|[ivx]+)[.)]\s", re.IGNORECASE)
+_BULLET_RE = re.compile(r"^[-*•▪◦]\s")
+
+# Output-size model: the JSON repeats each line of text and adds structure.
+CHARS_PER_TOKEN = 4
+TOKENS_PER_LINE = 12
+TOKENS_PER_CONDITIONAL = 40
+# Completion budget = estimated output tokens * headroom, rounded up
+MAX_TOKENS_HEADROOM = 1.5
+MAX_TOKENS_STEP = 256
+MIN_MAX_TOKENS = 512
+# Weight of branching and nesting in the routing score, in estimated tokens
+SCORE_PER_CONDITIONAL = 100
+SCORE_PER_LIST_LEVEL = 250
+
+
+@dataclass(frozen=True)
+class Complexity:
+    """Complexity signals for one SOP text."""
+
+    chars: int
+    lines: int
+    conditionals: int
+    list_depth: int
+
+    @property
+    def output_tokens(self) -> int:
+        """Rough size of the JSON the model will produce."""
+        return (
+            self.chars // CHARS_PER_TOKEN
+            + self.lines * TOKENS_PER_LINE
+            + self.conditionals * TOKENS_PER_CONDITIONAL
+        )
+
+    @property
+    def score(self) -> float:
+        """Routing score: output size weighted up for branching and nesting."""
+        return (
+            self.output_tokens
+            + self.conditionals * SCORE_PER_CONDITIONAL
+            + max(0, self.list_depth - 1) * SCORE_PER_LIST_LEVEL
+        )
+
+
+def estimate_complexity(text: str) -> Complexity:
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    depth = 0
+    for line in lines:
+        numbered = _NUMBERED_RE.match(line)
+        if numbered:
+            depth = max(depth, numbered.group(1).count(".") + 1)
+        elif _LETTERED_RE.match(line):
+            depth = max(depth, 2)
+        elif _BULLET_RE.match(line):
+            depth = max(depth, 1)
+    return Complexity(
+        chars=len(text),
+        lines=len(lines),
+        conditionals=len(_CONDITIONAL_RE.findall(text)),
+        list_depth=depth,
+    )
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    """One deployment and the largest routing score it accepts."""
+
+    name: str
+    analyzer: Union[LLMSOPAnalyzer, MicroBatchingAnalyzer]
+    max_tokens: int
+    max_score: float = float("inf")
+
+    def completion_budget(self, complexity: Complexity) -> int:
+        wanted = complexity.output_tokens * MAX_TOKENS_HEADROOM
+        rounded = -(-int(wanted) // MAX_TOKENS_STEP) * MAX_TOKENS_STEP
+        return min(self.max_tokens, max(MIN_MAX_TOKENS, rounded))
+
+
+class RoutingAnalyzer(BaseSOPAnalyzer):
+    """Sends each SOP to the smallest tier whose ``max_score`` covers it.
+
+    Tiers are tried in order of ``max_score``; the last one takes everything
+    else. Under-estimated budgets are safe: truncated output is resumed by
+    the analyzer's continuation rounds.
+    """
+
+    def __init__(self, tiers: list[ModelTier]) -> None:
+        if not tiers:
+            raise ValueError("RoutingAnalyzer needs at least one tier")
+        self._tiers = sorted(tiers, key=lambda tier: tier.max_score)
+
+    def route(self, complexity: Complexity) -> ModelTier:
+        for tier in self._tiers:
+            if complexity.score <= tier.max_score:
+                return tier
+        return self._tiers[-1]
+
+    async def analyze(self, sop_text: str) -> SOPDocument:
+        complexity = estimate_complexity(sop_text)
+        tier = self.route(complexity)
+        max_tokens = tier.completion_budget(complexity)
+        logger.info(
+            "Routing SOP to tier %s (score %.0f, %d chars, %d conditionals, list depth %d, max_tokens %d)",
+            tier.name,
+            complexity.score,
+            complexity.chars,
+            complexity.conditionals,
+            complexity.list_depth,
+            max_tokens,
+        )
+        metrics.incr("llm_route_total", tier=tier.name)
+        metrics.observe("llm_route_score", complexity.score, tier=tier.name)
+        metrics.observe("llm_max_tokens", max_tokens, tier=tier.name)
+
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            document = await tier.analyzer.analyze(sop_text, max_tokens=max_tokens)
+            outcome = "ok"
+            return document
+        except DeadlineExceeded:
+            outcome = "timeout"
+            raise
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            metrics.observe(
+                "llm_latency_seconds", time.perf_counter() - started, tier=tier.name, outcome=outcome
+            )
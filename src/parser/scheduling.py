@@ -0,0 +1,222 @@
+"""Fair sharing of LLM capacity between tenants and request classes.
+
+``FairShareScheduler`` caps concurrent LLM calls and decides who goes next
+when calls queue up:
+
+* Lanes: interactive requests are dispatched before any batch request.
+* Weighted fair queueing within a lane: each request is stamped with a
+  virtual finish time ``max(lane clock, tenant's last finish) + cost / weight``
+  and the smallest stamp goes first (self-clocked fair queueing). A tenant
+  flooding the queue only pushes its own stamps further out, so other
+  tenants keep their share in proportion to their weights.
+* Token budgets: a tenant with a tokens-per-minute budget is skipped while
+  its bucket is empty and is picked up again once it refills.
+
+Costs are estimated tokens (prompt plus expected output), so one huge SOP
+counts for as much as many small ones.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Optional
+
+from src.context import Priority, current_request
+from src.metrics import metrics
+from src.models.sop import SOPDocument
+from src.parser.base import BaseSOPAnalyzer
+from src.parser.routing import CHARS_PER_TOKEN, estimate_complexity
+
+logger = logging.getLogger(__name__)
+
+# Lanes in dispatch order
+LANES = (Priority.INTERACTIVE, Priority.BATCH)
+
+
+class TokenBucket:
+    """Tokens-per-minute budget. A request may overdraw it; the debt delays the next one."""
+
+    def __init__(self, tokens_per_minute: float) -> None:
+        self.rate = tokens_per_minute / 60.0
+        self.capacity = float(tokens_per_minute)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def has_budget(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens > 0
+
+    def consume(self, cost: float, now: float) -> None:
+        self._refill(now)
+        self.tokens -= cost
+
+    def seconds_until_budget(self, now: float) -> float:
+        self._refill(now)
+        return 0.0 if self.tokens > 0 else (-self.tokens / self.rate) + 1e-3
+
+
+@dataclass(order=True)
+class _Ticket:
+    finish_tag: float
+    seq: int
+    tenant: str = field(compare=False)
+    cost: float = field(compare=False)
+    waiter: asyncio.Future = field(compare=False)
+
+
+class FairShareScheduler:
+    """Weighted fair queueing of LLM calls with priority lanes and token budgets."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        weights: Optional[dict[str, float]] = None,
+        tokens_per_minute: Optional[dict[str, int]] = None,
+        default_weight: float = 1.0,
+        default_tokens_per_minute: int = 0,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self._weights = weights or {}
+        self._budget_config = tokens_per_minute or {}
+        self._default_weight = default_weight
+        self._default_tokens_per_minute = default_tokens_per_minute
+        self._buckets: dict[str, Optional[TokenBucket]] = {}
+        self.in_flight = 0
+        self._queues: dict[Priority, list[_Ticket]] = {lane: [] for lane in LANES}
+        self._virtual_time: dict[Priority, float] = {lane: 0.0 for lane in LANES}
+        self._last_finish: dict[tuple[Priority, str], float] = {}
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    def queue_depth(self, lane: Priority) -> int:
+        return sum(1 for ticket in self._queues[lane] if not ticket.waiter.done())
+
+    def weight(self, tenant: str) -> float:
+        return max(1e-6, self._weights.get(tenant, self._default_weight))
+
+    def _bucket(self, tenant: str) -> Optional[TokenBucket]:
+        if tenant not in self._buckets:
+            rate = self._budget_config.get(tenant, self._default_tokens_per_minute)
+            self._buckets[tenant] = TokenBucket(rate) if rate > 0 else None
+        return self._buckets[tenant]
+
+    @asynccontextmanager
+    async def slot(self, cost: float) -> AsyncIterator[None]:
+        """Hold one LLM slot for the current request's tenant and lane."""
+        context = current_request()
+        tenant, lane = context.tenant, context.priority
+        queued_at = time.perf_counter()
+
+        key = (lane, tenant)
+        finish_tag = max(self._virtual_time[lane], self._last_finish.get(key, 0.0)) + cost / self.weight(tenant)
+        self._last_finish[key] = finish_tag
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queues[lane], _Ticket(finish_tag, next(self._seq), tenant, cost, waiter))
+        self._dispatch()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Dispatched just as the caller went away: give the slot back
+                self._release()
+            else:
+                waiter.cancel()
+                self._publish()
+            raise
+        finally:
+            wait = time.perf_counter() - queued_at
+            metrics.observe("llm_queue_wait_seconds", wait, tenant=tenant)
+
+        metrics.incr("llm_scheduled_total", tenant=tenant, lane=lane.value)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        while self.in_flight < self.max_concurrency:
+            ticket = self._next_ticket(now)
+            if ticket is None:
+                break
+            bucket = self._bucket(ticket.tenant)
+            if bucket is not None:
+                bucket.consume(ticket.cost, now)
+            self.in_flight += 1
+            ticket.waiter.set_result(None)
+        self._publish()
+        self._schedule_wakeup(now)
+
+    def _next_ticket(self, now: float) -> Optional[_Ticket]:
+        """Pop the eligible ticket with the smallest finish tag, interactive lane first."""
+        for lane in LANES:
+            queue = self._queues[lane]
+            skipped: list[_Ticket] = []
+            chosen = None
+            while queue:
+                ticket = heapq.heappop(queue)
+                if ticket.waiter.done():
+                    continue  # cancelled while queued
+                bucket = self._bucket(ticket.tenant)
+                if bucket is None or bucket.has_budget(now):
+                    chosen = ticket
+                    break
+                skipped.append(ticket)
+            for ticket in skipped:
+                heapq.heappush(queue, ticket)
+            if chosen is not None:
+                self._virtual_time[lane] = chosen.finish_tag
+                return chosen
+        return None
+
+    def _schedule_wakeup(self, now: float) -> None:
+        """Re-run dispatch when the first over-budget tenant with queued work can go again."""
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        if self.in_flight >= self.max_concurrency:
+            return
+        delays = [
+            self._bucket(ticket.tenant).seconds_until_budget(now)
+            for queue in self._queues.values()
+            for ticket in queue
+            if not ticket.waiter.done() and self._bucket(ticket.tenant) is not None
+        ]
+        if delays:
+            self._wakeup = asyncio.get_running_loop().call_later(min(delays), self._dispatch)
+
+    def _publish(self) -> None:
+        metrics.set_gauge("llm_in_flight", self.in_flight)
+        for lane in LANES:
+            metrics.set_gauge("llm_queue_depth", self.queue_depth(lane), lane=lane.value)
+
+
+def estimate_cost(sop_text: str) -> float:
+    """Estimated tokens for one analysis: the SOP text in, the JSON out."""
+    complexity = estimate_complexity(sop_text)
+    return complexity.chars / CHARS_PER_TOKEN + complexity.output_tokens
+
+
+class FairShareAnalyzer(BaseSOPAnalyzer):
+    """Runs each analysis through a FairShareScheduler slot."""
+
+    def __init__(self, analyzer: BaseSOPAnalyzer, scheduler: FairShareScheduler) -> None:
+        self._analyzer = analyzer
+        self._scheduler = scheduler
+
+    async def analyze(self, sop_text: str) -> SOPDocument:
+        async with self._scheduler.slot(estimate_cost(sop_text)):
+            return await self._analyzer.analyze(sop_text)
@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass, replace
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from src.context import current_request, use_request_context
+from src.metrics import metrics
+from src.models.sop import SOPDocument
+from src.parser.base import BaseSOPAnalyzer
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Call(Generic[T]):
+    task: "asyncio.Task[T]"
+    waiters: int = 0
+
+
+class SingleFlight(Generic[T]):
+    """Runs at most one in-flight call per key; concurrent callers share its result.
+
+    The call runs in its own task, detached from whichever caller started it.
+    A caller that is cancelled stops waiting without affecting the others; the
+    call itself is cancelled only when no caller is left waiting for it.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[str, _Call[T]] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await ``fn()`` for ``key``, joining the in-flight call if there is one."""
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(task=asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                # Last waiter gone: nobody needs the result any more. Forget the
+                # call first so a new caller starts fresh instead of joining it.
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: str, call: _Call[T]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+class SingleFlightAnalyzer(BaseSOPAnalyzer):
+    """Coalesces concurrent analyses of identical SOP text into one downstream call.
+
+    Keyed by a SHA-256 of the extracted text, so re-uploads of the same
+    document (even re-saved with different zip metadata) share one LLM call.
+    The shared SOPDocument is returned to every waiter and must not be mutated.
+
+    Only callers of the same tenant and priority are coalesced, so the shared
+    call is scheduled and accounted as theirs. It runs without a deadline:
+    callers' deadlines differ, and each caller enforces its own while waiting
+    (``within_deadline``); the call is cancelled once no caller is left.
+    """
+
+    def __init__(self, analyzer: BaseSOPAnalyzer) -> None:
+        self._analyzer = analyzer
+        self._flight: SingleFlight[SOPDocument] = SingleFlight()
+
+    async def analyze(self, sop_text: str) -> SOPDocument:
+        context = current_request()
+        digest = hashlib.sha256(sop_text.encode("utf-8")).hexdigest()
+        key = f"{context.tenant}\x1f{context.priority.value}\x1f{digest}"
+        metrics.incr("analyze_requests_total")
+        if self._flight.in_flight(key):
+            metrics.incr("llm_calls_saved_total", reason="coalesced")
+            logger.info("Coalescing analysis %s with an in-flight call", digest[:12])
+        shared = replace(context, deadline=None)
+
+        async def call() -> SOPDocument:
+            with use_request_context(shared):
+                return await self._analyzer.analyze(sop_text)
+
+        return await self._flight.do(key, call)
@@ -0,0 +1,334 @@
+"""Wire format for LLM output: pydantic models mirroring SOPDocument.
+
+The models give the JSON schema for structured-output requests. Responses
+are not validated through them: pydantic validates nested models
+recursively and gives up a few dozen decision levels deep. ``decode_wire``
+parses with ``json`` and ``from_wire`` validates and converts the tree with
+an explicit stack instead. ``to_wire_json`` goes the other way, for showing
+an earlier analysis to the model again.
+"""
+
+import copy
+import json
+import re
+from typing import Literal, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+from src.models.sop import (
+    SOPBranch,
+    SOPDecision,
+    SOPDocument,
+    SOPElement,
+    SOPElementType,
+)
+from src.parser.compact_schema import compact_batch_json_schema, compact_json_schema
+
+
+class WireElement(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    type: Literal["step", "decision"] = "step"
+    text: str = ""
+    decision: Optional["WireDecision"] = None
+
+
+class WireBranch(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    condition_label: str = ""
+    steps: list[WireElement] = []
+
+
+class WireDecision(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    question: str = ""
+    branches: list[WireBranch] = []
+
+
+class WireDocument(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    title: str = "Untitled SOP"
+    elements: list[WireElement] = []
+
+
+class WireBatch(BaseModel):
+    """Several SOPs analyzed in one completion, in input order."""
+
+    model_config = ConfigDict(extra="ignore")
+
+    documents: list[WireDocument] = []
+
+
+WireElement.model_rebuild()
+
+
+def sop_json_schema(model: type[BaseModel] = WireDocument) -> dict:
+    """JSON schema for ``model`` in the strict form structured outputs require.
+
+    Every property is required (optional ones are nullable instead), extra
+    properties are forbidden, and defaults/titles are dropped.
+    """
+    schema = copy.deepcopy(model.model_json_schema())
+    _make_strict(schema)
+    for definition in schema.get("$defs", {}).values():
+        _make_strict(definition)
+    return schema
+
+
+def _make_strict(node: dict) -> None:
+    node.pop("title", None)
+    node.pop("default", None)
+    if node.get("type") == "object" and "properties" in node:
+        node["required"] = list(node["properties"])
+        node["additionalProperties"] = False
+    for key, value in node.items():
+        if key == "$defs":
+            continue
+        if key == "properties":
+            children = list(value.values())
+        elif isinstance(value, dict):
+            children = [value]
+        elif isinstance(value, list):
+            children = [item for item in value if isinstance(item, dict)]
+        else:
+            continue
+        for child in children:
+            _make_strict(child)
+
+
+def response_format(kind: str, batch: bool = False, wire_format: str = "standard") -> Optional[dict]:
+    """The ``response_format`` request parameter for a configured output mode.
+
+    ``batch`` selects the schema used for micro-batched requests;
+    ``wire_format="compact"`` the short-key schema from ``compact_schema``.
+    """
+    if kind == "json_schema":
+        if wire_format == "compact":
+            name = "sop_compact_batch" if batch else "sop_compact"
+            schema = compact_batch_json_schema() if batch else compact_json_schema()
+        else:
+            name, model = ("sop_batch", WireBatch) if batch else ("sop_document", WireDocument)
+            schema = sop_json_schema(model)
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": name, "strict": True, "schema": schema},
+        }
+    if kind == "json_object":
+        return {"type": "json_object"}
+    return None
+
+
+def load_json(text: str) -> object:
+    """``json.loads`` that reports over-deep nesting as ValueError, like any other decode error."""
+    try:
+        return json.loads(text)
+    except RecursionError:
+        raise ValueError("JSON is nested too deeply to decode") from None
+
+
+def from_wire(data: object) -> SOPDocument:
+    """Validate decoded wire JSON and convert it into SOPDocument dataclasses.
+
+    Walks the element tree with an explicit stack, like BPMNBuilder, so depth
+    is not limited by recursion. Missing fields take the wire models'
+    defaults and unknown keys are ignored. Raises ValueError on malformed input.
+    """
+    root = _object(data, "SOP")
+    document = SOPDocument(title=_string(root, "title", "Untitled SOP"))
+    stack: list[tuple[object, list[SOPElement]]] = [(root.get("elements", []), document.elements)]
+
+    while stack:
+        items, elements = stack.pop()
+        if not isinstance(items, list):
+            raise ValueError(f"SOP elements must be a list, got {type(items).__name__}")
+        for item in items:
+            elem = _object(item, "element")
+            kind = elem.get("type", "step")
+            if kind not in ("step", "decision"):
+                raise ValueError(f"Unknown SOP element type {kind!r}")
+            text = _string(elem, "text")
+            if kind != "decision":
+                elements.append(SOPElement(element_type=SOPElementType.STEP, text=text))
+                continue
+
+            wire_decision = elem.get("decision")
+            wire_decision = {} if wire_decision is None else _object(wire_decision, "decision")
+            decision = SOPDecision(question=_string(wire_decision, "question") or text)
+            branches = wire_decision.get("branches", [])
+            if not isinstance(branches, list):
+                raise ValueError(f"Decision branches must be a list, got {type(branches).__name__}")
+            for wire_branch in branches:
+                wire_branch = _object(wire_branch, "branch")
+                branch = SOPBranch(condition_label=_string(wire_branch, "condition_label"))
+                decision.branches.append(branch)
+                stack.append((wire_branch.get("steps", []), branch.steps))
+            elements.append(
+                SOPElement(element_type=SOPElementType.DECISION, text=text, decision=decision)
+            )
+
+    return document
+
+
+def _object(value: object, what: str) -> dict:
+    if not isinstance(value, dict):
+        raise ValueError(f"SOP {what} must be a JSON object, got {type(value).__name__}")
+    return value
+
+
+def _string(data: dict, key: str, default: str = "") -> str:
+    value = data.get(key, default)
+    if not isinstance(value, str):
+        raise ValueError(f"{key!r} must be a string, got {type(value).__name__}")
+    return value
+
+
+def decode_wire(text: str) -> SOPDocument:
+    """Parse standard wire JSON into an SOPDocument. Raises ValueError on malformed input."""
+    return from_wire(load_json(text))
+
+
+def decode_wire_batch(text: str) -> list[SOPDocument]:
+    data = load_json(text)
+    if not isinstance(data, dict) or not isinstance(data.get("documents", []), list):
+        raise ValueError('Expected {"documents": [...]}')
+    return [from_wire(document) for document in data.get("documents", [])]
+
+
+def to_wire_json(document: SOPDocument) -> str:
+    """Serialize an SOPDocument as compact wire-format JSON."""
+    root: dict = {"title": document.title, "elements": []}
+    stack: list[tuple[list[SOPElement], list[dict]]] = [(document.elements, root["elements"])]
+
+    while stack:
+        elements, out = stack.pop()
+        for elem in elements:
+            if elem.element_type != SOPElementType.DECISION or elem.decision is None:
+                out.append({"type": "step", "text": elem.text, "decision": None})
+                continue
+
+            branches = []
+            for branch in elem.decision.branches:
+                steps: list[dict] = []
+                branches.append({"condition_label": branch.condition_label, "steps": steps})
+                stack.append((branch.steps, steps))
+            decision = {"question": elem.decision.question, "branches": branches}
+            out.append({"type": "decision", "text": elem.text, "decision": decision})
+
+    return json.dumps(root, ensure_ascii=False, separators=(",", ":"))
+
+
+_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*\n?(.*?)\n?```\s*$", re.DOTALL)
+# Bare words (Python literals, stray prose); matches wherever str.isalpha() does
+_WORD_RE = re.compile(r"\w+")
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def strip_code_fences(text: str) -> str:
+    text = text.strip()
+    match = _FENCE_RE.match(text)
+    if match:
+        return match.group(1).strip()
+    if text.startswith("```"):
+        # Opening fence without a closing one
+        return text.split("\n", 1)[1] if "\n" in text else ""
+    return text
+
+
+def repair_json(text: str) -> str:
+    """Best-effort local repair of near-valid JSON from an LLM.
+
+    Handles code fences, prose around the object, trailing commas, raw
+    control characters inside strings, Python literals and unclosed
+    strings/brackets. The result is not guaranteed to be valid JSON; callers
+    still validate it.
+    """
+    text = strip_code_fences(text)
+    start = text.find("{")
+    if start == -1:
+        return text
+    end = text.rfind("}")
+    # Drop trailing prose only when the object looks closed
+    text = text[start : end + 1] if end > start and _balanced(text[start : end + 1]) else text[start:]
+
+    out: list[str] = []
+    closers: list[str] = []
+    in_string = False
+    escaped = False
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            elif ch < " ":
+                ch = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}.get(ch, "")
+            out.append(ch)
+            i += 1
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            closers.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            if closers and closers[-1] == ch:
+                closers.pop()
+            else:
+                i += 1
+                continue  # stray closer
+        elif ch.isalpha():
+            word = _WORD_RE.match(text, i).group(0)
+            out.append(_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        out.append(ch)
+        i += 1
+
+    if in_string:
+        if escaped:
+            out.pop()
+        out.append('"')
+    # A dangling key or separator cannot be completed meaningfully
+    while out and out[-1].strip() in (",", ":", ""):
+        out.pop()
+    _drop_trailing_comma(out)
+    for closer in reversed(closers):
+        out.append(closer)
+    return "".join(out)
+
+
+def _drop_trailing_comma(out: list[str]) -> None:
+    j = len(out) - 1
+    while j >= 0 and out[j].isspace():
+        j -= 1
+    if j >= 0 and out[j] == ",":
+        del out[j]
+
+
+def _balanced(text: str) -> bool:
+    depth = 0
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+    return depth == 0 and not in_string
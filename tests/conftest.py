@@ -1,8 +1,11 @@
 from io import BytesIO
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
 
 import pytest
 from docx import Document as DocxDocument
 
+from src.api.artifacts import ArtifactStore
 from src.models.sop import (
     SOPBranch,
     SOPDecision,
@@ -10,6 +13,55 @@ from src.models.sop import (
     SOPElement,
     SOPElementType,
 )
+from src.parser.llm_analyzer import LLMSOPAnalyzer
+
+
+@pytest.fixture(autouse=True)
+def artifact_store(tmp_path, monkeypatch) -> ArtifactStore:
+    """Keep converted BPMN out of the working tree: each test gets its own store."""
+    store = ArtifactStore(tmp_path / "artifacts", max_bytes=10 * 1024 * 1024)
+    monkeypatch.setattr("src.api.routes.get_artifact_store", lambda: store)
+    return store
+
+
+def _completion(content: str, finish_reason: str = "stop") -> SimpleNamespace:
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)])
+
+
+@pytest.fixture
+def fake_llm_client():
+    """Build a stand-in for the Azure OpenAI client, to set as an analyzer's ``_client``.
+
+    ``fake_llm_client("...", ("...", "length"))`` answers successive calls with
+    those contents (a bare string finishes with "stop"); ``side_effect`` is
+    passed to the ``chat.completions.create`` AsyncMock instead.
+    """
+
+    def make(*contents, side_effect=None) -> SimpleNamespace:
+        if side_effect is None:
+            side_effect = [_completion(*c) if isinstance(c, tuple) else _completion(c) for c in contents]
+        create = AsyncMock(side_effect=side_effect)
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    return make
+
+
+@pytest.fixture
+def llm_analyzer(fake_llm_client):
+    """Build an LLMSOPAnalyzer that talks to a ``fake_llm_client``.
+
+    Positional arguments and ``side_effect`` go to ``fake_llm_client``; keyword
+    overrides (``output_format``, ``max_continuations``, ``timeout``,
+    ``wire_format``, ``circuit_breaker``, ...) go to the analyzer.
+    """
+
+    def make(*contents, side_effect=None, **options) -> LLMSOPAnalyzer:
+        analyzer = LLMSOPAnalyzer(api_key="test", azure_endpoint="https://example.invalid", **options)
+        analyzer._client = fake_llm_client(*contents, side_effect=side_effect)
+        return analyzer
+
+    return make
 
 
 @pytest.fixture
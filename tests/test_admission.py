@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.admission import AdmissionController, AdmissionMiddleware, AdmissionRejected
+from src.main import app
+from src.metrics import metrics
+
+client = TestClient(app)
+
+
+async def _hold(controller: AdmissionController, release: asyncio.Event, order: list[int], i: int) -> None:
+    async with controller.slot():
+        order.append(i)
+        await release.wait()
+
+
+class TestAdmissionController:
+    async def test_admits_up_to_cap_then_queues_in_order(self):
+        controller = AdmissionController(max_in_flight=2, max_queue=4, queue_timeout=5)
+        release = asyncio.Event()
+        order: list[int] = []
+
+        tasks = [asyncio.create_task(_hold(controller, release, order, i)) for i in range(5)]
+        await asyncio.sleep(0)
+        assert controller.in_flight == 2
+        assert controller.queue_depth == 3
+        assert order == [0, 1]
+
+        release.set()
+        await asyncio.gather(*tasks)
+        assert order == [0, 1, 2, 3, 4]
+        assert controller.in_flight == 0 and controller.queue_depth == 0
+
+    async def test_rejects_when_queue_full(self):
+        metrics.reset()
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+        release = asyncio.Event()
+        tasks = [asyncio.create_task(_hold(controller, release, [], i)) for i in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with controller.slot():
+                pass
+        assert excinfo.value.reason == "queue_full"
+        assert excinfo.value.retry_after >= 1
+        assert metrics.counter("admission_rejected_total", reason="queue_full") == 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    async def test_queue_timeout_rejects_and_frees_place(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.01)
+        release = asyncio.Event()
+        holder = asyncio.create_task(_hold(controller, release, [], 0))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with controller.slot():
+                pass
+        assert excinfo.value.reason == "queue_timeout"
+        assert controller.queue_depth == 0
+
+        release.set()
+        await holder
+        assert controller.in_flight == 0
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=2, queue_timeout=5)
+        release = asyncio.Event()
+        order: list[int] = []
+        holder = asyncio.create_task(_hold(controller, release, order, 0))
+        waiter = asyncio.create_task(_hold(controller, release, order, 1))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert controller.queue_depth == 0
+
+        release.set()
+        await holder
+        assert order == [0]
+        assert controller.in_flight == 0
+
+    def test_saturation(self):
+        controller = AdmissionController(max_in_flight=2, max_queue=2, queue_timeout=5)
+        controller.in_flight = 2
+        assert controller.saturation == 0.5
+
+
+class TestAdmissionMiddleware:
+    def test_rejects_with_503_and_retry_after(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+        controller.in_flight = 1  # a conversion is already running
+        limited_client = TestClient(AdmissionMiddleware(app, controller))
+
+        response = limited_client.post(
+            "/convert",
+            files={"file": ("test.docx", b"x", "application/octet-stream")},
+        )
+        assert response.status_code == 503
+        assert int(response.headers["retry-after"]) >= 1
+        assert limited_client.get("/health").status_code == 200
+
+    def test_slot_released_after_request(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+        limited_client = TestClient(AdmissionMiddleware(app, controller))
+        for _ in range(2):
+            response = limited_client.post("/convert", files={"file": ("test.txt", b"x", "text/plain")})
+            assert response.status_code == 400
+        assert controller.in_flight == 0
+
+
+class TestHealthProbes:
+    def test_liveness(self):
+        response = client.get("/health/live")
+        assert response.status_code == 200
+        assert response.json()["status"] == "alive"
+
+    def test_readiness_reports_queue(self):
+        response = client.get("/health/ready")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "ready"
+        assert {"in_flight", "max_in_flight", "queue_depth", "max_queue", "saturation"} <= set(data)
+
+    def test_not_ready_when_saturated(self, monkeypatch):
+        controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1)
+        controller.in_flight = 1
+        monkeypatch.setattr("src.api.routes.get_admission_controller", lambda: controller)
+
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["status"] == "saturated"
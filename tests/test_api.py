@@ -1,9 +1,15 @@
+import tempfile
 from io import BytesIO
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, patch
 
 import pytest
+from docx import Document as DocxDocument
+from fastapi import UploadFile
 from fastapi.testclient import TestClient
 
+from src.api.uploads import MappedFile, UploadLimitMiddleware, UploadTooLarge, spool_upload
+from src.config import Settings
 from src.main import app
 from src.models.sop import (
     SOPBranch,
@@ -12,6 +18,7 @@ from src.models.sop import (
     SOPElement,
     SOPElementType,
 )
+from src.parser.docx_parser import DocxSOPParser
 
 client = TestClient(app)
 
@@ -34,6 +41,13 @@ class TestHealthEndpoint:
         assert data["service"] == "sop-to-bpmn"
 
 
+class TestMetricsEndpoint:
+    def test_metrics_returns_counters(self):
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert set(response.json()) >= {"counters", "gauges"}
+
+
 class TestConvertEndpoint:
     def test_rejects_non_docx(self):
         response = client.post(
@@ -47,13 +61,15 @@ class TestConvertEndpoint:
     def test_convert_valid_docx(self, mock_get_parser, sample_sop_docx_bytes):
         """Test full pipeline with mocked LLM parser."""
         mock_parser = AsyncMock()
-        mock_parser.parse.return_value = SOPDocument(
-            title="Test SOP",
-            elements=[
-                SOPElement(element_type=SOPElementType.STEP, text="Step 1"),
-                SOPElement(element_type=SOPElementType.STEP, text="Step 2"),
-            ],
-        )
+        mock_parser.parse_all.return_value = [
+            SOPDocument(
+                title="Test SOP",
+                elements=[
+                    SOPElement(element_type=SOPElementType.STEP, text="Step 1"),
+                    SOPElement(element_type=SOPElementType.STEP, text="Step 2"),
+                ],
+            ),
+        ]
         mock_get_parser.return_value = mock_parser
 
         response = client.post(
@@ -67,29 +83,82 @@ class TestConvertEndpoint:
         assert "<?xml" in response.text
         assert "startEvent" in response.text
         assert "endEvent" in response.text
+        assert "parse;dur=" in response.headers["server-timing"]
+        assert "write;dur=" in response.headers["server-timing"]
+
+        preview = client.get(response.headers["x-bpmn-preview"])
+        assert preview.status_code == 200
+        assert preview.headers["content-type"] == "image/svg+xml"
+        assert "Step 1" in preview.text
+
+        cached = client.get(response.headers["x-bpmn-preview"], headers={"If-None-Match": preview.headers["etag"]})
+        assert cached.status_code == 304
+
+    def test_multi_procedure_document(self):
+        doc = DocxDocument()
+        for name in ("Invoice Approval", "Supplier Onboarding"):
+            doc.add_heading(name, level=1)
+            doc.add_paragraph(f"Start {name.lower()}.")
+        buf = BytesIO()
+        doc.save(buf)
+
+        async def analyze(text):
+            title, *steps = text.split("\n")
+            return SOPDocument(title=title, elements=[SOPElement(SOPElementType.STEP, step) for step in steps])
+
+        with patch("src.api.routes.get_parser", return_value=DocxSOPParser(SimpleNamespace(analyze=analyze))):
+            response = client.post(
+                "/convert",
+                files={"file": ("manual.docx", buf.getvalue(), "application/octet-stream")},
+            )
+
+        assert response.status_code == 200
+        assert response.headers["x-bpmn-processes"] == "2"
+        assert 'name="Invoice Approval"' in response.text
+        assert 'name="Supplier Onboarding"' in response.text
+        assert "<bpmn:collaboration" in response.text
+
+    def test_unknown_preview_returns_404(self):
+        assert client.get("/preview/0123456789abcdef").status_code == 404
+
+    @patch("src.api.routes.get_parser")
+    def test_convert_failure_reports_stage(self, mock_get_parser, sample_sop_docx_bytes):
+        mock_parser = AsyncMock()
+        mock_parser.parse_all.side_effect = ValueError("bad LLM output")
+        mock_get_parser.return_value = mock_parser
+
+        response = client.post(
+            "/convert",
+            files={"file": ("test.docx", sample_sop_docx_bytes, "application/octet-stream")},
+        )
+
+        assert response.status_code == 422
+        assert response.headers["x-failed-stage"] == "parse"
 
     @patch("src.api.routes.get_parser")
     def test_convert_with_decision(self, mock_get_parser, sample_sop_docx_bytes):
         """Test pipeline with a decision in the SOP."""
         mock_parser = AsyncMock()
-        mock_parser.parse.return_value = SOPDocument(
-            title="Triage",
-            elements=[
-                SOPElement(element_type=SOPElementType.STEP, text="Receive email"),
-                SOPElement(
-                    element_type=SOPElementType.DECISION,
-                    text="Check billing",
-                    decision=SOPDecision(
-                        question="Billing-related?",
-                        branches=[
-                            SOPBranch("Yes", [SOPElement(element_type=SOPElementType.STEP, text="Billing Queue")]),
-                            SOPBranch("No", [SOPElement(element_type=SOPElementType.STEP, text="General Queue")]),
-                        ],
+        mock_parser.parse_all.return_value = [
+            SOPDocument(
+                title="Triage",
+                elements=[
+                    SOPElement(element_type=SOPElementType.STEP, text="Receive email"),
+                    SOPElement(
+                        element_type=SOPElementType.DECISION,
+                        text="Check billing",
+                        decision=SOPDecision(
+                            question="Billing-related?",
+                            branches=[
+                                SOPBranch("Yes", [SOPElement(element_type=SOPElementType.STEP, text="Billing Queue")]),
+                                SOPBranch("No", [SOPElement(element_type=SOPElementType.STEP, text="General Queue")]),
+                            ],
+                        ),
                     ),
-                ),
-                SOPElement(element_type=SOPElementType.STEP, text="Send ack"),
-            ],
-        )
+                    SOPElement(element_type=SOPElementType.STEP, text="Send ack"),
+                ],
+            ),
+        ]
         mock_get_parser.return_value = mock_parser
 
         response = client.post(
@@ -101,3 +170,95 @@ class TestConvertEndpoint:
         assert "exclusiveGateway" in response.text
         assert "Billing Queue" in response.text
         assert "General Queue" in response.text
+
+
+class TestUploadLimits:
+    def test_rejects_upload_over_limit(self, sample_sop_docx_bytes):
+        with patch("src.api.routes.get_settings", return_value=Settings(max_upload_bytes=1024)):
+            response = client.post(
+                "/convert",
+                files={"file": ("big.docx", sample_sop_docx_bytes, "application/octet-stream")},
+            )
+        assert response.status_code == 413
+        assert "limit" in response.json()["detail"]
+
+    def test_middleware_rejects_by_content_length(self):
+        limited_app = UploadLimitMiddleware(app, max_bytes=0)
+        limited_client = TestClient(limited_app)
+        response = limited_client.post(
+            "/convert",
+            files={"file": ("big.docx", b"x" * 200_000, "application/octet-stream")},
+        )
+        assert response.status_code == 413
+
+    async def test_middleware_stops_reading_past_limit(self):
+        pulled = 0
+
+        async def receive():
+            nonlocal pulled
+            pulled += 1
+            return {"type": "http.request", "body": b"x" * 16 * 1024, "more_body": pulled < 100}
+
+        async def app_(scope, receive, send):
+            while (await receive()).get("more_body"):
+                pass
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        # Chunked: no Content-Length header to reject up front
+        scope = {"type": "http", "path": "/convert", "headers": []}
+        await UploadLimitMiddleware(app_, max_bytes=0)(scope, receive, send)
+
+        assert sent[0]["status"] == 413
+        assert pulled == 5  # 64 KB allowance + the chunk that crossed it
+
+    def test_middleware_replaces_app_error_with_413(self):
+        limited_client = TestClient(UploadLimitMiddleware(app, max_bytes=0))
+        body = (b"x" * 16 * 1024 for _ in range(20))
+        response = limited_client.post(
+            "/convert", content=body, headers={"content-type": "multipart/form-data; boundary=b"}
+        )
+        assert response.status_code == 413
+        assert "limit" in response.json()["detail"]
+
+    async def test_spool_maps_upload_in_place(self, sample_sop_docx_bytes):
+        spooled = tempfile.SpooledTemporaryFile(max_size=1024)
+        spooled.write(sample_sop_docx_bytes)
+        upload = UploadFile(spooled)
+        async with spool_upload(upload, max_bytes=len(sample_sop_docx_bytes)) as document:
+            assert isinstance(document, MappedFile)
+            assert document.read() == sample_sop_docx_bytes
+        with pytest.raises(UploadTooLarge):
+            async with spool_upload(upload, max_bytes=10):
+                pass
+
+    def test_middleware_ignores_other_paths(self):
+        limited_client = TestClient(UploadLimitMiddleware(app, max_bytes=0))
+        assert limited_client.get("/health").status_code == 200
+
+    @patch("src.api.routes.get_parser")
+    def test_parser_receives_spooled_file(self, mock_get_parser, sample_sop_docx_bytes):
+        seen = {}
+
+        async def parse_all(document):
+            seen["data"] = document.read()
+            return [
+                SOPDocument(
+                    title="Spooled",
+                    elements=[SOPElement(element_type=SOPElementType.STEP, text="Step 1")],
+                )
+            ]
+
+        mock_get_parser.return_value.parse_all = parse_all
+        response = client.post(
+            "/convert",
+            files={"file": ("test.docx", sample_sop_docx_bytes, "application/octet-stream")},
+        )
+
+        assert response.status_code == 200
+        assert seen["data"] == sample_sop_docx_bytes
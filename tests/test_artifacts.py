@@ -0,0 +1,98 @@
+import gzip
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.artifacts import GZIP_MIN_BYTES, ArtifactStore, artifact_hash
+from src.main import app
+from src.models.sop import SOPDocument, SOPElement, SOPElementType
+
+client = TestClient(app)
+
+LARGE = b"<definitions>" + b"<task/>" * 500 + b"</definitions>"
+
+
+class TestArtifactStore:
+    def test_put_is_content_addressed(self, tmp_path):
+        store = ArtifactStore(tmp_path, max_bytes=1 << 20)
+        key = store.put(LARGE)
+        assert key == artifact_hash(LARGE)
+        assert store.put(LARGE) == key
+        assert store.path(key).read_bytes() == LARGE
+        assert gzip.decompress(store.gzip_path(key).read_bytes()) == LARGE
+
+    def test_small_artifacts_not_compressed(self, tmp_path):
+        store = ArtifactStore(tmp_path, max_bytes=1 << 20)
+        key = store.put(b"<x/>")
+        assert len(b"<x/>") < GZIP_MIN_BYTES
+        assert store.gzip_path(key) is None
+
+    def test_unknown_or_malformed_key(self, tmp_path):
+        store = ArtifactStore(tmp_path, max_bytes=1 << 20)
+        assert store.path("0" * 64) is None
+        assert store.path("../../etc/passwd") is None
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        store = ArtifactStore(tmp_path, max_bytes=250)
+        a, b = store.put(b"a" * 100), store.put(b"b" * 100)
+        store.path(a)  # a is now more recent than b
+        c = store.put(b"c" * 100)
+        assert store.path(b) is None
+        assert not (tmp_path / b[:2] / f"{b}.bpmn").exists()
+        assert store.path(a) is not None and store.path(c) is not None
+
+    def test_index_rebuilt_from_disk(self, tmp_path):
+        key = ArtifactStore(tmp_path, max_bytes=1 << 20).put(LARGE)
+        reopened = ArtifactStore(tmp_path, max_bytes=1 << 20)
+        assert reopened.path(key).read_bytes() == LARGE
+
+
+@pytest.fixture
+def converted(sample_sop_docx_bytes):
+    parser = AsyncMock()
+    parser.parse_all.return_value = [
+        SOPDocument(
+            title="Artifacts",
+            elements=[SOPElement(SOPElementType.STEP, f"Step {i}") for i in range(10)],
+        ),
+    ]
+    with patch("src.api.routes.get_parser", return_value=parser):
+        response = client.post(
+            "/convert",
+            files={"file": ("test.docx", sample_sop_docx_bytes, "application/octet-stream")},
+        )
+    assert response.status_code == 200
+    return response
+
+
+class TestArtifactEndpoint:
+    def test_download_matches_conversion(self, converted):
+        url = converted.headers["x-bpmn-artifact"]
+        response = client.get(url, headers={"Accept-Encoding": "identity"})
+        assert response.status_code == 200
+        assert response.content == converted.content
+        assert response.headers["content-type"].startswith("application/xml")
+        assert response.headers["etag"] == f'"{url.rsplit("/", 1)[1]}"'
+        assert "content-encoding" not in response.headers
+
+    def test_precompressed_variant(self, converted):
+        response = client.get(converted.headers["x-bpmn-artifact"], headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.content == converted.content  # decoded by the client
+
+    def test_range_request(self, converted):
+        response = client.get(converted.headers["x-bpmn-artifact"], headers={"Range": "bytes=0-99"})
+        assert response.status_code == 206
+        assert response.content == converted.content[:100]
+        assert "content-encoding" not in response.headers
+
+    def test_not_modified(self, converted):
+        url = converted.headers["x-bpmn-artifact"]
+        etag = client.get(url, headers={"Accept-Encoding": "identity"}).headers["etag"]
+        response = client.get(url, headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+        assert response.status_code == 304
+
+    def test_missing_artifact(self):
+        assert client.get(f"/artifacts/{'0' * 64}").status_code == 404
+        assert client.get("/artifacts/not-a-hash").status_code == 404
@@ -0,0 +1,148 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.api.dependencies import get_analyzer
+from src.config import Settings
+from src.metrics import metrics
+from src.models.sop import SOPDocument
+from src.parser.batching import MicroBatchingAnalyzer
+from src.parser.llm_analyzer import LLMSOPAnalyzer
+from src.parser.routing import RoutingAnalyzer
+
+
+def _document_json(title: str) -> dict:
+    return {"title": title, "elements": [{"type": "step", "text": f"{title} step", "decision": None}]}
+
+
+def _fake_inner():
+    """Stand-in LLM analyzer that titles each document after its SOP text."""
+    inner = SimpleNamespace()
+    inner.analyze = AsyncMock(side_effect=lambda text, max_tokens=None: SOPDocument(title=f"single:{text}"))
+    inner.analyze_batch = AsyncMock(
+        side_effect=lambda texts, max_tokens=None: [SOPDocument(title=f"batch:{t}") for t in texts]
+    )
+    return inner
+
+
+class TestMicroBatchingAnalyzer:
+    async def test_concurrent_short_sops_share_one_call(self):
+        metrics.reset()
+        inner = _fake_inner()
+        batcher = MicroBatchingAnalyzer(inner, max_batch_size=4, max_wait=0.01)
+        results = await asyncio.gather(*(batcher.analyze(f"sop {i}") for i in range(4)))
+        assert [r.title for r in results] == [f"batch:sop {i}" for i in range(4)]
+        inner.analyze_batch.assert_awaited_once()
+        inner.analyze.assert_not_awaited()
+        assert metrics.counter("llm_calls_saved_total", reason="batched") == 3
+
+    async def test_window_flushes_partial_batch(self):
+        inner = _fake_inner()
+        batcher = MicroBatchingAnalyzer(inner, max_batch_size=8, max_wait=0.01)
+        results = await asyncio.gather(batcher.analyze("a"), batcher.analyze("b"))
+        assert [r.title for r in results] == ["batch:a", "batch:b"]
+
+    async def test_lone_sop_uses_single_call(self):
+        inner = _fake_inner()
+        batcher = MicroBatchingAnalyzer(inner, max_wait=0.001)
+        assert (await batcher.analyze("alone")).title == "single:alone"
+        inner.analyze_batch.assert_not_awaited()
+
+    async def test_long_sop_bypasses_batching(self):
+        inner = _fake_inner()
+        batcher = MicroBatchingAnalyzer(inner, max_chars=10)
+        assert (await batcher.analyze("x" * 11, max_tokens=100)).title.startswith("single:")
+        inner.analyze.assert_awaited_once_with("x" * 11, max_tokens=100)
+
+    async def test_failed_batch_falls_back_to_single_calls(self):
+        metrics.reset()
+        inner = _fake_inner()
+        inner.analyze_batch.side_effect = ValueError("bad batch")
+        batcher = MicroBatchingAnalyzer(inner, max_batch_size=3)
+        results = await asyncio.gather(*(batcher.analyze(t) for t in "abc"))
+        assert [r.title for r in results] == ["single:a", "single:b", "single:c"]
+        assert metrics.counter("llm_batches_total", outcome="fallback") == 1
+
+    async def test_fallback_error_reaches_only_its_caller(self):
+        inner = _fake_inner()
+        inner.analyze_batch.side_effect = ValueError("bad batch")
+
+        async def analyze(text, max_tokens=None):
+            if text == "bad":
+                raise ValueError("unparseable SOP")
+            return SOPDocument(title=text)
+
+        inner.analyze.side_effect = analyze
+        batcher = MicroBatchingAnalyzer(inner, max_batch_size=2)
+        good, bad = await asyncio.gather(batcher.analyze("good"), batcher.analyze("bad"), return_exceptions=True)
+        assert good.title == "good"
+        assert isinstance(bad, ValueError)
+
+    async def test_batch_cancelled_when_all_callers_leave(self):
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def slow_batch(texts, max_tokens=None):
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        inner = _fake_inner()
+        inner.analyze_batch.side_effect = slow_batch
+        batcher = MicroBatchingAnalyzer(inner, max_batch_size=2)
+        callers = [asyncio.ensure_future(batcher.analyze(t)) for t in "ab"]
+        await started.wait()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 1)
+
+
+class TestAnalyzeBatch:
+    async def test_returns_documents_in_order(self, llm_analyzer):
+        payload = {"documents": [_document_json("A"), _document_json("B")]}
+        analyzer = llm_analyzer(json.dumps(payload))
+        documents = await analyzer.analyze_batch(["first", "second"])
+        assert [d.title for d in documents] == ["A", "B"]
+
+        kwargs = analyzer._client.chat.completions.create.call_args.kwargs
+        assert kwargs["response_format"]["json_schema"]["name"] == "sop_batch"
+        user = kwargs["messages"][1]["content"]
+        assert "### SOP 1\nfirst" in user and "### SOP 2\nsecond" in user
+
+    async def test_wrong_document_count_rejected(self, llm_analyzer):
+        analyzer = llm_analyzer(json.dumps({"documents": [_document_json("A")]}))
+        with pytest.raises(ValueError, match="1 documents for a batch of 2"):
+            await analyzer.analyze_batch(["first", "second"])
+
+    async def test_truncated_batch_rejected(self, llm_analyzer):
+        analyzer = llm_analyzer(('{"documents": [', "length"))
+        with pytest.raises(ValueError, match="truncated"):
+            await analyzer.analyze_batch(["first", "second"])
+
+
+class TestBatchingWiring:
+    def test_smallest_tier_is_batched(self):
+        settings = Settings(
+            azure_openai_api_key="test",
+            azure_openai_endpoint="https://example.invalid",
+            azure_openai_small_deployment="gpt-4o-mini",
+            llm_batch_max_size=4,
+        )
+        get_analyzer.cache_clear()
+        try:
+            with patch("src.api.dependencies.get_settings", return_value=settings):
+                analyzer = get_analyzer()
+        finally:
+            get_analyzer.cache_clear()
+        while not isinstance(analyzer, RoutingAnalyzer):
+            analyzer = analyzer._analyzer
+        tiers = {tier.name: tier.analyzer for tier in analyzer._tiers}
+        assert isinstance(tiers["small"], MicroBatchingAnalyzer)
+        assert isinstance(tiers["standard"], LLMSOPAnalyzer)
@@ -1,5 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from src.generator.bpmn_builder import BPMNBuilder
 from src.models.bpmn import BPMNNodeType
+from src.models.sop import SOPBranch, SOPDecision, SOPDocument, SOPElement, SOPElementType
 
 
 class TestBPMNBuilderLinear:
@@ -86,3 +89,80 @@ class TestBPMNBuilderDecision:
         for flow in process.sequence_flows:
             assert flow.source_ref in node_ids, f"Invalid source_ref: {flow.source_ref}"
             assert flow.target_ref in node_ids, f"Invalid target_ref: {flow.target_ref}"
+
+
+def _nested_sop(depth: int) -> SOPDocument:
+    """An SOP whose 'Yes' branch opens another decision, ``depth`` levels deep."""
+    innermost = [SOPElement(element_type=SOPElementType.STEP, text="Innermost step")]
+    steps = innermost
+    for level in range(depth):
+        steps = [
+            SOPElement(
+                element_type=SOPElementType.DECISION,
+                text=f"Check level {level}",
+                decision=SOPDecision(
+                    question=f"Level {level}?",
+                    branches=[
+                        SOPBranch(condition_label="Yes", steps=steps),
+                        SOPBranch(condition_label="No"),
+                    ],
+                ),
+            )
+        ]
+    return SOPDocument(title="Nested", elements=steps)
+
+
+class TestBPMNBuilderNested:
+    """Test nested decisions, deep nesting and shared-instance use."""
+
+    def test_nested_decision_flow_is_labelled(self):
+        process = BPMNBuilder().build(_nested_sop(2))
+
+        node_ids = {n.id for n in process.nodes}
+        for flow in process.sequence_flows:
+            assert flow.target_ref in node_ids, f"Invalid target_ref: {flow.target_ref!r}"
+
+        gateways = [n for n in process.nodes if n.node_type == BPMNNodeType.EXCLUSIVE_GATEWAY]
+        outer, inner = gateways
+        into_inner = [f for f in process.sequence_flows if f.target_ref == inner.id]
+        assert len(into_inner) == 1
+        assert into_inner[0].source_ref == outer.id
+        assert into_inner[0].name == "Yes"
+
+    def test_deep_nesting_does_not_recurse(self):
+        depth = 5000
+        process = BPMNBuilder().build(_nested_sop(depth))
+
+        # start + end + innermost task + a gateway pair per level
+        assert len(process.nodes) == 3 + 2 * depth
+        node_ids = {n.id for n in process.nodes}
+        assert len(node_ids) == len(process.nodes)
+        for flow in process.sequence_flows:
+            assert flow.source_ref in node_ids
+            assert flow.target_ref in node_ids
+
+    def test_repeated_builds_are_identical(self, sample_sop_document):
+        builder = BPMNBuilder()
+        first = builder.build(sample_sop_document)
+        second = builder.build(sample_sop_document)
+
+        assert first == second
+        assert first.nodes[0].id == "StartEvent_1"
+
+    def test_shared_builder_across_threads(self, sample_sop_document):
+        builder = BPMNBuilder()
+        expected = builder.build(sample_sop_document)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: builder.build(sample_sop_document), range(200)))
+
+        assert all(result == expected for result in results)
+
+
+class TestBPMNBuilderProcessIndex:
+    def test_later_processes_get_prefixed_ids(self, linear_sop_document):
+        first = BPMNBuilder().build(linear_sop_document)
+        second = BPMNBuilder().build(linear_sop_document, index=2)
+        assert (first.id, second.id) == ("Process_1", "Process_2")
+        assert [n.id for n in second.nodes] == [f"P2_{n.id}" for n in first.nodes]
+        assert all(f.id.startswith("P2_Flow_") and f.source_ref.startswith("P2_") for f in second.sequence_flows)
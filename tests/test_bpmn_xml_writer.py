@@ -98,3 +98,77 @@ class TestBPMNXMLWriter:
             assert bounds is not None
             assert bounds.get("x") is not None
             assert bounds.get("y") is not None
+
+    def test_node_flow_references_match_flows(self, sample_sop_document):
+        xml_str = _generate_xml(sample_sop_document)
+        root = ET.fromstring(xml_str)
+        ns = {"bpmn": "http://www.omg.org/spec/BPMN/20100524/MODEL"}
+        proc = root.find("bpmn:process", ns)
+
+        flows = {f.get("id"): f for f in proc.findall("bpmn:sequenceFlow", ns)}
+        for node in proc:
+            for ref in node.findall("bpmn:incoming", ns):
+                assert flows[ref.text].get("targetRef") == node.get("id")
+            for ref in node.findall("bpmn:outgoing", ns):
+                assert flows[ref.text].get("sourceRef") == node.get("id")
+
+    def test_shared_writer_is_reusable(self, sample_sop_document, linear_sop_document):
+        writer = BPMNXMLWriter()
+        builder = BPMNBuilder()
+        first = builder.build(sample_sop_document)
+        second = builder.build(linear_sop_document)
+        LayoutEngine().apply_layout(first)
+        LayoutEngine().apply_layout(second)
+
+        assert writer.write(first) == _generate_xml(sample_sop_document)
+        assert writer.write(second) == _generate_xml(linear_sop_document)
+        assert "bpmn:definitions" in writer.write(second)
+
+
+class TestMultiProcessDefinitions:
+    NS = {
+        "bpmn": "http://www.omg.org/spec/BPMN/20100524/MODEL",
+        "bpmndi": "http://www.omg.org/spec/BPMN/20100524/DI",
+        "dc": "http://www.omg.org/spec/DD/20100524/DC",
+    }
+
+    def _write(self, *sops) -> ET.Element:
+        processes = [BPMNBuilder().build(sop, index) for index, sop in enumerate(sops, start=1)]
+        for process in processes:
+            LayoutEngine().apply_layout(process)
+        return ET.fromstring(BPMNXMLWriter().write_all(processes))
+
+    def test_single_process_output_unchanged(self, sample_sop_document):
+        process = BPMNBuilder().build(sample_sop_document)
+        LayoutEngine().apply_layout(process)
+        writer = BPMNXMLWriter()
+        assert writer.write_all([process]) == writer.write(process)
+        assert ET.fromstring(writer.write(process)).find("bpmn:collaboration", self.NS) is None
+
+    def test_collaboration_with_one_pool_per_process(self, sample_sop_document, linear_sop_document):
+        root = self._write(sample_sop_document, linear_sop_document)
+        processes = root.findall("bpmn:process", self.NS)
+        participants = root.findall("bpmn:collaboration/bpmn:participant", self.NS)
+        assert [p.get("id") for p in processes] == ["Process_1", "Process_2"]
+        assert [p.get("processRef") for p in participants] == ["Process_1", "Process_2"]
+        assert root.find("bpmndi:BPMNDiagram/bpmndi:BPMNPlane", self.NS).get("bpmnElement") == "Collaboration_1"
+
+    def test_ids_are_unique(self, sample_sop_document):
+        root = self._write(sample_sop_document, sample_sop_document, sample_sop_document)
+        ids = [elem.get("id") for elem in root.iter() if elem.get("id")]
+        assert len(ids) == len(set(ids))
+
+    def test_pools_are_stacked_and_contain_their_shapes(self, sample_sop_document, linear_sop_document):
+        root = self._write(sample_sop_document, linear_sop_document)
+        plane = root.find("bpmndi:BPMNDiagram/bpmndi:BPMNPlane", self.NS)
+        bounds = {
+            shape.get("bpmnElement"): tuple(int(b.get(k)) for k in ("x", "y", "width", "height"))
+            for shape in plane.findall("bpmndi:BPMNShape", self.NS)
+            for b in shape.findall("dc:Bounds", self.NS)
+        }
+        pool_1, pool_2 = bounds.pop("Participant_1"), bounds.pop("Participant_2")
+        assert pool_1[1] + pool_1[3] < pool_2[1]
+        for element, (x, y, width, height) in bounds.items():
+            pool = pool_2 if element.startswith("P2_") else pool_1
+            assert pool[0] <= x and x + width <= pool[0] + pool[2]
+            assert pool[1] <= y and y + height <= pool[1] + pool[3]
@@ -0,0 +1,264 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from openai import APIConnectionError, APITimeoutError
+
+from src.context import DeadlineExceeded, RequestContext, use_request_context
+from src.main import app
+from src.metrics import metrics
+from src.models.sop import SOPDocument, SOPElementType
+from src.parser.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+from src.parser.docx_parser import DocxSOPParser
+from src.parser.fallback import HeuristicFallbackAnalyzer, heuristic_analysis, track_degraded
+from src.parser.near_duplicate import NearDuplicateAnalyzer
+
+client = TestClient(app)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _backend_error() -> APIConnectionError:
+    return APIConnectionError(request=httpx.Request("POST", "https://example.invalid"))
+
+
+async def _fail():
+    raise _backend_error()
+
+
+async def _ok():
+    return "ok"
+
+
+async def _hang(**kwargs):
+    await asyncio.sleep(kwargs["timeout"])
+    raise APITimeoutError(request=httpx.Request("POST", "https://example.invalid"))
+
+
+def _breaker(clock: FakeClock, **kwargs) -> CircuitBreaker:
+    options = {"failure_threshold": 3, "slow_call_seconds": 10.0, "open_seconds": 30.0, **kwargs}
+    return CircuitBreaker("gpt-4o", clock=clock, **options)
+
+
+async def _open(breaker: CircuitBreaker) -> None:
+    while breaker.state is CircuitState.CLOSED:
+        with pytest.raises(APIConnectionError):
+            await breaker.call(_fail)
+
+
+class TestCircuitBreaker:
+    def setup_method(self):
+        metrics.reset()
+
+    async def test_opens_after_consecutive_failures(self):
+        breaker = _breaker(FakeClock())
+        for _ in range(2):
+            with pytest.raises(APIConnectionError):
+                await breaker.call(_fail)
+        assert breaker.state is CircuitState.CLOSED
+        with pytest.raises(APIConnectionError):
+            await breaker.call(_fail)
+        assert breaker.state is CircuitState.OPEN
+        assert metrics.gauge("llm_circuit_state", deployment="gpt-4o") == CircuitState.OPEN.value
+
+    async def test_success_resets_failure_count(self):
+        breaker = _breaker(FakeClock())
+        for fn in (_fail, _fail, _ok, _fail, _fail):
+            try:
+                await breaker.call(fn)
+            except APIConnectionError:
+                pass
+        assert breaker.state is CircuitState.CLOSED
+
+    async def test_open_circuit_fails_fast(self):
+        clock = FakeClock()
+        breaker = _breaker(clock)
+        await _open(breaker)
+        clock.now += 12
+        fn = AsyncMock()
+        with pytest.raises(CircuitOpenError) as info:
+            await breaker.call(fn)
+        fn.assert_not_called()
+        assert info.value.retry_after == 18
+        assert metrics.counter("llm_circuit_rejected_total", deployment="gpt-4o") == 1
+
+    async def test_slow_calls_count_as_failures(self):
+        clock = FakeClock()
+        breaker = _breaker(clock)
+
+        async def slow():
+            clock.now += 11
+            return "late"
+
+        for _ in range(3):
+            assert await breaker.call(slow) == "late"
+        assert breaker.state is CircuitState.OPEN
+        assert metrics.counter("llm_circuit_failures_total", deployment="gpt-4o", reason="slow") == 3
+
+    async def test_caller_errors_do_not_count(self):
+        breaker = _breaker(FakeClock())
+
+        async def deadline():
+            raise DeadlineExceeded("request deadline")
+
+        for _ in range(5):
+            with pytest.raises(DeadlineExceeded):
+                await breaker.call(deadline)
+        assert breaker.state is CircuitState.CLOSED
+
+    async def test_half_open_probe_closes_circuit(self):
+        clock = FakeClock()
+        breaker = _breaker(clock)
+        await _open(breaker)
+        clock.now += 30
+        assert breaker.state is CircuitState.HALF_OPEN
+
+        release = asyncio.Event()
+
+        async def probe():
+            await release.wait()
+            return "ok"
+
+        probing = asyncio.ensure_future(breaker.call(probe))
+        await asyncio.sleep(0)
+        # One probe at a time; the rest still fail fast
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(_ok)
+        release.set()
+        assert await probing == "ok"
+        assert breaker.state is CircuitState.CLOSED
+        assert metrics.counter("llm_circuit_transitions_total", deployment="gpt-4o", state="closed") == 1
+
+    async def test_failed_probe_reopens_circuit(self):
+        clock = FakeClock()
+        breaker = _breaker(clock)
+        await _open(breaker)
+        clock.now += 30
+        with pytest.raises(APIConnectionError):
+            await breaker.call(_fail)
+        assert breaker.state is CircuitState.OPEN
+        assert breaker.retry_after() == 30
+
+
+class TestAnalyzerBreaker:
+    async def test_unhealthy_deployment_stops_getting_calls(self, llm_analyzer):
+        analyzer = llm_analyzer(side_effect=_backend_error(), circuit_breaker=_breaker(FakeClock()))
+        for _ in range(3):
+            with pytest.raises(APIConnectionError):
+                await analyzer.analyze("SOP")
+        with pytest.raises(CircuitOpenError):
+            await analyzer.analyze("SOP")
+        assert analyzer._client.chat.completions.create.call_count == 3
+
+    async def test_deadline_timeouts_do_not_open_circuit(self, llm_analyzer):
+        breaker = _breaker(FakeClock())
+        analyzer = llm_analyzer(side_effect=_hang, circuit_breaker=breaker)
+        for _ in range(5):
+            with use_request_context(RequestContext(deadline=time.monotonic() + 0.02)):
+                with pytest.raises(DeadlineExceeded):
+                    await analyzer.analyze("SOP")
+        assert breaker.state is CircuitState.CLOSED
+
+    async def test_hung_backend_opens_circuit_under_long_deadline(self, llm_analyzer):
+        breaker = _breaker(FakeClock())
+        analyzer = llm_analyzer(side_effect=_hang, timeout=0.01, circuit_breaker=breaker)
+        with use_request_context(RequestContext(deadline=time.monotonic() + 60)):
+            for _ in range(3):
+                with pytest.raises(APITimeoutError):
+                    await analyzer.analyze("SOP")
+        assert breaker.state is CircuitState.OPEN
+
+
+class _OpenCircuit:
+    async def analyze(self, sop_text: str) -> SOPDocument:
+        raise CircuitOpenError("gpt-4o", retry_after=12.5)
+
+
+class TestDegradedMode:
+    def setup_method(self):
+        metrics.reset()
+
+    def test_heuristic_analysis(self, sample_sop_text):
+        document = heuristic_analysis("Customer Support Triage SOP\n" + sample_sop_text)
+        assert document.title == "Customer Support Triage SOP"
+        assert [e.element_type for e in document.elements] == [
+            SOPElementType.STEP,
+            SOPElementType.DECISION,
+            SOPElementType.STEP,
+            SOPElementType.STEP,
+        ]
+        decision = document.elements[1]
+        assert decision.decision.question == "Check if the issue is billing-related"
+        assert [(b.condition_label, b.steps[0].text) for b in decision.decision.branches] == [
+            ("Yes", "Assign to Billing Queue"),
+            ("No", "Assign to General Support Queue"),
+        ]
+
+    def test_heuristic_analysis_of_numbered_list(self):
+        document = heuristic_analysis("1. Open ticket.\n2. Close ticket.")
+        assert document.title == "Untitled SOP"
+        assert [e.text for e in document.elements] == ["Open ticket", "Close ticket"]
+
+    async def test_open_circuit_serves_heuristic(self, sample_sop_text):
+        document = await HeuristicFallbackAnalyzer(_OpenCircuit()).analyze(sample_sop_text)
+        assert document == heuristic_analysis(sample_sop_text)
+        assert metrics.counter("llm_fallback_total", source="heuristic") == 1
+
+    async def test_open_circuit_serves_near_duplicate_unrevised(self, sample_sop_text, sample_sop_document):
+        inner = AsyncMock()
+        inner.analyze.side_effect = [sample_sop_document, CircuitOpenError("gpt-4o", retry_after=5)]
+        analyzer = HeuristicFallbackAnalyzer(NearDuplicateAnalyzer(inner, threshold=0.5))
+        await analyzer.analyze(sample_sop_text)
+
+        edited = sample_sop_text + "\nLog the ticket in the tracker."
+        with track_degraded() as degraded:
+            assert await analyzer.analyze(edited) is sample_sop_document
+        assert degraded == {"near_duplicate"}
+        assert metrics.counter("llm_fallback_total", source="near_duplicate") == 1
+
+    def test_convert_without_fallback_is_503(self, sample_sop_docx_bytes):
+        with patch("src.api.routes.get_parser", return_value=DocxSOPParser(_OpenCircuit())):
+            response = client.post(
+                "/convert",
+                files={"file": ("sop.docx", sample_sop_docx_bytes, "application/octet-stream")},
+            )
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "13"
+        assert response.headers["x-failed-stage"] == "parse"
+
+    def test_convert_with_fallback_is_served_marked_degraded(self, sample_sop_docx_bytes, artifact_store):
+        parser = DocxSOPParser(HeuristicFallbackAnalyzer(_OpenCircuit()))
+        with patch("src.api.routes.get_parser", return_value=parser):
+            response = client.post(
+                "/convert",
+                files={"file": ("sop.docx", sample_sop_docx_bytes, "application/octet-stream")},
+            )
+        assert response.status_code == 200
+        assert "exclusiveGateway" in response.text
+        assert 'name="Customer Support Triage SOP"' in response.text
+        assert response.headers["x-bpmn-degraded"] == "heuristic"
+        # Not cached anywhere it could be served again after the outage
+        assert "x-bpmn-artifact" not in response.headers
+        assert "x-bpmn-preview" not in response.headers
+        assert list(artifact_store.directory.glob("*")) == []
+
+    def test_healthy_convert_is_not_marked_degraded(self, sample_sop_docx_bytes, sample_sop_document):
+        inner = AsyncMock()
+        inner.analyze.return_value = sample_sop_document
+        with patch("src.api.routes.get_parser", return_value=DocxSOPParser(HeuristicFallbackAnalyzer(inner))):
+            response = client.post(
+                "/convert",
+                files={"file": ("sop.docx", sample_sop_docx_bytes, "application/octet-stream")},
+            )
+        assert response.status_code == 200
+        assert "x-bpmn-degraded" not in response.headers
+        assert response.headers["x-bpmn-artifact"].startswith("/artifacts/")
@@ -0,0 +1,87 @@
+from io import BytesIO
+from unittest.mock import patch
+
+from docx import Document as DocxDocument
+
+from src.api.dependencies import get_analyzer
+from src.cli import main
+from src.config import Settings
+from src.models.sop import SOPDocument, SOPElement, SOPElementType
+from src.parser.base import BaseSOPAnalyzer
+from src.parser.scheduling import FairShareAnalyzer
+
+
+class _EchoAnalyzer(BaseSOPAnalyzer):
+    """Turns each line of text into a step; fails on documents mentioning 'broken'."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def analyze(self, sop_text: str) -> SOPDocument:
+        self.calls += 1
+        if "broken" in sop_text:
+            raise ValueError("LLM failure")
+        return SOPDocument(
+            title="CLI",
+            elements=[SOPElement(element_type=SOPElementType.STEP, text=line) for line in sop_text.splitlines()],
+        )
+
+
+def _write_docx(path, *lines):
+    doc = DocxDocument()
+    for line in lines:
+        doc.add_paragraph(line)
+    buf = BytesIO()
+    doc.save(buf)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(buf.getvalue())
+
+
+class TestBulkConversionCLI:
+    def test_converts_tree_and_resumes(self, tmp_path, capsys):
+        src, out = tmp_path / "in", tmp_path / "out"
+        _write_docx(src / "a.docx", "Step A")
+        _write_docx(src / "team" / "b.docx", "Step B1", "Step B2")
+        analyzer = _EchoAnalyzer()
+
+        with patch("src.cli.get_analyzer", return_value=analyzer) as get_analyzer:
+            assert main([str(src), "-o", str(out), "-w", "2", "-c", "16"]) == 0
+            first = capsys.readouterr().out
+            # The scheduler behind the analyzer gets the flag's cap, not LLM_MAX_CONCURRENCY
+            get_analyzer.assert_called_with(llm_concurrency=16)
+
+            assert main([str(src), "-o", str(out), "-w", "2"]) == 0
+            second = capsys.readouterr().out
+
+        assert (out / "a.bpmn").read_text().startswith("<?xml")
+        assert "Step B2" in (out / "team" / "b.bpmn").read_text()
+        assert "converted 2, skipped 0" in first
+        assert "docs/s" in first
+        assert "converted 0, skipped 2" in second
+        assert analyzer.calls == 2
+
+    def test_failures_reported(self, tmp_path, capsys):
+        src = tmp_path / "in"
+        _write_docx(src / "good.docx", "Fine")
+        _write_docx(src / "bad.docx", "broken")
+
+        with patch("src.cli.get_analyzer", return_value=_EchoAnalyzer()):
+            assert main([str(src), "-w", "1"]) == 1
+
+        output = capsys.readouterr().out
+        assert "converted 1" in output
+        assert "FAILED" in output and "bad.docx" in output
+        assert (src / "good.bpmn").exists()
+        assert not (src / "bad.bpmn").exists()
+
+    def test_llm_concurrency_sets_scheduler_cap(self):
+        settings = Settings(azure_openai_api_key="test", azure_openai_endpoint="https://example.invalid")
+        get_analyzer.cache_clear()
+        try:
+            with patch("src.api.dependencies.get_settings", return_value=settings):
+                analyzer = get_analyzer(llm_concurrency=16)
+        finally:
+            get_analyzer.cache_clear()
+        while not isinstance(analyzer, FairShareAnalyzer):
+            analyzer = analyzer._analyzer
+        assert analyzer._scheduler.max_concurrency == 16
@@ -0,0 +1,150 @@
+import json
+
+import pytest
+
+from src.models.sop import SOPBranch, SOPDecision, SOPDocument, SOPElement, SOPElementType
+from src.parser.compact_schema import (
+    compact_batch_json_schema,
+    compact_json_schema,
+    decode_compact,
+    decode_compact_batch,
+    to_compact_json,
+)
+from src.parser.llm_analyzer import COMPACT_SYSTEM_PROMPT, PriorAnalysis, use_prior_analysis
+from src.parser.sop_schema import to_wire_json
+
+COMPACT_RESPONSE = {
+    "t": "Triage",
+    "e": [
+        "Receive email",
+        {
+            "d": "Check billing",
+            "q": "Billing-related?",
+            "b": [
+                {
+                    "l": "Yes",
+                    "s": ["Billing Queue", {"d": "Check VIP", "q": "VIP?", "b": [{"l": "Yes", "s": ["Call"]}]}],
+                },
+                {"l": "No", "s": []},
+            ],
+        },
+        "Send ack",
+    ],
+}
+
+DOCUMENT = SOPDocument(
+    title="Triage",
+    elements=[
+        SOPElement(SOPElementType.STEP, "Receive email"),
+        SOPElement(
+            SOPElementType.DECISION,
+            "Check billing",
+            decision=SOPDecision(
+                question="Billing-related?",
+                branches=[
+                    SOPBranch(
+                        "Yes",
+                        [
+                            SOPElement(SOPElementType.STEP, "Billing Queue"),
+                            SOPElement(
+                                SOPElementType.DECISION,
+                                "Check VIP",
+                                decision=SOPDecision(
+                                    "VIP?", [SOPBranch("Yes", [SOPElement(SOPElementType.STEP, "Call")])]
+                                ),
+                            ),
+                        ],
+                    ),
+                    SOPBranch("No"),
+                ],
+            ),
+        ),
+        SOPElement(SOPElementType.STEP, "Send ack"),
+    ],
+)
+
+
+class TestCompactDecoder:
+    def test_decodes_into_sop_document(self):
+        assert decode_compact(json.dumps(COMPACT_RESPONSE)) == DOCUMENT
+
+    def test_round_trip(self):
+        assert decode_compact(to_compact_json(DOCUMENT)) == DOCUMENT
+
+    def test_is_shorter_than_standard_format(self):
+        assert len(to_compact_json(DOCUMENT)) < len(to_wire_json(DOCUMENT)) * 0.7
+
+    def test_decision_question_defaults_to_text(self):
+        document = decode_compact('{"t":"T","e":[{"d":"Check stock","q":"","b":[]}]}')
+        assert document.elements[0].decision.question == "Check stock"
+
+    def test_decodes_deep_nesting(self):
+        opening = '{"d":"Check","q":"Q?","b":[{"l":"Yes","s":['
+        text = '{"t":"Deep","e":[' + opening * 190 + '"Innermost step"' + "]}]}" * 190 + "]}"
+        elements, depth = decode_compact(text).elements, 0
+        while elements[0].decision is not None:
+            depth += 1
+            elements = elements[0].decision.branches[0].steps
+        assert depth == 190
+        assert elements[0].text == "Innermost step"
+
+    def test_too_deep_for_json_is_value_error(self):
+        text = '{"t":"Deep","e":[' + '{"d":"x","q":"","b":[{"l":"","s":[' * 1000 + "]}]}" * 1000 + "]}"
+        with pytest.raises(ValueError):
+            decode_compact(text)
+        with pytest.raises(ValueError):
+            decode_compact_batch('{"documents":[' + text + "]}")
+
+    def test_batch(self):
+        documents = decode_compact_batch(json.dumps({"documents": [COMPACT_RESPONSE, {"t": "B", "e": ["x"]}]}))
+        assert documents == [DOCUMENT, SOPDocument("B", [SOPElement(SOPElementType.STEP, "x")])]
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "[]",
+            '{"t":"T","e":[1]}',
+            '{"t":"T","e":"step"}',
+            '{"t":7,"e":[]}',
+            '{"t":"T","e":[{"d":"x","q":"y","b":["no"]}]}',
+            '{"t":"T","e":[',
+        ],
+    )
+    def test_malformed_input_raises_value_error(self, text):
+        with pytest.raises(ValueError):
+            decode_compact(text)
+
+    def test_schemas_are_strict(self):
+        for schema in (compact_json_schema(), compact_batch_json_schema()):
+            objects = [schema, *(d for d in schema["$defs"].values() if d["type"] == "object")]
+            for obj in objects:
+                assert obj["additionalProperties"] is False
+                assert set(obj["required"]) == set(obj["properties"])
+
+
+class TestCompactAnalyzer:
+    async def test_request_uses_compact_prompt_and_schema(self, llm_analyzer):
+        analyzer = llm_analyzer(json.dumps(COMPACT_RESPONSE), wire_format="compact")
+        assert await analyzer.analyze("some SOP") == DOCUMENT
+        kwargs = analyzer._client.chat.completions.create.call_args.kwargs
+        assert kwargs["response_format"]["json_schema"]["name"] == "sop_compact"
+        assert kwargs["messages"][0]["content"] == COMPACT_SYSTEM_PROMPT
+
+    async def test_repairs_malformed_compact_json(self, llm_analyzer):
+        analyzer = llm_analyzer('```json\n{"t":"T","e":["a","b",]\n```', wire_format="compact")
+        document = await analyzer.analyze("some SOP")
+        assert [e.text for e in document.elements] == ["a", "b"]
+
+    async def test_batch_uses_compact_schema(self, llm_analyzer):
+        batch = json.dumps({"documents": [COMPACT_RESPONSE, COMPACT_RESPONSE]})
+        analyzer = llm_analyzer(batch, wire_format="compact")
+        assert await analyzer.analyze_batch(["a", "b"]) == [DOCUMENT, DOCUMENT]
+        kwargs = analyzer._client.chat.completions.create.call_args.kwargs
+        assert kwargs["response_format"]["json_schema"]["name"] == "sop_compact_batch"
+
+    async def test_revision_prompt_shows_prior_in_compact_form(self, llm_analyzer):
+        analyzer = llm_analyzer(json.dumps(COMPACT_RESPONSE), wire_format="compact")
+        with use_prior_analysis(PriorAnalysis(DOCUMENT, diff="-a\n+b")):
+            await analyzer.analyze("new text")
+        prompt = analyzer._client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        assert to_compact_json(DOCUMENT) in prompt
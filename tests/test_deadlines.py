@@ -0,0 +1,144 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from openai import APITimeoutError
+
+from src.api.deadlines import ClientDisconnected, cancel_on_disconnect, reserve, run_in_executor
+from src.context import DeadlineExceeded, RequestContext, use_request_context
+from src.main import app
+from src.metrics import metrics
+
+client = TestClient(app)
+
+VALID_RESPONSE = json.dumps({"title": "T", "elements": [{"type": "step", "text": "A", "decision": None}]})
+
+
+async def _hang(**kwargs):
+    """A backend that never answers: the client gives up after its timeout."""
+    await asyncio.sleep(kwargs["timeout"])
+    raise APITimeoutError(request=httpx.Request("POST", "https://example.invalid"))
+
+
+class TestReserve:
+    def test_moves_deadline_forward(self):
+        context = RequestContext(deadline=time.monotonic() + 100)
+        assert reserve(context, 5).deadline == pytest.approx(context.deadline - 5)
+
+    def test_reserves_at_most_half_of_what_is_left(self):
+        context = RequestContext(deadline=time.monotonic() + 4)
+        assert reserve(context, 5).time_left() == pytest.approx(2, abs=0.05)
+
+    def test_no_deadline(self):
+        assert reserve(RequestContext(), 5).deadline is None
+
+
+class TestLLMClientTimeout:
+    async def test_timeout_cut_to_deadline(self, llm_analyzer):
+        analyzer = llm_analyzer(VALID_RESPONSE, VALID_RESPONSE)
+        create = analyzer._client.chat.completions.create
+        await analyzer.analyze("SOP")
+        assert create.call_args.kwargs["timeout"] == 60.0
+
+        with use_request_context(RequestContext(deadline=time.monotonic() + 10)):
+            await analyzer.analyze("SOP")
+        assert create.call_args.kwargs["timeout"] == pytest.approx(10, abs=0.5)
+
+    async def test_expired_deadline_skips_call(self, llm_analyzer):
+        analyzer = llm_analyzer(VALID_RESPONSE)
+        with use_request_context(RequestContext(deadline=time.monotonic() - 1)):
+            with pytest.raises(DeadlineExceeded):
+                await analyzer.analyze("SOP")
+        analyzer._client.chat.completions.create.assert_not_called()
+
+    async def test_client_timeout_at_deadline_is_deadline_exceeded(self, llm_analyzer):
+        with use_request_context(RequestContext(deadline=time.monotonic() + 0.05)):
+            with pytest.raises(DeadlineExceeded):
+                await llm_analyzer(side_effect=_hang).analyze("SOP")
+        # Without a deadline the client's own timeout error surfaces unchanged
+        with pytest.raises(APITimeoutError):
+            await llm_analyzer(side_effect=_hang, timeout=0.01).analyze("SOP")
+
+    async def test_client_timeout_before_deadline_is_backend_error(self, llm_analyzer):
+        with use_request_context(RequestContext(deadline=time.monotonic() + 5)):
+            # The client's own timeout is the shorter one
+            with pytest.raises(APITimeoutError):
+                await llm_analyzer(side_effect=_hang, timeout=0.01).analyze("SOP")
+            # Cut to the deadline, but timed out well before it
+            timed_out = APITimeoutError(request=httpx.Request("POST", "https://example.invalid"))
+            with pytest.raises(APITimeoutError):
+                await llm_analyzer(side_effect=timed_out).analyze("SOP")
+
+
+class TestCancellation:
+    async def test_disconnect_cancels_work(self):
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        polls = iter([False, True])
+        with pytest.raises(ClientDisconnected):
+            await cancel_on_disconnect(work(), AsyncMock(side_effect=lambda: next(polls)), poll_interval=0.01)
+        assert cancelled.is_set()
+
+    async def test_connected_client_gets_result(self):
+        async def work():
+            await asyncio.sleep(0.03)
+            return "done"
+
+        assert await cancel_on_disconnect(work(), AsyncMock(return_value=False), poll_interval=0.01) == "done"
+
+    async def test_queued_cpu_job_never_runs(self):
+        metrics.reset()
+        release = threading.Event()
+        ran = []
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            busy = asyncio.ensure_future(run_in_executor(executor, "build", release.wait))
+            queued = asyncio.ensure_future(run_in_executor(executor, "layout", lambda: ran.append(1)))
+            await asyncio.sleep(0.01)
+            queued.cancel()
+            await asyncio.gather(queued, return_exceptions=True)
+            release.set()
+            await busy
+        assert ran == []
+        assert metrics.counter("cpu_jobs_cancelled_total", stage="layout") == 1
+
+
+class TestConvertDeadline:
+    def test_slow_llm_returns_504(self, sample_sop_docx_bytes):
+        metrics.reset()
+
+        async def slow_parse(document):
+            await asyncio.sleep(5)
+
+        with patch("src.api.routes.get_parser") as get_parser:
+            get_parser.return_value.parse_all = slow_parse
+            started = time.perf_counter()
+            response = client.post(
+                "/convert",
+                headers={"X-Request-Timeout": "0.2"},
+                files={"file": ("test.docx", sample_sop_docx_bytes, "application/octet-stream")},
+            )
+        assert response.status_code == 504
+        assert response.headers["X-Failed-Stage"] == "parse"
+        assert time.perf_counter() - started < 2
+        assert metrics.counter("requests_timed_out_total", stage="parse") == 1
+
+    def test_invalid_request_timeout(self, sample_sop_docx_bytes):
+        response = client.post(
+            "/convert",
+            headers={"X-Request-Timeout": "-1"},
+            files={"file": ("test.docx", sample_sop_docx_bytes, "application/octet-stream")},
+        )
+        assert response.status_code == 400
@@ -0,0 +1,115 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from benchmarks.fake_openai import FakeLLMConfig, create_app
+from benchmarks.load_driver import parse_server_timing, percentile
+from src.parser.llm_analyzer import LLMSOPAnalyzer
+
+COMPLETIONS_PATH = "/openai/deployments/gpt-4o/chat/completions?api-version=2024-02-01"
+
+
+def _request(sop_text: str, **extra) -> dict:
+    return {
+        "messages": [
+            {"role": "system", "content": "system prompt"},
+            {"role": "user", "content": f"Analyze this SOP and return the structured JSON:\n\n{sop_text}"},
+        ],
+        **extra,
+    }
+
+
+class TestFakeOpenAI:
+    def test_echo_response_parses_as_sop(self, sample_sop_text):
+        client = TestClient(create_app(FakeLLMConfig(latency_ms=0)))
+        response = client.post(COMPLETIONS_PATH, json=_request(sample_sop_text))
+
+        assert response.status_code == 200
+        choice = response.json()["choices"][0]
+        assert choice["finish_reason"] == "stop"
+
+        analyzer = LLMSOPAnalyzer(api_key="test", azure_endpoint="https://example.invalid")
+        sop = analyzer._parse_content(choice["message"]["content"])
+        assert len(sop.elements) == 6
+        assert sop.elements[1].decision is not None
+
+    def test_compact_echo_for_compact_schema(self, sample_sop_text):
+        client = TestClient(create_app(FakeLLMConfig(latency_ms=0)))
+        response_format = {"type": "json_schema", "json_schema": {"name": "sop_compact", "schema": {}}}
+        response = client.post(COMPLETIONS_PATH, json=_request(sample_sop_text, response_format=response_format))
+        content = response.json()["choices"][0]["message"]["content"]
+
+        analyzer = LLMSOPAnalyzer(api_key="test", azure_endpoint="https://example.invalid", wire_format="compact")
+        sop = analyzer._parse_content(content)
+        assert json.loads(content)["t"] == "Fake SOP"
+        assert len(sop.elements) == 6
+        assert sop.elements[1].decision is not None
+
+    def test_canned_responses_round_robin(self):
+        canned = ['{"title": "A", "elements": []}', '{"title": "B", "elements": []}']
+        client = TestClient(create_app(FakeLLMConfig(latency_ms=0, responses=canned)))
+
+        titles = [
+            json.loads(client.post(COMPLETIONS_PATH, json=_request("x")).json()["choices"][0]["message"]["content"])["title"]
+            for _ in range(3)
+        ]
+        assert titles == ["A", "B", "A"]
+
+    def test_injected_rate_limit(self):
+        client = TestClient(create_app(FakeLLMConfig(latency_ms=0, rate_429=1.0)))
+        response = client.post(COMPLETIONS_PATH, json=_request("x"))
+
+        assert response.status_code == 429
+        assert "retry-after" in response.headers
+
+    def test_max_tokens_truncates(self, sample_sop_text):
+        client = TestClient(create_app(FakeLLMConfig(latency_ms=0)))
+        response = client.post(COMPLETIONS_PATH, json=_request(sample_sop_text, max_tokens=10))
+
+        choice = response.json()["choices"][0]
+        assert choice["finish_reason"] == "length"
+        assert len(choice["message"]["content"]) == 40
+
+    def test_streaming(self, sample_sop_text):
+        client = TestClient(create_app(FakeLLMConfig(latency_ms=0)))
+        response = client.post(COMPLETIONS_PATH, json=_request(sample_sop_text, stream=True))
+
+        events = [line[len("data: "):] for line in response.text.splitlines() if line.startswith("data: ")]
+        assert events[-1] == "[DONE]"
+        chunks = [json.loads(e) for e in events[:-1]]
+        content = "".join(c["choices"][0]["delta"].get("content", "") for c in chunks)
+        assert json.loads(content)["title"] == "Fake SOP"
+        assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+
+    def test_batched_request_echoes_each_sop(self):
+        client = TestClient(create_app(FakeLLMConfig(latency_ms=0)))
+        body = {"messages": [{"role": "user", "content": "Analyze each...\n\n### SOP 1\nStep A\n\n### SOP 2\nStep B"}]}
+        response = client.post(COMPLETIONS_PATH, json=body)
+
+        documents = json.loads(response.json()["choices"][0]["message"]["content"])["documents"]
+        assert [d["elements"][0]["text"] for d in documents] == ["Step A", "Step B"]
+        assert client.get("/stats").json()["completion_tokens"] > 0
+
+
+class TestLoadDriverHelpers:
+    def test_parse_server_timing(self):
+        stages = parse_server_timing("parse;dur=120.5, build;dur=1.5")
+        assert stages == {"parse": 0.1205, "build": 0.0015}
+
+    def test_percentile(self):
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+
+
+class TestFakeOpenAIContinuation:
+    def test_continuation_returns_remainder(self, sample_sop_text):
+        client = TestClient(create_app(FakeLLMConfig(latency_ms=0)))
+        first = client.post(COMPLETIONS_PATH, json=_request(sample_sop_text, max_tokens=50)).json()
+        partial = first["choices"][0]["message"]["content"]
+
+        body = _request(sample_sop_text)
+        body["messages"] += [{"role": "assistant", "content": partial}, {"role": "user", "content": "Continue"}]
+        rest = client.post(COMPLETIONS_PATH, json=body).json()["choices"][0]["message"]["content"]
+
+        assert json.loads(partial + rest)["title"] == "Fake SOP"
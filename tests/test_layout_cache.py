@@ -0,0 +1,77 @@
+from benchmarks.bench_builder import typical_sop
+from src.generator.bpmn_builder import BPMNBuilder
+from src.generator.layout import CachedLayoutEngine, LayoutEngine, topology_hash
+from src.generator.simplifier import GraphSimplifier
+from src.generator.svg_renderer import process_hash
+from src.metrics import metrics
+from src.models.bpmn import BPMNNodeType
+from src.models.sop import SOPDocument, SOPElement, SOPElementType
+
+
+def _process(sop: SOPDocument, index: int = 1):
+    process = BPMNBuilder().build(sop, index)
+    GraphSimplifier().simplify(process)
+    return process
+
+
+def _renamed(steps: int) -> SOPDocument:
+    sop = typical_sop(steps)
+    sop.title = "Another SOP"
+    for element in sop.elements:
+        element.text = element.text.upper()
+    return sop
+
+
+def _geometry(process):
+    return (
+        [(n.x, n.y, n.width, n.height) for n in process.nodes],
+        [[(wp.x, wp.y) for wp in f.waypoints] for f in process.sequence_flows],
+    )
+
+
+class TestTopologyHash:
+    def test_ignores_names_and_ids(self):
+        assert topology_hash(_process(typical_sop(12))) == topology_hash(_process(_renamed(12), 2))
+
+    def test_differs_by_shape(self):
+        assert topology_hash(_process(typical_sop(12))) != topology_hash(_process(typical_sop(13)))
+
+    def test_differs_by_node_type(self):
+        steps = SOPDocument("T", [SOPElement(SOPElementType.STEP, "a"), SOPElement(SOPElementType.STEP, "b")])
+        first, second = _process(steps), _process(steps)
+        second.nodes[1].node_type = BPMNNodeType.EXCLUSIVE_GATEWAY
+        assert topology_hash(first) != topology_hash(second)
+
+
+class TestCachedLayoutEngine:
+    def setup_method(self):
+        metrics.reset()
+
+    def test_hit_matches_fresh_layout(self):
+        engine = CachedLayoutEngine(LayoutEngine(), max_entries=8)
+        engine.apply_layout(_process(typical_sop(12)))
+
+        cached, fresh = _process(_renamed(12)), _process(_renamed(12))
+        engine.apply_layout(cached)
+        LayoutEngine().apply_layout(fresh)
+
+        assert _geometry(cached) == _geometry(fresh)
+        assert process_hash(cached) == process_hash(fresh)
+        assert metrics.counter("layout_cache_total", outcome="miss") == 1
+        assert metrics.counter("layout_cache_total", outcome="hit") == 1
+
+    def test_cached_waypoints_are_not_shared(self):
+        engine = CachedLayoutEngine(LayoutEngine(), max_entries=8)
+        first, second = _process(typical_sop(6)), _process(typical_sop(6))
+        engine.apply_layout(first)
+        engine.apply_layout(second)
+        second.sequence_flows[0].waypoints[0].x += 10
+        assert first.sequence_flows[0].waypoints[0].x != second.sequence_flows[0].waypoints[0].x
+
+    def test_evicts_least_recently_used(self):
+        engine = CachedLayoutEngine(LayoutEngine(), max_entries=2)
+        for steps in (3, 4, 3, 5, 3, 4):
+            engine.apply_layout(_process(typical_sop(steps)))
+        # 3 stays hot; 4 is evicted by 5 and laid out again
+        assert metrics.counter("layout_cache_total", outcome="miss") == 4
+        assert metrics.counter("layout_cache_total", outcome="hit") == 2
@@ -0,0 +1,208 @@
+import json
+
+import pytest
+
+from src.metrics import metrics
+from src.models.sop import SOPElementType
+from src.parser.sop_schema import decode_wire, repair_json, sop_json_schema
+
+VALID_RESPONSE = {
+    "title": "Triage",
+    "elements": [
+        {"type": "step", "text": "Receive email", "decision": None},
+        {
+            "type": "decision",
+            "text": "Check billing",
+            "decision": {
+                "question": "Billing-related?",
+                "branches": [
+                    {"condition_label": "Yes", "steps": [{"type": "step", "text": "Billing Queue", "decision": None}]},
+                    {"condition_label": "No", "steps": []},
+                ],
+            },
+        },
+        {"type": "step", "text": "Send ack", "decision": None},
+    ],
+}
+
+
+def _nested_response(depth: int) -> str:
+    """Wire JSON of ``depth`` decisions, each nested in the first branch of the one before."""
+    opening = '{"type":"decision","text":"Check","decision":{"question":"Q?","branches":[{"condition_label":"Yes","steps":['
+    closing = "]}]}}"
+    inner = '{"type":"step","text":"Innermost step","decision":null}'
+    return '{"title":"Deep","elements":[' + opening * depth + inner + closing * depth + "]}"
+
+
+class TestStructuredOutput:
+    def test_schema_is_strict(self):
+        schema = sop_json_schema()
+        objects = [schema, *schema["$defs"].values()]
+        for obj in objects:
+            assert obj["additionalProperties"] is False
+            assert set(obj["required"]) == set(obj["properties"])
+        assert "title" in schema["properties"]
+
+    async def test_request_uses_json_schema_response_format(self, llm_analyzer):
+        analyzer = llm_analyzer(json.dumps(VALID_RESPONSE))
+        await analyzer.analyze("some SOP")
+
+        kwargs = analyzer._client.chat.completions.create.call_args.kwargs
+        assert kwargs["response_format"]["type"] == "json_schema"
+        assert kwargs["response_format"]["json_schema"]["strict"] is True
+
+    async def test_text_output_format_omits_response_format(self, llm_analyzer):
+        analyzer = llm_analyzer(json.dumps(VALID_RESPONSE), output_format="text")
+        await analyzer.analyze("some SOP")
+
+        kwargs = analyzer._client.chat.completions.create.call_args.kwargs
+        assert "response_format" not in kwargs
+
+    async def test_max_tokens_override(self, llm_analyzer):
+        analyzer = llm_analyzer(json.dumps(VALID_RESPONSE), json.dumps(VALID_RESPONSE))
+        await analyzer.analyze("some SOP")
+        assert analyzer._client.chat.completions.create.call_args.kwargs["max_tokens"] == 4096
+        await analyzer.analyze("some SOP", max_tokens=1024)
+        assert analyzer._client.chat.completions.create.call_args.kwargs["max_tokens"] == 1024
+
+    async def test_parses_into_sop_document(self, llm_analyzer):
+        sop = await llm_analyzer(json.dumps(VALID_RESPONSE)).analyze("some SOP")
+
+        assert sop.title == "Triage"
+        assert [e.element_type for e in sop.elements] == [
+            SOPElementType.STEP,
+            SOPElementType.DECISION,
+            SOPElementType.STEP,
+        ]
+        branches = sop.elements[1].decision.branches
+        assert branches[0].steps[0].text == "Billing Queue"
+        assert branches[1].steps == []
+
+    async def test_tolerates_missing_optional_fields(self, llm_analyzer):
+        content = '{"elements": [{"text": "Only step"}, {"type": "decision", "text": "Check it"}]}'
+        sop = await llm_analyzer(content).analyze("some SOP")
+
+        assert sop.title == "Untitled SOP"
+        assert sop.elements[0].element_type == SOPElementType.STEP
+        assert sop.elements[1].decision.question == "Check it"
+
+    async def test_strips_code_fences(self, llm_analyzer):
+        content = "```json\n" + json.dumps(VALID_RESPONSE) + "\n```"
+        sop = await llm_analyzer(content).analyze("some SOP")
+        assert sop.title == "Triage"
+
+
+class TestWireDecoding:
+    def test_decodes_deep_nesting(self):
+        document = decode_wire(_nested_response(190))
+        depth, elements = 0, document.elements
+        while elements[0].decision is not None:
+            depth += 1
+            elements = elements[0].decision.branches[0].steps
+        assert depth == 190
+        assert elements[0].text == "Innermost step"
+
+    async def test_deep_response_needs_no_repair(self, llm_analyzer):
+        metrics.reset()
+        analyzer = llm_analyzer(_nested_response(100))
+        document = await analyzer.analyze("some SOP")
+        assert document.title == "Deep"
+        assert metrics.counter("llm_output_parse_total", outcome="valid") == 1
+
+    def test_too_deep_for_json_is_value_error(self):
+        with pytest.raises(ValueError):
+            decode_wire(_nested_response(5000))
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "[]",
+            '{"elements":{}}',
+            '{"elements":[{"type":"loop","text":"x"}]}',
+            '{"elements":[{"type":"step","text":null}]}',
+            '{"elements":[{"type":"decision","text":"x","decision":{"branches":["Yes"]}}]}',
+        ],
+    )
+    def test_malformed_input_raises_value_error(self, text):
+        with pytest.raises(ValueError):
+            decode_wire(text)
+
+
+class TestJSONRepair:
+    async def test_repairs_trailing_commas_and_counts_saving(self, llm_analyzer):
+        metrics.reset()
+        content = '{"title": "T", "elements": [{"type": "step", "text": "A"},],}'
+        sop = await llm_analyzer(content).analyze("some SOP")
+
+        assert sop.elements[0].text == "A"
+        assert metrics.counter("llm_output_parse_total", outcome="repaired") == 1
+        assert metrics.counter("llm_calls_saved_total", reason="json_repair") == 1
+
+    async def test_unrepairable_output_raises(self, llm_analyzer):
+        metrics.reset()
+        with pytest.raises(ValueError, match="invalid SOP JSON"):
+            await llm_analyzer("I cannot help with that.").analyze("some SOP")
+        assert metrics.counter("llm_output_parse_total", outcome="failed") == 1
+
+    @pytest.mark.parametrize(
+        "broken",
+        [
+            'Here is the JSON:\n{"title": "T", "elements": []}\nHope this helps!',
+            '{"title": "T", "elements": [{"type": "step", "text": "line one\nline two"}]}',
+            '{"title": "T", "elements": [{"type": "step", "text": "A", "decision": None}]}',
+            '{"title": "T", "elements": [{"type": "step", "text": "unterminated',
+            '{"title": "T", "elements": [{"type": "step", "text": "A"}',
+        ],
+    )
+    def test_repair_produces_valid_json(self, broken):
+        repaired = json.loads(repair_json(broken))
+        assert repaired["title"] == "T"
+
+    async def test_non_ascii_bare_word_is_parse_error(self, llm_analyzer):
+        content = '{"title": "T", "elements": [], é}'
+        assert repair_json(content) == content
+        with pytest.raises(ValueError, match="invalid SOP JSON"):
+            await llm_analyzer(content).analyze("some SOP")
+
+    def test_repair_leaves_valid_json_unchanged(self):
+        text = json.dumps(VALID_RESPONSE)
+        assert json.loads(repair_json(text)) == VALID_RESPONSE
+
+
+class TestContinuation:
+    async def test_truncated_output_is_continued(self, llm_analyzer):
+        metrics.reset()
+        full = json.dumps(VALID_RESPONSE)
+        analyzer = llm_analyzer((full[:100], "length"), full[100:])
+
+        sop = await analyzer.analyze("some SOP")
+
+        assert sop.title == "Triage"
+        assert len(sop.elements) == 3
+        assert metrics.counter("llm_continuations_total") == 1
+
+        create = analyzer._client.chat.completions.create
+        follow_up = create.call_args_list[1].kwargs
+        assert "response_format" not in follow_up
+        assert follow_up["messages"][-2] == {"role": "assistant", "content": full[:100]}
+
+    async def test_multiple_rounds_and_overlap(self, llm_analyzer):
+        full = json.dumps(VALID_RESPONSE)
+        analyzer = llm_analyzer(
+            (full[:80], "length"),
+            (full[60:160], "length"),  # repeats 20 characters
+            full[160:],
+        )
+
+        sop = await analyzer.analyze("some SOP")
+        assert sop.elements[1].decision.branches[0].steps[0].text == "Billing Queue"
+
+    async def test_rounds_are_capped(self, llm_analyzer):
+        metrics.reset()
+        full = json.dumps(VALID_RESPONSE)
+        analyzer = llm_analyzer((full[:50], "length"), (full[50:100], "length"), max_continuations=1)
+
+        with pytest.raises(ValueError, match="truncated"):
+            await analyzer.analyze("some SOP")
+        assert analyzer._client.chat.completions.create.await_count == 2
+        assert metrics.counter("llm_continuations_exhausted_total") == 1
@@ -0,0 +1,204 @@
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from src.metrics import metrics
+from src.models.sop import SOPBranch, SOPDecision, SOPDocument, SOPElement, SOPElementType
+from src.parser.llm_analyzer import PriorAnalysis, current_prior_analysis, use_prior_analysis
+from src.parser.near_duplicate import (
+    LSHIndex,
+    MinHasher,
+    NearDuplicateAnalyzer,
+    estimate_similarity,
+    paragraph_diff,
+    rename_patch,
+)
+from src.parser.sop_schema import decode_wire, to_wire_json
+
+SOP_TEXT = "\n".join(
+    [
+        "Finance Department Invoice Approval",
+        "1. Receive the invoice from the supplier by email.",
+        "2. Register the invoice in the Finance Department ledger.",
+        "3. Check if the amount exceeds the approval limit.",
+        "If yes, escalate to the Finance Department manager for sign-off.",
+        "If no, approve the invoice directly.",
+        "4. Schedule the payment run and archive the invoice with its purchase order.",
+        "5. Notify the supplier that the invoice has been processed and paid.",
+    ]
+)
+
+DOCUMENT = SOPDocument(
+    title="Finance Department Invoice Approval",
+    elements=[
+        SOPElement(SOPElementType.STEP, "Register invoice in the Finance Department ledger"),
+        SOPElement(
+            SOPElementType.DECISION,
+            "Check amount",
+            decision=SOPDecision(
+                question="Amount above limit?",
+                branches=[
+                    SOPBranch("Yes", [SOPElement(SOPElementType.STEP, "Escalate to Finance Department manager")]),
+                    SOPBranch("No", [SOPElement(SOPElementType.STEP, "Approve invoice")]),
+                ],
+            ),
+        ),
+        SOPElement(SOPElementType.STEP, "Schedule payment"),
+    ],
+)
+
+
+def _inner(document: SOPDocument = DOCUMENT) -> SimpleNamespace:
+    return SimpleNamespace(analyze=AsyncMock(return_value=document))
+
+
+class TestMinHash:
+    def test_similarity_tracks_edits(self):
+        hasher = MinHasher()
+        base = hasher.signature(SOP_TEXT)
+        renamed = hasher.signature(SOP_TEXT.replace("Finance", "Billing"))
+        unrelated = hasher.signature("Open the warehouse gate.\nCount the pallets.\nLock the gate.")
+        assert estimate_similarity(base, base) == 1.0
+        assert estimate_similarity(base, renamed) > 0.75
+        assert estimate_similarity(base, unrelated) < 0.2
+
+    def test_lsh_finds_similar_not_unrelated(self):
+        hasher = MinHasher()
+        index = LSHIndex()
+        index.add(1, hasher.signature(SOP_TEXT))
+        rng = random.Random(0)
+        for key in range(2, 200):
+            index.add(key, tuple(rng.getrandbits(64) for _ in range(128)))
+        edited = SOP_TEXT.replace("by email", "by e-mail")
+        assert 1 in index.candidates(hasher.signature(edited))
+        assert index.candidates(hasher.signature("Completely different procedure text.")) == set()
+
+    def test_remove(self):
+        hasher = MinHasher()
+        index = LSHIndex()
+        signature = hasher.signature(SOP_TEXT)
+        index.add(1, signature)
+        index.remove(1, signature)
+        assert index.candidates(signature) == set()
+
+
+class TestRenamePatch:
+    def test_consistent_rename_applied_everywhere(self):
+        patched = rename_patch(SOP_TEXT, SOP_TEXT.replace("Finance", "Billing"), DOCUMENT)
+        assert patched is not None
+        assert patched.title == "Billing Department Invoice Approval"
+        assert patched.elements[0].text == "Register invoice in the Billing Department ledger"
+        assert patched.elements[1].decision.branches[0].steps[0].text == "Escalate to Billing Department manager"
+        # The cached document is left untouched
+        assert DOCUMENT.title == "Finance Department Invoice Approval"
+
+    def test_partial_rename_rejected(self):
+        new_text = SOP_TEXT.replace("Finance", "Billing", 1)
+        assert rename_patch(SOP_TEXT, new_text, DOCUMENT) is None
+
+    def test_inserted_words_rejected(self):
+        new_text = SOP_TEXT.replace("approve the invoice directly", "approve the invoice directly and log it")
+        assert rename_patch(SOP_TEXT, new_text, DOCUMENT) is None
+
+    def test_deeply_nested_document(self):
+        innermost = SOPElement(SOPElementType.STEP, "Escalate to Finance Department manager")
+        element = innermost
+        for _ in range(2000):
+            decision = SOPDecision("Amount above limit?", [SOPBranch("Yes", [element])])
+            element = SOPElement(SOPElementType.DECISION, "Check amount", decision=decision)
+        patched = rename_patch(SOP_TEXT, SOP_TEXT.replace("Finance", "Billing"), SOPDocument("T", [element]))
+        assert patched is not None
+        found = patched.elements[0]
+        while found.decision is not None:
+            found = found.decision.branches[0].steps[0]
+        assert found.text == "Escalate to Billing Department manager"
+        assert innermost.text == "Escalate to Finance Department manager"
+
+
+class TestNearDuplicateAnalyzer:
+    async def test_exact_repeat_skips_analysis(self):
+        inner = _inner()
+        analyzer = NearDuplicateAnalyzer(inner)
+        assert await analyzer.analyze(SOP_TEXT) is DOCUMENT
+        assert await analyzer.analyze(SOP_TEXT) is DOCUMENT
+        assert inner.analyze.await_count == 1
+
+    async def test_renamed_copy_patched_locally(self):
+        metrics.reset()
+        inner = _inner()
+        analyzer = NearDuplicateAnalyzer(inner)
+        await analyzer.analyze(SOP_TEXT)
+        result = await analyzer.analyze(SOP_TEXT.replace("Finance", "Treasury"))
+        assert inner.analyze.await_count == 1
+        assert result.title == "Treasury Department Invoice Approval"
+        assert metrics.counter("near_duplicate_total", outcome="patched") == 1
+        assert metrics.counter("llm_calls_saved_total", reason="near_duplicate") == 1
+
+    async def test_hashing_and_patching_run_on_executor(self):
+        threads = []
+
+        class RecordingHasher(MinHasher):
+            def signature(self, text):
+                threads.append(threading.current_thread())
+                return super().signature(text)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            analyzer = NearDuplicateAnalyzer(_inner(), hasher=RecordingHasher(), executor=executor)
+            await analyzer.analyze(SOP_TEXT)
+            result = await analyzer.analyze(SOP_TEXT.replace("Finance", "Treasury"))
+        assert result.title == "Treasury Department Invoice Approval"
+        assert len(threads) == 2 and threading.main_thread() not in threads
+
+    async def test_reworded_step_sent_as_revision(self):
+        seen = {}
+
+        async def analyze(sop_text):
+            seen["prior"] = current_prior_analysis()
+            return DOCUMENT
+
+        analyzer = NearDuplicateAnalyzer(SimpleNamespace(analyze=analyze))
+        await analyzer.analyze(SOP_TEXT)
+        assert seen["prior"] is None
+        edited = SOP_TEXT.replace("approve the invoice directly.", "approve the invoice directly and file it.")
+        await analyzer.analyze(edited)
+        prior = seen["prior"]
+        assert prior is not None
+        assert "+If no, approve the invoice directly and file it." in prior.diff
+        assert prior.document is DOCUMENT
+
+    async def test_unrelated_text_is_analyzed(self):
+        inner = _inner()
+        analyzer = NearDuplicateAnalyzer(inner)
+        await analyzer.analyze(SOP_TEXT)
+        await analyzer.analyze("Open the warehouse gate.\nCount the pallets.\nLock the gate.")
+        assert inner.analyze.await_count == 2
+
+    async def test_lru_eviction(self):
+        inner = _inner()
+        analyzer = NearDuplicateAnalyzer(inner, max_entries=2)
+        for text in ("alpha procedure one", "beta procedure two", "gamma procedure three", "alpha procedure one"):
+            await analyzer.analyze(text)
+        assert len(analyzer) == 2
+        assert inner.analyze.await_count == 4
+
+
+class TestRevisionPrompt:
+    async def test_prior_analysis_changes_prompt(self, llm_analyzer):
+        analyzer = llm_analyzer(to_wire_json(DOCUMENT))
+
+        with use_prior_analysis(PriorAnalysis(SOPDocument(title="Old"), diff="-a\n+b")):
+            await analyzer.analyze("new text")
+        prompt = analyzer._client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        assert '"title":"Old"' in prompt
+        assert "-a\n+b" in prompt
+        assert prompt.endswith("new text")
+
+
+def test_wire_json_round_trip():
+    assert decode_wire(to_wire_json(DOCUMENT)) == DOCUMENT
+
+
+def test_paragraph_diff_lists_changed_lines_only():
+    assert paragraph_diff("a\nb\nc", "a\nB\nc") == "-b\n+B"
@@ -1,8 +1,21 @@
+import asyncio
+import mmap
+import tempfile
 from io import BytesIO
+from types import SimpleNamespace
 
+import pytest
 from docx import Document as DocxDocument
 
-from src.parser.docx_parser import DocxSOPParser
+from src.api.uploads import MappedFile
+from src.models.sop import SOPDocument
+from src.parser.docx_parser import (
+    DocxSOPParser,
+    extract_procedures,
+    extract_text,
+    heading_level_of,
+    iter_paragraphs,
+)
 
 
 class TestDocxTextExtraction:
@@ -46,3 +59,104 @@ class TestDocxTextExtraction:
         assert lines[0] == "First line"
         assert lines[1] == "Second line"
         assert lines[2] == "Third line"
+
+    def test_extract_text_from_mapped_file(self, sample_sop_docx_bytes):
+        parser = DocxSOPParser.__new__(DocxSOPParser)
+        expected = parser._extract_text(sample_sop_docx_bytes)
+
+        with tempfile.TemporaryFile() as spool:
+            spool.write(sample_sop_docx_bytes)
+            spool.flush()
+            with mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+                text = parser._extract_text(MappedFile(mapping))
+
+        assert text == expected
+
+    def test_extract_text_matches_python_docx(self):
+        doc = DocxDocument()
+        doc.add_heading("Heading", level=1)
+        para = doc.add_paragraph("Tabbed\ttext")
+        para.add_run().add_break()
+        para.add_run("after break")
+        doc.add_table(rows=1, cols=1).cell(0, 0).text = "Table cell"
+        doc.add_paragraph("Last line")
+        buf = BytesIO()
+        doc.save(buf)
+
+        parser = DocxSOPParser.__new__(DocxSOPParser)
+        text = parser._extract_text(buf.getvalue())
+
+        expected = [p.text.strip() for p in DocxDocument(BytesIO(buf.getvalue())).paragraphs]
+        assert text == "\n".join(line for line in expected if line)
+        assert "Table cell" not in text
+
+
+def _manual_docx() -> bytes:
+    doc = DocxDocument()
+    doc.add_heading("Quality Manual", level=0)
+    doc.add_paragraph("This manual collects our procedures.")
+    for name in ("Invoice Approval", "Supplier Onboarding", "Returns Handling"):
+        doc.add_heading(name, level=1)
+        doc.add_heading("Steps", level=2)
+        doc.add_paragraph(f"Start {name.lower()}.")
+        doc.add_paragraph(f"Finish {name.lower()}.")
+    buf = BytesIO()
+    doc.save(buf)
+    return buf.getvalue()
+
+
+class TestProcedureSplitting:
+    def test_paragraph_styles(self):
+        styles = [style for style, _ in iter_paragraphs(BytesIO(_manual_docx()))]
+        assert [heading_level_of(style) for style in styles[:4]] == [None, None, 1, 2]
+
+    def test_splits_at_heading_level(self):
+        procedures = extract_procedures(_manual_docx(), heading_level=1)
+        assert len(procedures) == 3
+        assert procedures[0].split("\n") == [
+            "Invoice Approval",
+            "Steps",
+            "Start invoice approval.",
+            "Finish invoice approval.",
+        ]
+        assert all("Quality Manual" not in text for text in procedures)
+
+    def test_single_heading_keeps_whole_document(self, sample_sop_docx_bytes):
+        assert extract_procedures(sample_sop_docx_bytes) == [extract_text(sample_sop_docx_bytes)]
+
+    def test_level_zero_disables_splitting(self):
+        assert extract_procedures(_manual_docx(), heading_level=0) == [extract_text(_manual_docx())]
+
+    async def test_procedures_are_analyzed_concurrently(self):
+        in_flight = peak = 0
+
+        async def analyze(text):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return SOPDocument(title=text.split("\n")[0])
+
+        parser = DocxSOPParser(SimpleNamespace(analyze=analyze))
+        documents = await parser.parse_all(_manual_docx())
+        assert [d.title for d in documents] == ["Invoice Approval", "Supplier Onboarding", "Returns Handling"]
+        assert peak == 3
+
+    async def test_failed_procedure_cancels_the_others(self):
+        cancelled = []
+
+        async def analyze(text):
+            if text.startswith("Supplier"):
+                raise ValueError("bad LLM output")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(text)
+                raise
+
+        parser = DocxSOPParser(SimpleNamespace(analyze=analyze))
+        with pytest.raises(ValueError):
+            await parser.parse_all(_manual_docx())
+        await asyncio.sleep(0)
+        assert len(cancelled) == 2
@@ -0,0 +1,122 @@
+import pstats
+import tracemalloc
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.profiling import ProfileCapture, ProfileStore, RequestProfiler
+from src.config import Settings
+from src.main import app
+from src.models.sop import SOPDocument, SOPElement, SOPElementType
+
+client = TestClient(app)
+
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    profiler = RequestProfiler(ProfileStore(tmp_path, retention=2), sample_rate=0.0)
+    parser = AsyncMock()
+    parser.parse_all.return_value = [
+        SOPDocument(
+            title="Profiled",
+            elements=[SOPElement(element_type=SOPElementType.STEP, text="Step 1")],
+        ),
+    ]
+    with patch("src.api.admin.get_settings", return_value=Settings(admin_token="secret")), \
+            patch("src.api.routes.get_profiler", return_value=profiler), \
+            patch("src.api.admin.get_profiler", return_value=profiler), \
+            patch("src.api.routes.get_parser", return_value=parser):
+        yield profiler
+
+
+def _convert(docx_bytes: bytes, headers: dict):
+    return client.post("/convert", files={"file": ("p.docx", docx_bytes, DOCX_MIME)}, headers=headers)
+
+
+class TestProfiling:
+    def test_not_profiled_by_default(self, profiler, sample_sop_docx_bytes):
+        response = _convert(sample_sop_docx_bytes, {})
+        assert response.status_code == 200
+        assert "x-profile-id" not in response.headers
+        assert profiler.store.list() == []
+
+    def test_profile_header_requires_admin_token(self, profiler, sample_sop_docx_bytes):
+        response = _convert(sample_sop_docx_bytes, {"X-Profile": "1", "X-Admin-Token": "wrong"})
+        assert "x-profile-id" not in response.headers
+
+    def test_admin_profile_is_stored_and_downloadable(self, profiler, sample_sop_docx_bytes, tmp_path):
+        response = _convert(sample_sop_docx_bytes, {"X-Profile": "1", **ADMIN})
+        profile_id = response.headers["x-profile-id"]
+
+        listing = client.get("/admin/profiles", headers=ADMIN).json()["profiles"]
+        assert [p["id"] for p in listing] == [profile_id]
+        assert set(listing[0]["stages_ms"]) >= {"build", "layout", "write"}
+        assert set(listing[0]["snapshots"]) >= {"build", "layout", "write"}
+
+        prof = client.get(f"/admin/profiles/{profile_id}", headers=ADMIN)
+        assert prof.status_code == 200
+        dump = tmp_path / "download.prof"
+        dump.write_bytes(prof.content)
+        stats = pstats.Stats(str(dump))
+        assert any("build" in func[2] for func in stats.stats)
+
+        assert client.get(f"/admin/profiles/{profile_id}?format=tracemalloc", headers=ADMIN).status_code == 400
+        snap = client.get(f"/admin/profiles/{profile_id}?format=tracemalloc&stage=build", headers=ADMIN)
+        assert snap.status_code == 200
+        snap_path = tmp_path / "download.tracemalloc"
+        snap_path.write_bytes(snap.content)
+        assert tracemalloc.Snapshot.load(str(snap_path)).traces is not None
+
+        text = client.get(f"/admin/profiles/{profile_id}?format=text", headers=ADMIN)
+        assert "cumulative" in text.text
+        assert "Top allocations by line in build:" in text.text
+
+    def test_retention_limit(self, profiler, sample_sop_docx_bytes):
+        for _ in range(4):
+            _convert(sample_sop_docx_bytes, {"X-Profile": "1", **ADMIN})
+        assert len(profiler.store.list()) == 2
+
+    def test_sampling(self, profiler, sample_sop_docx_bytes):
+        profiler.sample_rate = 1.0
+        response = _convert(sample_sop_docx_bytes, {})
+        assert response.headers["x-profile-id"]
+
+
+class TestProfileCapture:
+    def test_traces_allocations_inside_sections_only(self):
+        capture = ProfileCapture("header", "p.docx")
+        outside = bytearray(1_000_000)
+        with capture.section("first"):
+            first = bytearray(100_000)
+        assert not tracemalloc.is_tracing()
+        between = bytearray(1_000_000)
+        with capture.section("second"):
+            second = bytearray(200_000)
+
+        assert list(capture.snapshots) == ["first", "second"]
+        only_here = [tracemalloc.Filter(True, __file__)]
+        for name, expected in (("first", 100_000), ("second", 200_000)):
+            traced = capture.snapshots[name].filter_traces(only_here)
+            size = sum(stat.size for stat in traced.statistics("filename"))
+            assert expected <= size < 1_000_000
+        del outside, first, between, second
+
+
+class TestAdminAuth:
+    def test_admin_disabled_without_token(self):
+        with patch("src.api.admin.get_settings", return_value=Settings(admin_token="")):
+            assert client.get("/admin/profiles").status_code == 404
+
+    def test_admin_rejects_wrong_token(self, profiler):
+        response = client.get("/admin/profiles", headers={"X-Admin-Token": "nope"})
+        assert response.status_code == 403
+        response = client.get("/admin/profiles", headers={"X-Admin-Token": "sécret".encode("latin-1")})
+        assert response.status_code == 403
+
+    def test_unknown_profile(self, profiler):
+        response = client.get("/admin/profiles/../../etc", headers=ADMIN)
+        assert response.status_code == 404
@@ -0,0 +1,104 @@
+import pytest
+
+from src.metrics import metrics
+from src.models.sop import SOPDocument
+from src.parser.routing import ModelTier, RoutingAnalyzer, estimate_complexity
+
+
+class _RecordingAnalyzer:
+    """Stands in for LLMSOPAnalyzer and records the max_tokens of each call."""
+
+    def __init__(self, fail: bool = False) -> None:
+        self.calls: list[int] = []
+        self.fail = fail
+
+    async def analyze(self, sop_text: str, max_tokens=None) -> SOPDocument:
+        self.calls.append(max_tokens)
+        if self.fail:
+            raise ValueError("LLM returned invalid SOP JSON")
+        return SOPDocument(title="Routed")
+
+
+def _long_sop(steps: int) -> str:
+    lines = []
+    for i in range(1, steps + 1):
+        lines.append(f"{i}. Perform the documented action number {i} and record the outcome in the log")
+        if i % 3 == 0:
+            lines.append(f"{i}.1. If the outcome is unexpected, otherwise escalate to the supervisor")
+            lines.append(f"{i}.1.1. Check whether the supervisor approved the exception")
+    return "\n".join(lines)
+
+
+class TestEstimateComplexity:
+    def test_counts_signals(self):
+        text = "1. Receive request\n2. Check if the form is complete\n2.1. If not, return it\n- Close ticket"
+        complexity = estimate_complexity(text)
+        assert complexity.lines == 4
+        assert complexity.conditionals == 3  # check, if, If
+        assert complexity.list_depth == 2
+        assert complexity.chars == len(text)
+
+    def test_branching_scores_higher_than_plain_text_of_same_length(self):
+        plain = estimate_complexity("Receive the request and file it in the system\n" * 10)
+        branchy = estimate_complexity("If the request is urgent, otherwise file it\n" * 10)
+        assert branchy.score > plain.score
+
+    def test_empty_text(self):
+        complexity = estimate_complexity("")
+        assert complexity.score == 0
+        assert complexity.list_depth == 0
+
+
+class TestRoutingAnalyzer:
+    def _router(self):
+        small, standard, large = _RecordingAnalyzer(), _RecordingAnalyzer(), _RecordingAnalyzer()
+        router = RoutingAnalyzer(
+            [
+                ModelTier("large", large, max_tokens=16384),
+                ModelTier("standard", standard, max_tokens=4096, max_score=6000),
+                ModelTier("small", small, max_tokens=2048, max_score=1500),
+            ]
+        )
+        return router, small, standard, large
+
+    async def test_short_sop_goes_to_small_tier(self):
+        router, small, standard, large = self._router()
+        await router.analyze("1. Receive request\n2. Send acknowledgement")
+        assert len(small.calls) == 1 and not standard.calls and not large.calls
+        assert small.calls[0] == 512
+
+    async def test_large_sop_goes_to_large_tier(self):
+        router, small, standard, large = self._router()
+        await router.analyze(_long_sop(300))
+        assert len(large.calls) == 1 and not small.calls and not standard.calls
+        assert 4096 < large.calls[0] <= 16384
+
+    async def test_max_tokens_grow_with_size_up_to_tier_cap(self):
+        tier_analyzer = _RecordingAnalyzer()
+        router = RoutingAnalyzer([ModelTier("only", tier_analyzer, max_tokens=4096)])
+        for steps in (3, 15, 2000):
+            await router.analyze(_long_sop(steps))
+        assert tier_analyzer.calls[0] < tier_analyzer.calls[1] < tier_analyzer.calls[2] == 4096
+        assert all(budget % 256 == 0 for budget in tier_analyzer.calls)
+
+    async def test_records_decisions_and_latency(self):
+        metrics.reset()
+        router, *_ = self._router()
+        await router.analyze("1. Receive request")
+        await router.analyze(_long_sop(300))
+
+        assert metrics.counter("llm_route_total", tier="small") == 1
+        assert metrics.counter("llm_route_total", tier="large") == 1
+        assert metrics.summary("llm_latency_seconds", tier="small", outcome="ok")["count"] == 1
+        assert metrics.summary("llm_route_score", tier="large")["max"] > 6000
+
+    async def test_failure_recorded_and_propagated(self):
+        metrics.reset()
+        router = RoutingAnalyzer([ModelTier("only", _RecordingAnalyzer(fail=True), max_tokens=4096)])
+        with pytest.raises(ValueError):
+            await router.analyze("1. Receive request")
+        assert metrics.summary("llm_latency_seconds", tier="only", outcome="error")["count"] == 1
+
+    def test_requires_a_tier(self):
+        with pytest.raises(ValueError):
+            RoutingAnalyzer([])
@@ -0,0 +1,117 @@
+from benchmarks.bench_builder import nested_sop
+from src.generator.bpmn_builder import BPMNBuilder
+from src.generator.layout import LayoutEngine
+from src.generator.simplifier import GraphSimplifier
+from src.models.bpmn import BPMNNodeType
+from src.models.sop import SOPBranch, SOPDecision, SOPDocument, SOPElement, SOPElementType
+
+
+def _step(text: str) -> SOPElement:
+    return SOPElement(element_type=SOPElementType.STEP, text=text)
+
+
+def _decision(question: str, *branches: SOPBranch) -> SOPElement:
+    return SOPElement(
+        element_type=SOPElementType.DECISION,
+        text=question,
+        decision=SOPDecision(question=question, branches=list(branches)),
+    )
+
+
+def _simplify(*elements: SOPElement):
+    process = BPMNBuilder().build(SOPDocument(title="T", elements=list(elements)))
+    before = (len(process.nodes), len(process.sequence_flows))
+    report = GraphSimplifier().simplify(process)
+    assert before[0] - report.nodes_removed == len(process.nodes)
+    assert before[1] - report.flows_removed == len(process.sequence_flows)
+    return process, report
+
+
+def _gateways(process):
+    return [
+        n
+        for n in process.nodes
+        if n.node_type in (BPMNNodeType.EXCLUSIVE_GATEWAY, BPMNNodeType.CONVERGING_GATEWAY)
+    ]
+
+
+def _paths(process) -> set[tuple[str, ...]]:
+    """All start-to-end sequences of task names."""
+    node_map = {n.id: n for n in process.nodes}
+    outgoing: dict[str, list[str]] = {n.id: [] for n in process.nodes}
+    for flow in process.sequence_flows:
+        outgoing[flow.source_ref].append(flow.target_ref)
+    start = next(n.id for n in process.nodes if n.node_type == BPMNNodeType.START_EVENT)
+    paths = set()
+    stack = [(start, ())]
+    while stack:
+        node_id, tasks = stack.pop()
+        node = node_map[node_id]
+        if node.node_type == BPMNNodeType.TASK:
+            tasks = (*tasks, node.name)
+        if node.node_type == BPMNNodeType.END_EVENT:
+            paths.add(tasks)
+        stack.extend((target, tasks) for target in outgoing[node_id])
+    return paths
+
+
+class TestGraphSimplifier:
+    def test_two_branch_decision_untouched(self, sample_sop_document):
+        process = BPMNBuilder().build(sample_sop_document)
+        report = GraphSimplifier().simplify(process)
+        assert report.nodes_removed == 0 and report.flows_removed == 0
+        assert len(_gateways(process)) == 2
+
+    def test_decision_without_branches_removed(self):
+        process, report = _simplify(_step("A"), _decision("Anything?"), _step("B"))
+        assert _gateways(process) == []
+        assert report.nodes_removed == 2 and report.flows_removed == 2
+        assert _paths(process) == {("A", "B")}
+
+    def test_single_branch_takes_question_as_label(self):
+        process, _ = _simplify(_step("A"), _decision("Urgent?", SOPBranch("Yes", [_step("Escalate")])), _step("B"))
+        assert _gateways(process) == []
+        assert _paths(process) == {("A", "Escalate", "B")}
+        node_map = {n.id: n.name for n in process.nodes}
+        labelled = [(node_map[f.source_ref], f.name, node_map[f.target_ref]) for f in process.sequence_flows if f.name]
+        assert labelled == [("A", "Urgent?", "Escalate")]
+
+    def test_single_branch_under_labelled_flow_kept(self):
+        inner = _decision("Urgent?", SOPBranch("Yes", [_step("Escalate")]))
+        outer = _decision("Open?", SOPBranch("Yes", [inner]), SOPBranch("No", [_step("Close")]))
+        process, _ = _simplify(outer)
+        # Fusing would lose either the outer branch's label or the inner question
+        assert "Urgent?" in [n.name for n in _gateways(process)]
+        assert _paths(process) == {("Escalate",), ("Close",)}
+
+    def test_all_empty_branches_collapse(self):
+        process, _ = _simplify(_step("A"), _decision("Either?", SOPBranch("Yes"), SOPBranch("No")), _step("B"))
+        assert _gateways(process) == []
+        assert _paths(process) == {("A", "B")}
+
+    def test_nested_joins_merged(self):
+        inner = _decision("Inner?", SOPBranch("Yes", [_step("X")]), SOPBranch("No", [_step("Y")]))
+        outer = _decision("Outer?", SOPBranch("Yes", [inner]), SOPBranch("No", [_step("Z")]))
+        before = BPMNBuilder().build(SOPDocument(title="T", elements=[outer, _step("End")]))
+        process, report = _simplify(outer, _step("End"))
+
+        joins = [n for n in process.nodes if n.node_type == BPMNNodeType.CONVERGING_GATEWAY]
+        assert len(joins) == 1
+        assert report.nodes_removed == 1
+        assert _paths(process) == _paths(before) == {("X", "End"), ("Y", "End"), ("Z", "End")}
+
+    def test_deep_nesting_collapses_join_chain(self):
+        process = BPMNBuilder().build(nested_sop(5000))
+        report = GraphSimplifier().simplify(process)
+        joins = [n for n in process.nodes if n.node_type == BPMNNodeType.CONVERGING_GATEWAY]
+        assert len(joins) == 1
+        assert report.nodes_removed == 4999
+
+    def test_simplified_process_lays_out(self):
+        process, _ = _simplify(
+            _step("A"),
+            _decision("Outer?", SOPBranch("Yes", [_decision("Inner?", SOPBranch("Yes", [_step("X")]), SOPBranch("No"))]), SOPBranch("No")),
+            _step("B"),
+        )
+        LayoutEngine().apply_layout(process)
+        assert all(flow.waypoints for flow in process.sequence_flows)
@@ -0,0 +1,162 @@
+import asyncio
+
+import time
+
+import pytest
+
+from src.api.deadlines import within_deadline
+from src.context import Priority, RequestContext, current_request, use_request_context
+from src.metrics import metrics
+from src.models.sop import SOPDocument
+from src.parser.base import BaseSOPAnalyzer
+from src.parser.single_flight import SingleFlight, SingleFlightAnalyzer
+
+
+class _SlowAnalyzer(BaseSOPAnalyzer):
+    def __init__(self) -> None:
+        self.calls = 0
+        self.contexts: list[RequestContext] = []
+        self.release = asyncio.Event()
+
+    async def analyze(self, sop_text: str) -> SOPDocument:
+        self.calls += 1
+        self.contexts.append(current_request())
+        await self.release.wait()
+        return SOPDocument(title=sop_text)
+
+
+class TestSingleFlightAnalyzer:
+    async def test_identical_text_coalesced(self):
+        metrics.reset()
+        inner = _SlowAnalyzer()
+        analyzer = SingleFlightAnalyzer(inner)
+
+        tasks = [asyncio.create_task(analyzer.analyze("same SOP")) for _ in range(12)]
+        await asyncio.sleep(0)
+        inner.release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert inner.calls == 1
+        assert all(r.title == "same SOP" for r in results)
+        assert metrics.counter("analyze_requests_total") == 12
+        assert metrics.counter("llm_calls_saved_total", reason="coalesced") == 11
+
+    async def test_different_text_not_coalesced(self):
+        inner = _SlowAnalyzer()
+        analyzer = SingleFlightAnalyzer(inner)
+
+        tasks = [asyncio.create_task(analyzer.analyze(f"SOP {i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        inner.release.set()
+        await asyncio.gather(*tasks)
+
+        assert inner.calls == 3
+
+    async def test_first_caller_cancelled_others_succeed(self):
+        inner = _SlowAnalyzer()
+        analyzer = SingleFlightAnalyzer(inner)
+
+        first = asyncio.create_task(analyzer.analyze("same SOP"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(analyzer.analyze("same SOP"))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        inner.release.set()
+
+        assert (await second).title == "same SOP"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert inner.calls == 1
+
+    async def test_waiters_keep_their_own_deadlines(self):
+        inner = _SlowAnalyzer()
+        analyzer = SingleFlightAnalyzer(inner)
+
+        async def analyze(timeout: float) -> SOPDocument:
+            with use_request_context(RequestContext(deadline=time.monotonic() + timeout)):
+                return await within_deadline(analyzer.analyze("same SOP"))
+
+        short = asyncio.create_task(analyze(0.05))
+        await asyncio.sleep(0)
+        long = asyncio.create_task(analyze(60))
+        with pytest.raises(TimeoutError):
+            await short
+        inner.release.set()
+
+        assert (await long).title == "same SOP"
+        assert inner.calls == 1
+        # The shared call is not bound by the first caller's deadline
+        assert inner.contexts[0].deadline is None
+
+    async def test_tenants_and_priorities_not_coalesced(self):
+        inner = _SlowAnalyzer()
+        analyzer = SingleFlightAnalyzer(inner)
+        contexts = [
+            RequestContext(tenant="a"),
+            RequestContext(tenant="b"),
+            RequestContext(tenant="a", priority=Priority.BATCH),
+        ]
+
+        async def analyze(context: RequestContext) -> SOPDocument:
+            with use_request_context(context):
+                return await analyzer.analyze("same SOP")
+
+        tasks = [asyncio.create_task(analyze(c)) for c in contexts]
+        await asyncio.sleep(0)
+        inner.release.set()
+        await asyncio.gather(*tasks)
+
+        assert inner.calls == 3
+        assert [(c.tenant, c.priority) for c in inner.contexts] == [(c.tenant, c.priority) for c in contexts]
+
+    async def test_result_not_cached_after_completion(self):
+        inner = _SlowAnalyzer()
+        inner.release.set()
+        analyzer = SingleFlightAnalyzer(inner)
+
+        await analyzer.analyze("same SOP")
+        await analyzer.analyze("same SOP")
+
+        assert inner.calls == 2
+
+
+class TestSingleFlight:
+    async def test_call_cancelled_when_all_waiters_leave(self):
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        flight: SingleFlight[None] = SingleFlight()
+        waiter = asyncio.create_task(flight.do("key", work))
+        await started.wait()
+        waiter.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+        assert not flight.in_flight("key")
+
+    async def test_errors_shared_and_not_retained(self):
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            raise RuntimeError("LLM down")
+
+        flight: SingleFlight[None] = SingleFlight()
+        results = await asyncio.gather(
+            flight.do("key", failing), flight.do("key", failing), return_exceptions=True
+        )
+
+        assert calls == 1
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not flight.in_flight("key")
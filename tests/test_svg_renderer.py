@@ -0,0 +1,87 @@
+import xml.etree.ElementTree as ET
+
+from src.api.previews import PreviewCache
+from src.generator.bpmn_builder import BPMNBuilder
+from src.generator.layout import LayoutEngine
+from src.generator.svg_renderer import SVGRenderer, process_hash
+from src.models.sop import SOPDocument, SOPElement, SOPElementType
+
+NS_SVG = "{http://www.w3.org/2000/svg}"
+
+
+def _laid_out(sop_document):
+    process = BPMNBuilder().build(sop_document)
+    LayoutEngine().apply_layout(process)
+    return process
+
+
+class TestSVGRenderer:
+    def test_svg_is_well_formed(self, sample_sop_document):
+        svg = SVGRenderer().render(_laid_out(sample_sop_document))
+        root = ET.fromstring(svg)
+        assert root.tag == f"{NS_SVG}svg"
+
+    def test_draws_every_node_and_flow(self, sample_sop_document):
+        process = _laid_out(sample_sop_document)
+        root = ET.fromstring(SVGRenderer().render(process))
+
+        tasks = [n for n in process.nodes if n.node_type.value == "task"]
+        assert len(root.findall(f"{NS_SVG}rect")) == len(tasks)
+        assert len(root.findall(f"{NS_SVG}circle")) == 2
+        assert len(root.findall(f"{NS_SVG}polygon")) == 2  # diverging + converging gateway
+        assert len(root.findall(f"{NS_SVG}polyline")) == len(process.sequence_flows)
+
+    def test_uses_layout_geometry(self, linear_sop_document):
+        process = _laid_out(linear_sop_document)
+        root = ET.fromstring(SVGRenderer().render(process))
+        task = next(n for n in process.nodes if n.name == "Step A")
+        rect = root.find(f"{NS_SVG}rect")
+        assert float(rect.get("x")) == task.x
+        assert float(rect.get("y")) == task.y
+
+    def test_labels_escaped_and_flow_names_drawn(self, sample_sop_document):
+        sample_sop_document.elements[0].text = "Receive <email> & log"
+        svg = SVGRenderer().render(_laid_out(sample_sop_document))
+        assert "&lt;email&gt; &amp; log" in svg
+        texts = "".join(ET.fromstring(svg).itertext())
+        assert "Yes" in texts and "No" in texts
+
+    def test_long_labels_wrapped(self):
+        long_text = "Verify that the customer account number matches the invoice " * 3
+        sop = SOPDocument(title="Long", elements=[SOPElement(SOPElementType.STEP, long_text)])
+        root = ET.fromstring(SVGRenderer().render(_laid_out(sop)))
+        spans = [t for t in root.iter(f"{NS_SVG}tspan")]
+        assert 1 < len(spans) <= 4
+        assert spans[-1].text.endswith("…")
+
+
+class TestProcessHash:
+    def test_stable_across_builds(self, sample_sop_document):
+        assert process_hash(_laid_out(sample_sop_document)) == process_hash(_laid_out(sample_sop_document))
+
+    def test_changes_with_content(self, sample_sop_document, linear_sop_document):
+        assert process_hash(_laid_out(sample_sop_document)) != process_hash(_laid_out(linear_sop_document))
+
+
+class TestPreviewCache:
+    def test_renders_once_then_serves_cached(self, sample_sop_document):
+        renders = []
+
+        class CountingRenderer(SVGRenderer):
+            def render(self, process):
+                renders.append(process)
+                return super().render(process)
+
+        cache = PreviewCache(CountingRenderer(), max_entries=4)
+        key = cache.put(_laid_out(sample_sop_document))
+        first = cache.get(key)
+        assert cache.get(key) == first
+        assert len(renders) == 1
+        assert first.startswith(b"<svg")
+
+    def test_evicts_least_recently_used(self, sample_sop_document, linear_sop_document):
+        cache = PreviewCache(SVGRenderer(), max_entries=1)
+        old = cache.put(_laid_out(sample_sop_document))
+        new = cache.put(_laid_out(linear_sop_document))
+        assert cache.get(old) is None
+        assert cache.get(new) is not None